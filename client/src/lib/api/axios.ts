@@ -6,6 +6,12 @@ const baseURL = isProd
   ? import.meta.env.VITE_API_BASE_URL
   : "http://localhost:5000";
 
+// After a write the API answers with the time until which our reads must come from the
+// primary database rather than a lagging replica; echoing it back lets every server
+// instance honour that window, so we always read our own writes.
+const READ_YOUR_WRITES_HEADER = "x-primary-reads-until";
+let primaryReadsUntil: string | null = null;
+
 const api = axios.create({
   baseURL,
   headers: {},
@@ -18,6 +24,9 @@ api.interceptors.request.use(
     if (token) {
       config.headers["Authorization"] = `Bearer ${token}`;
     }
+    if (primaryReadsUntil) {
+      config.headers[READ_YOUR_WRITES_HEADER] = primaryReadsUntil;
+    }
 
     console.log(`[REQUEST] ${config.method?.toUpperCase()} ${config.url}`);
     return config;
@@ -28,7 +37,13 @@ api.interceptors.request.use(
 );
 
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const until = response.headers[READ_YOUR_WRITES_HEADER];
+    if (until) {
+      primaryReadsUntil = until;
+    }
+    return response;
+  },
   (error) => {
     if (error.response) {
       if (error.response?.status === 401) {
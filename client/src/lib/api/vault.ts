@@ -30,6 +30,7 @@ export const addVaultEntry = async (entry: VaultEntryInput) => {
 
 export const getVaultEntries = async () => {
   try {
+    // Listed without secrets; a password is fetched with revealVaultEntries when shown
     const response = await api.get<VaultEntry[]>("/vault/get-vault");
     return response.data;
   } catch (error) {
@@ -54,6 +55,25 @@ export const viewVaultEntry = async (
   }
 };
 
+export const revealVaultEntries = async (
+  entryIds: number[],
+  unlockToken: string
+) => {
+  try {
+    const response = await api.post<{
+      entries: { id: number; pin_or_password: string }[];
+      missing: number[];
+    }>(`/vault/reveal`, {
+      entry_ids: entryIds,
+      unlock_token: unlockToken,
+    });
+    return response.data;
+  } catch (error) {
+    handleAxiosError(error);
+    throw error;
+  }
+};
+
 export const updateVaultEntry = async (
   entryId: number,
   updates: Partial<VaultEntryInput>
@@ -34,7 +34,9 @@ import {
 } from "lucide-react";
 import { useToast } from "../lib/hooks/use-toast";
 import { Alert, AlertDescription } from "../components/ui/alert";
+import axios from "axios";
 import type { VaultEntry as IVaultEntry } from "@/lib/api/vault";
+import { revealVaultEntries } from "@/lib/api/vault";
 import {
   useAddVaultEntry,
   useUnlockVault,
@@ -57,6 +59,8 @@ export default function Vault() {
   const { toast } = useToast();
 
   const [isUnlocked, setIsUnlocked] = useState(false);
+  // Unlock grant from /vault/unlock-vault, sent to /vault/reveal for each password shown
+  const [unlockToken, setUnlockToken] = useState<string | null>(null);
   const [pin, setPin] = useState("");
 
   const [pinError, setPinError] = useState(false);
@@ -95,9 +99,11 @@ export default function Vault() {
         password: pin,
       },
       {
-        onSuccess: () => {
+        onSuccess: (data) => {
+          setUnlockToken(data.unlock_token);
           setIsUnlocked(true);
           setPinError(false);
+          setPin("");
 
           toast({
             title: "Vault unlocked",
@@ -125,7 +131,7 @@ export default function Vault() {
         const password =
           existing && existing.password && existing.password !== "••••••••"
             ? existing.password
-            : e.pin_or_password ?? "••••••••";
+            : "••••••••";
 
         return {
           id: e.id,
@@ -139,46 +145,75 @@ export default function Vault() {
     );
   }, [vaultEntries]);
 
-  const handleViewPassword = (id: number) => {
-    const entry = vaultEntries.find((e: IVaultEntry) => e.id === id);
-    if (entry) {
+  const lockVault = () => {
+    setIsUnlocked(false);
+    setUnlockToken(null);
+    setVisiblePasswords(new Set());
+    setCredentials((prev) => prev.map((c) => ({ ...c, password: "••••••••" })));
+  };
+
+  // Fetch one entry's password from /vault/reveal; null when it couldn't be revealed
+  const handleViewPassword = async (id: number) => {
+    if (!unlockToken) {
+      lockVault();
+      return null;
+    }
+    try {
+      const { entries } = await revealVaultEntries([id], unlockToken);
+      const revealed = entries.find((e) => e.id === id);
+      if (!revealed) {
+        toast({
+          title: "Unavailable",
+          description: "This credential no longer exists. Refresh the vault.",
+          variant: "destructive",
+        });
+        return null;
+      }
       setCredentials((prev) =>
         prev.map((c) =>
-          c.id === id
-            ? (() => {
-                const revealed =
-                  entry.pin_or_password ?? c.password ?? "••••••••";
-                return {
-                  ...c,
-                  password: revealed,
-                  url: entry.url || c.url,
-                  notes: entry.notes ?? c.notes,
-                };
-              })()
-            : c
+          c.id === id ? { ...c, password: revealed.pin_or_password } : c
         )
       );
-    } else {
-      toast({
-        title: "Unavailable",
-        description:
-          "Password not available in cache. Please unlock the vault or refresh entries.",
-        variant: "destructive",
-      });
+      return revealed.pin_or_password;
+    } catch (error) {
+      if (axios.isAxiosError(error) && error.response?.status === 401) {
+        // The unlock grant expired (VAULT_UNLOCK_TTL); ask for the vault password again
+        lockVault();
+        toast({
+          title: "Vault locked",
+          description: "Your vault session expired. Unlock it again.",
+        });
+      } else {
+        toast({
+          title: "Error",
+          description: "Failed to reveal password",
+          variant: "destructive",
+        });
+      }
+      return null;
     }
   };
 
   const togglePasswordVisibility = async (id: number) => {
+    const cred = credentials.find((c) => c.id === id);
+    const hiding = visiblePasswords.has(id);
+    if (!hiding && cred && cred.password === "••••••••") {
+      if ((await handleViewPassword(id)) === null) return;
+    }
+
     setVisiblePasswords((prev) => {
       const newSet = new Set(prev);
-      newSet.has(id) ? newSet.delete(id) : newSet.add(id);
+      hiding ? newSet.delete(id) : newSet.add(id);
       return newSet;
     });
+  };
 
-    const cred = credentials.find((c) => c.id === id);
-    if (cred && cred.password === "••••••••") {
-      await handleViewPassword(id);
-    }
+  const copyPassword = async (credential: VaultCredential) => {
+    const password =
+      credential.password === "••••••••"
+        ? await handleViewPassword(credential.id)
+        : credential.password;
+    if (password !== null) copyToClipboard(password, "Password");
   };
 
   const copyToClipboard = (text: string, label: string) => {
@@ -502,7 +537,7 @@ export default function Vault() {
               </DialogContent>
             </Dialog>
 
-            <Button variant="outline" onClick={() => setIsUnlocked(false)}>
+            <Button variant="outline" onClick={lockVault}>
               <Lock className="h-4 w-4 mr-2" />
               Lock Vault
             </Button>
@@ -668,9 +703,7 @@ export default function Vault() {
                               variant="ghost"
                               size="icon"
                               className="h-7 w-7"
-                              onClick={() =>
-                                copyToClipboard(credential.password, "Password")
-                              }
+                              onClick={() => copyPassword(credential)}
                             >
                               <Copy className="h-3 w-3" />
                             </Button>
@@ -0,0 +1,191 @@
+"""
+Optional ASGI serving mode: the same /auth, /vault, /social, /personal and /api
+routes as the Flask app, written as async handlers on Quart over a psycopg 3
+async pool. A request waiting on PostgreSQL holds a coroutine rather than an OS
+thread; bcrypt runs in the hashing process pool and Fernet in worker threads.
+
+Run with `hypercorn asgi:app` (see asgi.py). Needs requirements-async.txt.
+"""
+import asyncio
+import os
+from dotenv import load_dotenv
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+from config import DevConfig, ProdConfig
+from db_setup import READ_YOUR_WRITES_HEADER, SAFE_METHODS, begin_request_routing, stick_to_primary
+from extensions import hashing_pool, health_monitor, media_store
+from hashing import HashingUnavailable
+from auth.revocation import revocation_cache
+from jobs.token_blocklist import partition_days_ahead
+from migrations import latest_version
+from utils.headers import set_security_headers
+import metrics
+from json_provider import fast_json_provider
+from aio.db import (
+    async_pool_stats, async_replica_pool_stats, close_async_pool, fetch_blocklist, keepalive_async_pools,
+    maintain_token_blocklist, open_async_pool, schema_version,
+)
+from aio.ratelimit import limiter
+
+load_dotenv()
+
+
+def create_async_app():
+    app = Quart(__name__)
+
+    if os.getenv("FLASK_ENV") == "production":
+        app.config.from_object(ProdConfig)
+    else:
+        app.config.from_object(DevConfig)
+
+    revocation_cache.init_app(app)
+    hashing_pool.init_app(app)
+    media_store.init_app(app)
+    health_monitor.init_app(app)
+
+    @app.errorhandler(HashingUnavailable)
+    async def hashing_unavailable(e):
+        response = jsonify({"error": "Server is busy, please try again shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    # Same timing spans, /metrics and orjson encoding as the Flask app; the span contextvar lives in the request task
+    app.json = metrics.timed_json_provider(fast_json_provider(type(app.json)))(app)
+
+    @app.before_request
+    async def begin_request_metrics():
+        metrics.begin_request()
+
+    @app.after_request
+    async def record_request_metrics(response):
+        metrics.end_request(request.method, request.endpoint, response.status_code)
+        return response
+
+    # Read-your-writes, as in app.py; jwt_claims is only set on requests that verified a JWT
+    @app.before_request
+    async def route_reads():
+        begin_request_routing(request.headers.get(READ_YOUR_WRITES_HEADER))
+
+    @app.after_request
+    async def stick_writers_to_primary(response):
+        claims = g.get("jwt_claims")
+        if request.method not in SAFE_METHODS and response.status_code < 400 and claims:
+            until = stick_to_primary(claims["sub"])
+            if until:
+                response.headers[READ_YOUR_WRITES_HEADER] = until
+        return response
+
+    @app.route('/metrics')
+    @limiter.exempt
+    async def prometheus_metrics():
+        if not metrics.scrape_allowed(request.headers.get("Authorization"), app.config["METRICS_TOKEN"]):
+            return jsonify({"error": "Unauthorized"}), 401
+        body = metrics.render({"db_pool": async_pool_stats(), **async_replica_pool_stats(),
+                               "hashing_pool": hashing_pool.stats(), "media_store": media_store.stats()})
+        return Response(body, content_type=metrics.CONTENT_TYPE)
+
+    limiter.init_app(app)
+
+    cors(
+        app,
+        allow_origin=app.config["CORS_ORIGINS"],
+        allow_credentials=app.config["CORS_SUPPORTS_CREDENTIALS"],
+        allow_headers=app.config["CORS_ALLOW_HEADERS"],
+        allow_methods=app.config.get("CORS_METHODS"),
+        expose_headers=app.config.get("CORS_EXPOSE_HEADERS"),
+    )
+
+    from aio.auth import auth_bp
+    from aio.personal import personal_bp
+    from aio.social import social_bp
+    from aio.vault import vault_bp
+    from aio.api import api_bp
+    from aio.search import search_bp
+    from aio.media import media_bp
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(personal_bp)
+    app.register_blueprint(social_bp)
+    app.register_blueprint(vault_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(media_bp)
+
+    @app.after_request
+    async def security_headers(response):
+        return set_security_headers(response)
+
+    @app.route('/')
+    async def home():
+        return "Welcome to primer backend!"
+
+    @app.route('/healthz', methods=['HEAD', 'GET'])
+    @limiter.exempt
+    async def healthz():
+        return jsonify({"status": "ok"}), 200
+
+    @app.route('/readyz', methods=['HEAD', 'GET'])
+    @limiter.exempt
+    async def readyz():
+        ready, body = health_monitor.verdict()
+        return jsonify(body), 200 if ready else 503
+
+    @app.before_serving
+    async def startup():
+        if not await open_async_pool(app.config):
+            return
+
+        current, latest = await schema_version(), latest_version()
+        if current < latest:
+            print(
+                f"WARNING: database schema is at version {current}, this build expects {latest}. "
+                "Run `python -m migrations upgrade`."
+            )
+
+        # Load the blocklist before the first request, then keep it topped up in the background
+        await revocation_cache.refresh_async(fetch_blocklist)
+        if app.config["WORKER_WARM_UP"]:
+            # Spawn the bcrypt processes now rather than on the first sign-in (startup.py)
+            await asyncio.to_thread(hashing_pool.warm)
+        app.revocation_refresher = asyncio.create_task(_refresh_revocations())
+        # Ping idle pooled connections and keep /readyz's verdict current (health.py)
+        await health_monitor.check_async(keepalive_async_pools)
+        app.pool_keepalive = asyncio.create_task(_keep_pools_alive())
+        if app.config["BLOCKLIST_MAINTENANCE_SECONDS"] > 0:
+            app.blocklist_maintainer = asyncio.create_task(_maintain_blocklist(app.config))
+
+    @app.after_serving
+    async def shutdown():
+        for task_name in ("revocation_refresher", "pool_keepalive", "blocklist_maintainer"):
+            task = getattr(app, task_name, None)
+            if task is not None:
+                task.cancel()
+        await close_async_pool()
+
+    return app
+
+
+async def _refresh_revocations():
+    while True:
+        await asyncio.sleep(revocation_cache.refresh_seconds)
+        try:
+            await revocation_cache.refresh_async(fetch_blocklist)
+        except Exception as e:
+            print(f"Revocation cache refresh failed: {e}")
+
+
+async def _keep_pools_alive():
+    while True:
+        await asyncio.sleep(health_monitor.interval)
+        await health_monitor.check_async(keepalive_async_pools)
+
+
+async def _maintain_blocklist(config):
+    """Async counterpart of jobs.token_blocklist.start_background_maintenance"""
+    days_ahead = partition_days_ahead(config)
+    while True:
+        try:
+            await maintain_token_blocklist(days_ahead)
+        except Exception as e:
+            print(f"token_blocklist maintenance failed: {e}")
+        await asyncio.sleep(config["BLOCKLIST_MAINTENANCE_SECONDS"])
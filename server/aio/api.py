@@ -0,0 +1,47 @@
+"""Async /api routes (same contract as utils/routes.py)"""
+from quart import Blueprint, current_app, jsonify, request
+from extensions import hashing_pool
+from metrics import operator_allowed
+from utils.routes import DASHBOARD_QUERY
+from aio.db import async_pool_stats, transaction
+from aio.tokens import get_jwt_identity, jwt_required
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+
+@api_bp.route("/dashboard", methods=["GET"])
+@jwt_required()
+async def get_dashboard():
+    user_id = get_jwt_identity()
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            await cur.execute(DASHBOARD_QUERY, (user_id,))
+            row = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not row:
+        return jsonify({"error": "User not found"}), 404
+
+    username, vault_count, social_count = row
+    return jsonify({
+        "username": username,
+        "vault_count": vault_count,
+        "social_count": social_count
+    }), 200
+
+
+@api_bp.route("/stats/hashing", methods=["GET"])
+async def get_hashing_stats():
+    if not operator_allowed(request.headers.get("Authorization"), current_app.config["METRICS_TOKEN"]):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(hashing_pool.stats()), 200
+
+
+@api_bp.route("/stats/pool", methods=["GET"])
+async def get_pool_stats():
+    """Async pool counters (psycopg_pool names: pool_size, pool_available, requests_waiting, ...)"""
+    if not operator_allowed(request.headers.get("Authorization"), current_app.config["METRICS_TOKEN"]):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(async_pool_stats()), 200
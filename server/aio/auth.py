@@ -0,0 +1,118 @@
+"""Async /auth routes (same contract as auth/routes.py)"""
+import datetime
+import psycopg
+from quart import Blueprint, request, jsonify
+from auth.routes import is_valid_email
+from auth.revocation import ENSURE_BLOCKLIST_PARTITION, INSERT_BLOCKLIST, revocation_cache
+from extensions import hashing_pool, health_monitor
+from aio.db import transaction
+from aio.ratelimit import limiter
+from aio.tokens import create_access_token, create_refresh_token, get_jwt, get_jwt_identity, jwt_required
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
+
+
+async def add_token_to_blocklist(jti, token_type, expires, user_id=None):
+    """Add a jti to the blocklist table; expires is the token's exp claim"""
+    async with transaction() as cur:
+        await cur.execute(ENSURE_BLOCKLIST_PARTITION, (expires,))
+        await cur.execute(INSERT_BLOCKLIST, (jti, token_type, user_id, datetime.datetime.utcnow(), expires))
+
+    revocation_cache.revoke(jti)
+
+
+@auth_bp.route('/keep-alive', methods=['HEAD', 'GET'])
+async def keep_alive():
+    """Keeps the production server from going idle; the pool keepalive task keeps the database awake."""
+    ready, _ = health_monitor.verdict()
+    return '', 200 if ready else 503
+
+
+@auth_bp.route('/signup', methods=['POST'])
+@limiter.limit("2 per minute")
+async def signup():
+    data = await request.get_json(silent=True) or {}
+    username = data.get('username')
+    email = data.get('email')
+    password = data.get('password')
+
+    if not username or not password or not email:
+        return jsonify({"error": "All credentials required"}), 400
+
+    if len(password) < 8:
+        return jsonify({"error": "Password must be at least 8 characters long"}), 400
+
+    if not is_valid_email(email=email):
+        return jsonify({"error": "Invalid Email"}), 400
+
+    hashed_password = await hashing_pool.hash_password_async(password)
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(
+                "INSERT INTO users (username,email, password) VALUES (%s, %s, %s) RETURNING id;",
+                (username, email, hashed_password)
+            )
+            user_id = (await cur.fetchone())[0]
+    except psycopg.errors.UniqueViolation:
+        return jsonify({"error": "Username or email already exists"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "User created!", "user_id": user_id}), 201
+
+
+@auth_bp.route('/signin', methods=['POST'])
+@limiter.limit("2 per minute")
+async def signin():
+    data = await request.get_json(silent=True) or {}
+    username = data.get('username')
+    password = data.get('password')
+
+    if not username or not password:
+        return jsonify({"error": "Username and password required"}), 400
+
+    try:
+        async with transaction() as cur:
+            await cur.execute("SELECT id, password FROM users WHERE username=%s;", (username,))
+            user = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not user:
+        return jsonify({"error": "Invalid username or password"}), 401
+    user_id, pw_hash = user
+    if not await hashing_pool.check_password_async(pw_hash, password):
+        return jsonify({"error": "Invalid username or password"}), 401
+
+    return jsonify({
+        "message": "Login successful",
+        "access_token": create_access_token(identity=str(user_id), fresh=True),
+        "refresh_token": create_refresh_token(identity=str(user_id)),
+    }), 200
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+async def refresh_access_token():
+    new_access_token = create_access_token(identity=get_jwt_identity())
+    return jsonify({"message": "Access token refreshed", "access_token": new_access_token}), 200
+
+
+@auth_bp.route('/me', methods=['GET'])
+@jwt_required()
+async def get_current_user():
+    return jsonify({"logged_in": True, "user_id": get_jwt_identity()}), 200
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+async def logout():
+    try:
+        claims = get_jwt()
+        await add_token_to_blocklist(jti=claims['jti'], token_type="access", expires=claims['exp'],
+                                     user_id=get_jwt_identity())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "Logout successful"}), 200
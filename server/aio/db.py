@@ -0,0 +1,248 @@
+"""
+Async counterpart of db_setup + repository for the ASGI app (psycopg 3).
+
+Handlers await a connection instead of holding a thread while they wait, so
+the pool can be shared by thousands of in-flight requests. Statements use the
+same %s placeholders as the psycopg2 code, so SQL constants are shared.
+"""
+import itertools
+import time
+import uuid
+from contextlib import asynccontextmanager
+import psycopg
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from auth.revocation import LOAD_BLOCKLIST, LOAD_BLOCKLIST_SINCE, LOOKUP_JTI
+from db_setup import configure_read_routing, connection_settings, reads_from_primary, replica_connection_settings
+from jobs.token_blocklist import MAINTAIN_TOKEN_BLOCKLIST
+from metrics import POOL_WAIT_SECONDS, add_time, timed
+from repository import delete_owned_statement, owned_outcome, update_owned_statement
+from utils.etag import VERSION_QUERIES, resource_etag
+
+async_pool = None
+# Read replica pools (DATABASE_REPLICA_URLS), used like db_setup.replica_pools
+async_replica_pools = []
+_next_replica = itertools.count()
+# id(pool) -> psycopg_pool's connections_errors count at the last keepalive
+_connection_errors = {}
+# Seconds to wait for a connection that is idle or being opened (psycopg_pool refuses a zero
+# timeout outright); after that a replica read goes to the primary, a keepalive gives up
+IDLE_CHECKOUT_TIMEOUT = 0.01
+
+
+class TimedAsyncCursor(psycopg.AsyncCursor):
+    """metrics.TimedCursor for psycopg 3: statement time goes to the request's db span"""
+
+    async def execute(self, query, params=None, **kwargs):
+        with timed("db"):
+            return await super().execute(query, params, **kwargs)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        with timed("db"):
+            return await super().executemany(query, params_seq, **kwargs)
+
+
+def _make_pool(conninfo, settings, config):
+    return AsyncConnectionPool(
+        conninfo,
+        kwargs={"cursor_factory": TimedAsyncCursor, **settings},
+        min_size=config["DB_POOL_MIN"],
+        max_size=config["DB_POOL_MAX"],
+        timeout=config["DB_POOL_CHECKOUT_TIMEOUT"],
+        max_idle=config["DB_POOL_MAX_IDLE"],
+        max_lifetime=config["DB_POOL_MAX_LIFETIME"],
+        open=False,
+    )
+
+
+async def open_async_pool(config):
+    """Create and open the async pool (and replica pools) from the DB_POOL_* settings; False without DB settings"""
+    global async_pool
+
+    settings = connection_settings()
+    if settings is None:
+        return False
+
+    conninfo = settings.pop("dsn", "")
+    async_pool = _make_pool(conninfo, settings, config)
+
+    try:
+        await async_pool.open(wait=True, timeout=config["DB_POOL_CHECKOUT_TIMEOUT"])
+    except psycopg.Error as e:
+        print(f"Error initializing async connection pool: {e}")
+        return False
+
+    print("Async connection pool created successfully")
+
+    async_replica_pools.clear()
+    for replica in replica_connection_settings():
+        pool = _make_pool(replica["dsn"], {}, config)
+        # psycopg_pool keeps reconnecting a replica that is down; reads fall back to the primary meanwhile
+        await pool.open(wait=False)
+        async_replica_pools.append(pool)
+    configure_read_routing(config, len(async_replica_pools))
+    return True
+
+
+async def close_async_pool():
+    global async_pool
+    for pool in async_replica_pools:
+        await pool.close()
+    async_replica_pools.clear()
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+
+def async_pool_stats():
+    """Pool counters in psycopg_pool's naming (pool_size, requests_waiting, ...)"""
+    if async_pool is None:
+        return {}
+    return async_pool.get_stats()
+
+
+def async_replica_pool_stats():
+    """async_pool_stats() of each read replica pool, keyed like db_setup.replica_pool_stats"""
+    return {f"db_replica_{index}": pool.get_stats() for index, pool in enumerate(async_replica_pools)}
+
+
+async def _keepalive(pool):
+    """
+    Async counterpart of InstrumentedConnectionPool.keepalive: ping idle connections,
+    least recently used first, until one answers. psycopg_pool replaces the broken ones.
+    Returns None when every connection is busy and the pool reported no failed connects.
+    """
+    stats = pool.get_stats()
+    errors = stats.get("connections_errors", 0)
+    failed = errors > _connection_errors.get(id(pool), errors)
+    _connection_errors[id(pool)] = errors
+
+    for _ in range(stats.get("pool_available", 0)):
+        try:
+            conn = await pool.getconn(timeout=IDLE_CHECKOUT_TIMEOUT)
+        except PoolTimeout:
+            break  # taken by requests in the meantime
+        try:
+            await pool.check_connection(conn)
+        except psycopg.Error:
+            failed = True
+            continue
+        finally:
+            await pool.putconn(conn)
+        return True
+    return False if failed else None
+
+
+async def keepalive_async_pools():
+    """db_setup.keepalive_pools for the async pools; the primary's outcome is the readiness verdict"""
+    if async_pool is None:
+        return False
+
+    for pool in async_replica_pools:
+        await _keepalive(pool)
+    return await _keepalive(async_pool)
+
+
+async def _checkout(readonly, user_id):
+    """(pool, connection): a replica with a free connection for readonly work, else the primary"""
+    if readonly and async_replica_pools and not reads_from_primary(user_id):
+        start = next(_next_replica)
+        for offset in range(len(async_replica_pools)):
+            pool = async_replica_pools[(start + offset) % len(async_replica_pools)]
+            # Never queue behind a busy replica while the primary may have room
+            stats = pool.get_stats()
+            if not stats.get("pool_available") and stats["pool_size"] >= stats["pool_max"]:
+                continue
+            try:
+                return pool, await pool.getconn(timeout=IDLE_CHECKOUT_TIMEOUT)
+            except PoolTimeout:
+                continue
+    return async_pool, await async_pool.getconn()
+
+
+@asynccontextmanager
+async def transaction(readonly=False, user_id=None):
+    """
+    Yield a cursor inside a transaction: commit on success, roll back on any error.
+    readonly and user_id route the transaction like db_setup.get_db_connection.
+    """
+    if async_pool is None:
+        raise RuntimeError("Async connection pool is not initialized.")
+
+    # Commits explicitly so the commit is timed; putconn rolls back a connection left in a transaction
+    started = time.perf_counter()
+    pool, conn = await _checkout(readonly, user_id)
+    try:
+        waited = time.perf_counter() - started
+        POOL_WAIT_SECONDS.observe(waited)
+        add_time("pool_wait", waited)
+
+        async with conn.cursor() as cur:
+            yield cur
+        with timed("db"):
+            await conn.commit()
+    finally:
+        await pool.putconn(conn)
+
+
+@asynccontextmanager
+async def server_side_cursor(itersize=500):
+    """Yield a named cursor that fetches rows from the server in batches of itersize"""
+    if async_pool is None:
+        raise RuntimeError("Async connection pool is not initialized.")
+
+    async with async_pool.connection() as conn:
+        async with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+            cur.itersize = itersize
+            yield cur
+
+
+async def fetch_blocklist(since=None):
+    """token_blocklist rows for RevocationCache.refresh_async"""
+    async with transaction() as cur:
+        if since is None:
+            await cur.execute(LOAD_BLOCKLIST)
+        else:
+            await cur.execute(LOAD_BLOCKLIST_SINCE, (since,))
+        return await cur.fetchall()
+
+
+async def jti_is_blocklisted(jti, expires):
+    """Primary key lookup confirming a revocation bloom filter hit"""
+    async with transaction() as cur:
+        await cur.execute(LOOKUP_JTI, (jti, expires))
+        return await cur.fetchone() is not None
+
+
+async def maintain_token_blocklist(days_ahead):
+    """jobs.token_blocklist.maintain_token_blocklist on the async pool"""
+    async with transaction() as cur:
+        await cur.execute(MAINTAIN_TOKEN_BLOCKLIST, (days_ahead,))
+        return (await cur.fetchone())[0]
+
+
+async def current_etag(cur, request, user_id, resource):
+    """utils.etag.current_etag on an async cursor"""
+    await cur.execute(VERSION_QUERIES[resource], (user_id,))
+    return resource_etag(request, user_id, resource, (await cur.fetchone())[0])
+
+
+async def delete_owned(cur, table, row_id, user_id):
+    """repository.delete_owned on an async cursor"""
+    await cur.execute(*delete_owned_statement(table, row_id, user_id))
+    return owned_outcome(await cur.fetchone())
+
+
+async def update_owned(cur, table, row_id, user_id, values):
+    """repository.update_owned on an async cursor: columns whose value is None are kept"""
+    await cur.execute(*update_owned_statement(table, row_id, user_id, values))
+    return owned_outcome(await cur.fetchone())
+
+
+async def schema_version():
+    """Highest applied migration, 0 for a database that was never migrated"""
+    try:
+        async with transaction() as cur:
+            await cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+            return (await cur.fetchone())[0]
+    except psycopg.errors.UndefinedTable:
+        return 0
@@ -0,0 +1,27 @@
+"""Async /media routes (same contract as media/routes.py)"""
+import asyncio
+from quart import Blueprint, jsonify, request, send_file
+from extensions import media_store
+from media.routes import media_headers, media_tag
+from media.store import THUMBNAIL_MIMETYPE
+from aio.ratelimit import limiter
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+
+@media_bp.route('/<digest>', methods=['GET'])
+@media_bp.route('/<digest>/<int:size>', methods=['GET'])
+@limiter.exempt
+async def get_media(digest, size=None):
+    headers = media_headers(digest, size)
+    if request.if_none_match.contains(media_tag(digest, size)):
+        return "", 304, headers
+
+    # A missing rendition is rendered on the spot, so keep it off the event loop
+    path = await asyncio.to_thread(media_store.thumbnail, digest, size)
+    if path is None:
+        return jsonify({"error": "Not found"}), 404
+
+    response = await send_file(path, mimetype=THUMBNAIL_MIMETYPE, add_etags=False)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,30 @@
+"""NDJSON stream responses for the ASGI app (query building and page_response live in utils.pagination)"""
+import asyncio
+from quart import Response, current_app
+from utils.pagination import NDJSON_MIMETYPE, STREAM_ITERSIZE
+from aio.db import server_side_cursor
+
+
+def stream_ndjson(query, params, row_to_dict):
+    """Stream rows as newline-delimited JSON through a named (server-side) cursor"""
+    dumps = current_app.json.dumps
+    return stream_rows(query, params, lambda row: dumps(row_to_dict(row)) + "\n", NDJSON_MIMETYPE)
+
+
+def stream_rows(query, params, render_row, mimetype, preamble=None, headers=None):
+    """
+    Stream each row rendered by render_row. Rows are rendered a fetched batch at
+    a time in a worker thread, since rendering may decrypt secrets.
+    """
+    def render_batch(rows):
+        return "".join(render_row(row) for row in rows)
+
+    async def generate():
+        if preamble:
+            yield preamble
+        async with server_side_cursor(itersize=STREAM_ITERSIZE) as cur:
+            await cur.execute(query, params)
+            while rows := await cur.fetchmany(STREAM_ITERSIZE):
+                yield await asyncio.to_thread(render_batch, rows)
+
+    return Response(generate(), mimetype=mimetype, headers=headers)
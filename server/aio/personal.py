@@ -0,0 +1,196 @@
+"""Async /personal routes (same contract as personal_info/routes.py)"""
+import asyncio
+from quart import Blueprint, request, jsonify
+from extensions import media_store
+from media.store import InvalidImage
+from personal_info.batch import DELETE_FIELDS, batch_results, delete_names, parse_batch, prepare_upserts
+from personal_info.mappers import HANDBOOK_FIELD, PROFILE, UPDATE_PROFILE_PIC
+from utils.etag import etag_headers, is_not_modified
+from aio.db import current_etag, transaction
+from aio.ratelimit import limiter
+from aio.tokens import get_jwt_identity, jwt_required
+
+personal_bp = Blueprint('personal_info', __name__, url_prefix='/personal')
+
+# Request keys accepted by /personal/update, mapped to their users columns
+UPDATABLE_FIELDS = {
+    'profile_pic': 'profile_pic',
+    'full_name': 'full_name',
+    'phone': 'phone',
+    'age': 'age',
+    'gender': 'gender',
+    'address': 'address'
+}
+
+
+@personal_bp.route('/save', methods=['POST'])
+@jwt_required()
+async def save_personal_info():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+
+    try:
+        async with transaction() as cur:
+            await cur.execute("""
+                UPDATE users SET profile_pic=%s, full_name=%s, age=%s, address=%s, updated_at=CURRENT_TIMESTAMP
+                WHERE id=%s;
+            """, (data.get('profile_pic'), data.get('full_name'), data.get('age'), data.get('address'), user_id))
+    except Exception as e:
+        return jsonify({"error": str(e)})
+
+    return jsonify({"message": "Profile updated!"})
+
+
+@personal_bp.route('/profile-pic', methods=['POST'])
+@jwt_required()
+@limiter.limit("10 per minute")
+async def upload_profile_pic():
+    user_id = get_jwt_identity()
+    image = (await request.files).get("image")
+    data = image.read() if image else await request.get_data()
+
+    try:
+        digest = await asyncio.to_thread(media_store.save, data)
+    except InvalidImage as e:
+        return jsonify({"error": str(e)}), 400
+
+    urls = media_store.urls(digest, request.host_url)
+    try:
+        async with transaction() as cur:
+            await cur.execute(UPDATE_PROFILE_PIC, (urls["profile_pic"], user_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(urls), 201
+
+
+@personal_bp.route('/me', methods=['GET'])
+@jwt_required()
+async def get_personal_info():
+    user_id = get_jwt_identity()
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            etag = await current_etag(cur, request, user_id, "profile")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            await cur.execute(f"SELECT {PROFILE.columns} FROM users WHERE id=%s;", (user_id,))
+            user_data = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not user_data:
+        return jsonify({"error": "User not found"}), 404
+
+    return jsonify(PROFILE(user_data)), 200, etag_headers(etag)
+
+
+@personal_bp.route("/handbook", methods=["GET"])
+@jwt_required()
+async def get_personal_handbook():
+    user_id = get_jwt_identity()
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            etag = await current_etag(cur, request, user_id, "handbook")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            await cur.execute(f"SELECT {HANDBOOK_FIELD.columns} FROM personal_handbook WHERE user_id = %s", (user_id,))
+            rows = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(list(map(HANDBOOK_FIELD, rows))), 200, etag_headers(etag)
+
+
+@personal_bp.route("/handbook/update", methods=["POST"])
+@jwt_required()
+async def add_or_update_field():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    field_name = data.get("field_name")
+    field_value = data.get("field_value")
+
+    try:
+        async with transaction() as cur:
+            await cur.execute("""
+                INSERT INTO personal_handbook (user_id, field_name, field_value)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (user_id, field_name)
+                DO UPDATE SET field_value = EXCLUDED.field_value, updated_at = CURRENT_TIMESTAMP;
+            """, (user_id, field_name, field_value))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": f"{field_name} updated successfully"}), 200
+
+
+@personal_bp.route("/handbook/batch", methods=["POST"])
+@jwt_required()
+async def batch_update_handbook():
+    user_id = get_jwt_identity()
+
+    try:
+        upserts, deletes = parse_batch(await request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    upsert_results, pending = prepare_upserts(upserts)
+    names_to_delete = delete_names(deletes)
+
+    try:
+        async with transaction() as cur:
+            deleted = set()
+            if names_to_delete:
+                await cur.execute(DELETE_FIELDS, (user_id, names_to_delete))
+                deleted = {row[0] for row in await cur.fetchall()}
+
+            written = {}
+            if pending:
+                # pending has one entry per field_name, so ON CONFLICT never sees a row twice
+                await cur.execute("""
+                    INSERT INTO personal_handbook (user_id, field_name, field_value)
+                    SELECT %s, field_name, field_value
+                    FROM unnest(%s::varchar[], %s::text[]) AS t(field_name, field_value)
+                    ON CONFLICT (user_id, field_name)
+                    DO UPDATE SET field_value = EXCLUDED.field_value, updated_at = CURRENT_TIMESTAMP
+                    RETURNING field_name, (xmax = 0);
+                """, (user_id, list(pending), [value for _, value in pending.values()]))
+                written = dict(await cur.fetchall())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(batch_results(upsert_results, pending, written, deletes, deleted)), 200
+
+
+@personal_bp.route('/update', methods=['POST'])
+@jwt_required()
+async def update_personal_info():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+
+    if not user_id:
+        return jsonify({"error": "user_id required"}), 400
+
+    fields_to_update = []
+    values = []
+    for key, column in UPDATABLE_FIELDS.items():
+        if key in data and data[key] is not None:
+            fields_to_update.append(f"{column}=%s")
+            values.append(data[key])
+
+    if not fields_to_update:
+        return jsonify({"error": "No valid fields to update"}), 400
+
+    fields_to_update.append("updated_at=CURRENT_TIMESTAMP")
+    values.append(user_id)
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(f"UPDATE users SET {', '.join(fields_to_update)} WHERE id=%s", values)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "Profile updated!"})
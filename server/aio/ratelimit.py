@@ -0,0 +1,143 @@
+"""
+Per-client rate limits for the ASGI app, mirroring the Flask-Limiter setup:
+windows keyed by remote address and endpoint, RATELIMIT_DEFAULT for routes
+without their own limit, and the storage/strategy from RATELIMIT_STORAGE_URI
+and RATELIMIT_STRATEGY, so both apps draw from the same shared counters.
+"""
+import time
+import psycopg
+from limits import parse
+from limits.aio.storage import MemoryStorage, SlidingWindowCounterSupport, Storage
+from limits.aio.strategies import STRATEGIES
+from limits.storage import storage_from_string
+from quart import current_app, jsonify, request
+from ratelimit_storage import (
+    ACQUIRE_SLIDING_WINDOW, CLEAR, CLEAR_SLIDING_WINDOW, GET, GET_EXPIRY, INCR, RESET,
+    SLIDING_WINDOW_COUNTS, sliding_window, sliding_window_info,
+)
+from aio.db import transaction
+
+
+class AsyncPostgresStorage(Storage, SlidingWindowCounterSupport):
+    """ratelimit_storage.PostgresStorage on the async pool"""
+
+    STORAGE_SCHEME = ["async+postgresql+pool"]
+
+    @property
+    def base_exceptions(self):
+        return psycopg.Error
+
+    async def _fetchone(self, query, params=None):
+        async with transaction() as cur:
+            await cur.execute(query, params)
+            return await cur.fetchone()
+
+    async def _execute(self, query, params=None):
+        async with transaction() as cur:
+            await cur.execute(query, params)
+            return cur.rowcount
+
+    async def incr(self, key, expiry, amount=1):
+        return (await self._fetchone(INCR, {"key": key, "expiry": expiry, "amount": amount}))[0]
+
+    async def get(self, key):
+        row = await self._fetchone(GET, {"key": key})
+        return row[0] if row else 0
+
+    async def get_expiry(self, key):
+        row = await self._fetchone(GET_EXPIRY, {"key": key})
+        return float(row[0]) if row else time.time()
+
+    async def check(self):
+        try:
+            return await self._fetchone("SELECT 1;") == (1,)
+        except (psycopg.Error, RuntimeError):
+            return False
+
+    async def reset(self):
+        return await self._execute(RESET)
+
+    async def clear(self, key):
+        await self._execute(CLEAR, {"key": key})
+
+    async def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        params = {"key": key, "limit": limit, "amount": amount, **sliding_window(expiry, time.time())}
+        return await self._fetchone(ACQUIRE_SLIDING_WINDOW, params) is not None
+
+    async def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_count, current_count = await self._fetchone(
+            SLIDING_WINDOW_COUNTS, {"key": key, **sliding_window(expiry, now)})
+        return sliding_window_info(expiry, now, previous_count, current_count)
+
+    async def clear_sliding_window(self, key, expiry):
+        await self._execute(CLEAR_SLIDING_WINDOW, {"key": key, **sliding_window(expiry, time.time())})
+
+
+class RateLimiter:
+    def __init__(self, default="15 per minute"):
+        self.default = default
+        self.enabled = True
+        self._strategy = STRATEGIES["fixed-window"](MemoryStorage())
+        self._fallback = None
+
+    def init_app(self, app):
+        self.default = app.config.get("RATELIMIT_DEFAULT", self.default)
+        self.enabled = app.config.get("RATELIMIT_ENABLED", self.enabled)
+
+        # Same settings as Flask-Limiter; "postgresql+pool://" -> "async+postgresql+pool://"
+        uri = app.config.get("RATELIMIT_STORAGE_URI", "memory://")
+        strategy = STRATEGIES[app.config.get("RATELIMIT_STRATEGY", "fixed-window")]
+        self._strategy = strategy(storage_from_string(uri if uri.startswith("async+") else f"async+{uri}"))
+        if app.config.get("RATELIMIT_IN_MEMORY_FALLBACK_ENABLED", False):
+            self._fallback = strategy(MemoryStorage())
+
+        app.before_request(self._check)
+
+    def limit(self, value):
+        """Route specific limit, replacing the default (same strings as Flask-Limiter)"""
+        def decorator(view):
+            view._rate_limit = value
+            return view
+        return decorator
+
+    def exempt(self, view):
+        """No limit at all for this route (Flask-Limiter's limiter.exempt)"""
+        view._rate_limit_exempt = True
+        return view
+
+    async def _hit(self, item, identifiers):
+        """Hit the shared storage, or this process's counters while it is unreachable"""
+        try:
+            return self._strategy, await self._strategy.hit(item, *identifiers)
+        except (psycopg.Error, RuntimeError):
+            if self._fallback is None:
+                raise
+            current_app.logger.warning("Rate limit storage unreachable - using in-memory counters")
+            return self._fallback, await self._fallback.hit(item, *identifiers)
+
+    async def _check(self):
+        if not self.enabled or request.method == "OPTIONS":
+            return None
+
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, "_rate_limit_exempt", False):
+            return None
+
+        item = parse(getattr(view, "_rate_limit", self.default))
+        # Flask-Limiter's key order, so both apps count against the same rows
+        identifiers = (request.remote_addr or "unknown", request.endpoint)
+        strategy, allowed = await self._hit(item, identifiers)
+        if allowed:
+            return None
+
+        stats = await strategy.get_window_stats(item, *identifiers)
+        response = jsonify({"error": f"Rate limit exceeded: {item}"})
+        response.headers["Retry-After"] = str(max(int(stats.reset_time - time.time()), 1))
+        return response, 429
+
+
+# Global rate limiter for the ASGI app
+limiter = RateLimiter()
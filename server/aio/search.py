@@ -0,0 +1,34 @@
+"""Async /search route (same contract as search/routes.py)"""
+from quart import Blueprint, current_app, jsonify, request
+from search.query import SET_SIMILARITY_THRESHOLD, page_results, parse_search_args, search_params, search_query
+from aio.db import transaction
+from aio.ratelimit import limiter
+from aio.tokens import get_jwt_identity, jwt_required
+
+search_bp = Blueprint('search', __name__, url_prefix='/search')
+
+
+@search_bp.route('', methods=['GET'])
+@jwt_required()
+@limiter.limit("120 per minute")
+async def search():
+    user_id = get_jwt_identity()
+
+    try:
+        q, types, offset, limit = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            await cur.execute(SET_SIMILARITY_THRESHOLD, (str(current_app.config["SEARCH_SIMILARITY_THRESHOLD"]),))
+            await cur.execute(search_query(types), search_params(user_id, q, offset, limit))
+            rows = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    results, next_offset = page_results(rows, offset, limit)
+    response = jsonify(results)
+    if next_offset is not None:
+        response.headers["X-Next-Cursor"] = str(next_offset)
+    return response
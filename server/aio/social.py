@@ -0,0 +1,170 @@
+"""Async /social routes (same contract as social_links/routes.py)"""
+from quart import Blueprint, request, jsonify
+from repository import FORBIDDEN, NOT_FOUND
+from social_links.batch import DELETE_LINKS, batch_results, delete_ids, parse_batch, prepare_additions
+from social_links.mappers import SOCIAL_LINK
+from utils.pagination import keyset_query, page_response, parse_page_args, wants_ndjson
+from utils.etag import etag_headers, is_not_modified
+from aio.db import current_etag, delete_owned, transaction, update_owned
+from aio.pagination import stream_ndjson
+from aio.tokens import get_jwt_identity, jwt_required
+
+social_bp = Blueprint('social_links', __name__, url_prefix='/social')
+
+
+@social_bp.route('/add', methods=['POST'])
+@jwt_required()
+async def add_social_link():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    platform_name = data.get('platform_name')
+    username = data.get('username')
+    profile_link = data.get('profile_link')
+
+    if not user_id or not platform_name or not profile_link:
+        return jsonify({"error": "Missing fields"}), 400
+
+    if not profile_link.startswith(('http://', 'https://')):
+        profile_link = 'https://' + profile_link
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(f"""
+                INSERT INTO social_links (user_id, platform_name, username, profile_link)
+                VALUES (%s, %s, %s, %s)
+                RETURNING {SOCIAL_LINK.columns}
+            """, (user_id, platform_name, username, profile_link))
+            new_link = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(SOCIAL_LINK(new_link)), 201
+
+
+@social_bp.route('/batch', methods=['POST'])
+@jwt_required()
+async def batch_social_links():
+    user_id = get_jwt_identity()
+
+    try:
+        additions, deletions = parse_batch(await request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    add_results, new_rows = prepare_additions(additions)
+    ids_to_delete = delete_ids(deletions)
+
+    try:
+        async with transaction() as cur:
+            deleted = set()
+            if ids_to_delete:
+                await cur.execute(DELETE_LINKS, (user_id, ids_to_delete))
+                deleted = {row[0] for row in await cur.fetchall()}
+
+            inserted = []
+            if new_rows:
+                # One statement over parallel arrays; batch_results matches the returned rows by value
+                platforms, usernames, links = (list(column) for column in zip(*new_rows))
+                await cur.execute("""
+                    INSERT INTO social_links (user_id, platform_name, username, profile_link)
+                    SELECT %s, platform_name, username, profile_link
+                    FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[]) AS t(platform_name, username, profile_link)
+                    RETURNING id, platform_name, username, profile_link
+                """, (user_id, platforms, usernames, links))
+                inserted = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(batch_results(add_results, inserted, deletions, deleted)), 200
+
+
+@social_bp.route('/get-social', methods=['GET'])
+@jwt_required()
+async def get_social_links():
+    user_id = get_jwt_identity()
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    streaming = wants_ndjson(request)
+    query, params = keyset_query(f"""
+                SELECT {SOCIAL_LINK.columns}
+                FROM social_links
+                WHERE user_id=%s
+            """, (user_id,), after, limit, lookahead=not streaming)
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            etag = await current_etag(cur, request, user_id, "social")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            if not streaming:
+                await cur.execute(query, params)
+                rows = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if streaming:
+        response = stream_ndjson(query, params, SOCIAL_LINK)
+    else:
+        response = page_response(list(map(SOCIAL_LINK, rows)), limit, jsonify)
+
+    response.headers.update(etag_headers(etag))
+    return response
+
+
+@social_bp.route('/delete/<int:link_id>', methods=['DELETE'])
+@jwt_required()
+async def delete_social_link(link_id):
+    user_id = get_jwt_identity()
+
+    try:
+        async with transaction() as cur:
+            outcome, _ = await delete_owned(cur, "social_links", link_id, user_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Social link not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to delete this link"}), 403
+
+    return jsonify({"message": "Social link deleted!"})
+
+
+@social_bp.route('/update/<int:link_id>', methods=['POST'])
+@jwt_required()
+async def update_social_link(link_id):
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    platform_name = data.get('platform_name')
+    username = data.get('username')
+    profile_link = data.get('profile_link')
+
+    if not platform_name or not profile_link:
+        return jsonify({"error": "Platform name and profile link are required"}), 400
+
+    if not profile_link.startswith(('http://', 'https://')):
+        profile_link = 'https://' + profile_link
+
+    try:
+        async with transaction() as cur:
+            outcome, _ = await update_owned(cur, "social_links", link_id, user_id, {
+                "platform_name": platform_name,
+                "username": username,
+                "profile_link": profile_link,
+            })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Social link not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to update this link"}), 403
+
+    return jsonify({"message": "Social link updated!"})
@@ -0,0 +1,102 @@
+"""
+JWT issuing and verification for the ASGI app.
+
+Tokens have the same claims, signing key and algorithm as the ones
+flask_jwt_extended issues, so a token from either server works on the other.
+Errors use flask_jwt_extended's {"msg": ...} bodies and status codes.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import jwt
+from quart import current_app, g, jsonify, request
+from auth.revocation import revocation_cache
+from aio.db import jti_is_blocklisted
+
+ALGORITHM = "HS256"
+
+
+def _expires(setting):
+    value = current_app.config[setting]
+    return value if isinstance(value, timedelta) else timedelta(seconds=value)
+
+
+def _encode(identity, token_type, expires_delta, fresh=False):
+    now = datetime.now(timezone.utc)
+    claims = {
+        "fresh": fresh,
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "type": token_type,
+        "sub": identity,
+        "nbf": now,
+        "exp": now + expires_delta,
+    }
+    return jwt.encode(claims, current_app.config["JWT_SECRET_KEY"], ALGORITHM)
+
+
+def create_access_token(identity, fresh=False):
+    return _encode(identity, "access", _expires("JWT_ACCESS_TOKEN_EXPIRES"), fresh)
+
+
+def create_refresh_token(identity):
+    return _encode(identity, "refresh", _expires("JWT_REFRESH_TOKEN_EXPIRES"))
+
+
+class TokenError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def _token_from_header():
+    auth_header = request.headers.get("Authorization", "").strip().strip(",")
+    if not auth_header:
+        raise TokenError("Missing Authorization Header", 401)
+
+    parts = auth_header.split()
+    if len(parts) != 2 or parts[0] != "Bearer":
+        raise TokenError("Bad Authorization header. Expected 'Authorization: Bearer <JWT>'", 422)
+    return parts[1]
+
+
+async def _verify(refresh):
+    try:
+        claims = jwt.decode(_token_from_header(), current_app.config["JWT_SECRET_KEY"], algorithms=[ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise TokenError("Token has expired", 401)
+    except jwt.InvalidTokenError as e:
+        raise TokenError(str(e), 422)
+
+    token_type = claims.get("type", "access")
+    if refresh and token_type != "refresh":
+        raise TokenError("Only refresh tokens are allowed", 422)
+    if not refresh and token_type == "refresh":
+        raise TokenError("Only non-refresh tokens are allowed", 422)
+
+    if await revocation_cache.is_revoked_async(claims.get("jti"), claims.get("exp"), jti_is_blocklisted):
+        raise TokenError("Token has been revoked", 401)
+
+    return claims
+
+
+def jwt_required(refresh=False):
+    """Async counterpart of flask_jwt_extended.jwt_required for Quart views"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                g.jwt_claims = await _verify(refresh)
+            except TokenError as e:
+                return jsonify({"msg": str(e)}), e.status
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_jwt():
+    return g.jwt_claims
+
+
+def get_jwt_identity():
+    return g.jwt_claims["sub"]
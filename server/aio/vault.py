@@ -0,0 +1,366 @@
+"""Async /vault routes (same contract as vault/routes.py); Fernet work runs in worker threads"""
+import asyncio
+import psycopg
+from quart import Blueprint, current_app, request, jsonify
+from extensions import hashing_pool
+from vault.mappers import (
+    MAX_REVEAL_BATCH, REVEALED_SECRET, VAULT_ENTRY, VAULT_SECRET, decrypt_secret, encrypt_secret,
+)
+from vault.unlock import issue_unlock_grant, verify_unlock_grant
+from vault.transfer import (
+    COPY_IMPORT, CREATE_IMPORT_TABLE, EXPORT_COLUMNS, MAX_IMPORT_ROWS, MERGE_IMPORT,
+    csv_line, parse_import_body, parse_import_upload, stage_import,
+)
+from utils.pagination import keyset_query, page_response, parse_page_args, wants_ndjson
+from repository import FORBIDDEN, NOT_FOUND
+from utils.etag import etag_headers, is_not_modified
+from aio.db import current_etag, delete_owned, transaction, update_owned
+from aio.pagination import stream_ndjson, stream_rows
+from aio.ratelimit import limiter
+from aio.tokens import get_jwt, get_jwt_identity, jwt_required
+
+vault_bp = Blueprint('vault', __name__, url_prefix='/vault')
+
+
+async def _check_vault_password(user_id, vault_password):
+    """Verify the vault password; the bcrypt check runs after the connection is returned"""
+    async with transaction() as cur:
+        await cur.execute("SELECT vault_password FROM vault_passwords WHERE user_id=%s", (user_id,))
+        result = await cur.fetchone()
+
+    return result is not None and await hashing_pool.check_password_async(result[0], vault_password)
+
+
+async def _authorize_vault_access(user_id, data):
+    """Accept either a valid unlock grant or the vault password itself"""
+    unlock_token = data.get('unlock_token')
+    if unlock_token and verify_unlock_grant(unlock_token, user_id, get_jwt()['jti'], current_app.config):
+        return True
+
+    vault_password = data.get('vault_password')
+    return bool(vault_password) and await _check_vault_password(user_id, vault_password)
+
+
+@vault_bp.route('/set_password', methods=['POST'])
+@jwt_required()
+@limiter.limit("2 per minute")
+async def set_vault_password():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    vault_password = data.get('vault_password')
+
+    if not user_id or not vault_password:
+        return jsonify({"error": "user_id and vault_password required"}), 400
+
+    hashed_password = await hashing_pool.hash_password_async(vault_password)
+
+    try:
+        async with transaction() as cur:
+            await cur.execute("""
+                INSERT INTO vault_passwords (user_id, vault_password)
+                VALUES (%s, %s)
+                ON CONFLICT (user_id)
+                DO UPDATE SET vault_password = EXCLUDED.vault_password;
+            """, (user_id, hashed_password))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "Vault password set/updated!"})
+
+
+@vault_bp.route('/add', methods=['POST'])
+@jwt_required()
+async def add_vault_entry():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    domain = data.get('domain')
+    account_name = data.get('account_name')
+    pin_or_password = data.get('pin_or_password')
+    url = data.get('url')
+    notes = data.get('notes')
+
+    if not user_id or not domain or not account_name or not pin_or_password:
+        return jsonify({"error": "All fields required"}), 400
+
+    encrypted_pwd = await asyncio.to_thread(encrypt_secret, pin_or_password)
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(f"""
+                INSERT INTO vault (user_id, domain, account_name, pin_or_password, url, notes)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (user_id, domain)
+                DO UPDATE SET
+                    account_name = EXCLUDED.account_name,
+                    pin_or_password = EXCLUDED.pin_or_password,
+                    url = EXCLUDED.url,
+                    notes = EXCLUDED.notes
+                RETURNING {VAULT_ENTRY.columns};
+            """, (user_id, domain, account_name, encrypted_pwd, url, notes))
+            new_entry = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "Vault entry added/updated!", "entry": VAULT_ENTRY(new_entry)}), 201
+
+
+@vault_bp.route('/get-vault', methods=['GET'])
+@jwt_required()
+async def get_vault_entries():
+    user_id = get_jwt_identity()
+
+    try:
+        after, limit = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    streaming = wants_ndjson(request)
+    query, params = keyset_query(f"""
+        SELECT {VAULT_ENTRY.columns} FROM vault WHERE user_id=%s
+    """, (user_id,), after, limit, lookahead=not streaming)
+
+    try:
+        async with transaction(readonly=True, user_id=user_id) as cur:
+            etag = await current_etag(cur, request, user_id, "vault")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            if not streaming:
+                await cur.execute(query, params)
+                rows = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if streaming:
+        response = stream_ndjson(query, params, VAULT_ENTRY)
+    else:
+        entries = list(map(VAULT_ENTRY, rows))
+        response = page_response(entries, limit, jsonify)
+
+    response.headers.update(etag_headers(etag))
+    return response
+
+
+@vault_bp.route('/reveal', methods=['POST'])
+@jwt_required()
+async def reveal_vault_entries():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    entry_ids = data.get('entry_ids')
+
+    if not (data.get('unlock_token') or data.get('vault_password')) or not isinstance(entry_ids, list) or not entry_ids:
+        return jsonify({"error": "unlock_token or vault_password, and entry_ids required"}), 400
+
+    if len(entry_ids) > MAX_REVEAL_BATCH:
+        return jsonify({"error": f"At most {MAX_REVEAL_BATCH} entries can be revealed at once"}), 400
+
+    try:
+        entry_ids = [int(entry_id) for entry_id in entry_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "entry_ids must be integers"}), 400
+
+    try:
+        if not await _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(f"SELECT {REVEALED_SECRET.columns} FROM vault WHERE user_id=%s AND id = ANY(%s)",
+                              (user_id, entry_ids))
+            rows = await cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    entries = await asyncio.to_thread(lambda: list(map(REVEALED_SECRET, rows)))
+    found = {entry["id"] for entry in entries}
+
+    return jsonify({
+        "entries": entries,
+        "missing": [entry_id for entry_id in entry_ids if entry_id not in found],
+    })
+
+
+@vault_bp.route('/import', methods=['POST'])
+@jwt_required()
+@limiter.limit("5 per minute")
+async def import_vault_entries():
+    user_id = get_jwt_identity()
+
+    try:
+        upload = (await request.files).get("file")
+        if upload is not None:
+            raw_entries = await asyncio.to_thread(parse_import_upload, upload.read(), upload.filename)
+        else:
+            body = await request.get_data(as_text=True)
+            raw_entries = await asyncio.to_thread(parse_import_body, body, request.mimetype)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not raw_entries:
+        return jsonify({"error": "No entries to import"}), 400
+
+    if len(raw_entries) > MAX_IMPORT_ROWS:
+        return jsonify({"error": f"At most {MAX_IMPORT_ROWS} entries can be imported at once"}), 400
+
+    staged, accepted, errors = await asyncio.to_thread(stage_import, raw_entries, encrypt_secret)
+
+    inserted = updated = 0
+    if accepted:
+        try:
+            async with transaction() as cur:
+                await cur.execute(CREATE_IMPORT_TABLE)
+                async with cur.copy(COPY_IMPORT) as copy:
+                    await copy.write(staged.getvalue())
+                await cur.execute(MERGE_IMPORT, (user_id,))
+                results = [r[0] for r in await cur.fetchall()]
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+
+        inserted = sum(results)
+        updated = len(results) - inserted
+
+    return jsonify({
+        "message": "Vault import finished",
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": errors,
+    }), 200
+
+
+@vault_bp.route('/export', methods=['POST'])
+@jwt_required()
+@limiter.limit("5 per minute")
+async def export_vault_entries():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    export_format = data.get('format', 'csv')
+
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    try:
+        if not await _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = f"SELECT {VAULT_SECRET.columns} FROM vault WHERE user_id=%s ORDER BY id"
+
+    def decrypt_row(r):
+        return [r[0], r[1], decrypt_secret(r[2]), r[3], r[4]]
+
+    if export_format == 'ndjson':
+        return stream_ndjson(query, (user_id,), VAULT_SECRET)
+
+    return stream_rows(
+        query, (user_id,),
+        lambda r: csv_line(decrypt_row(r)),
+        "text/csv",
+        preamble=csv_line(EXPORT_COLUMNS),
+        headers={"Content-Disposition": "attachment; filename=vault-export.csv"},
+    )
+
+
+@vault_bp.route('/unlock-vault', methods=['POST'])
+@jwt_required()
+async def unlock_vault():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    vault_password = data.get('vault_password')
+
+    if not vault_password:
+        return jsonify({"error": "Vault password is required"}), 400
+
+    try:
+        if not await _check_vault_password(user_id, vault_password):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "message": "vault unlocked",
+        "unlock_token": issue_unlock_grant(user_id, get_jwt()['jti'], current_app.config),
+        "expires_in": current_app.config["VAULT_UNLOCK_TTL"],
+    }), 200
+
+
+@vault_bp.route('/view', methods=['POST'])
+@jwt_required()
+async def view_vault_password():
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    entry_id = data.get('entry_id')
+
+    if not user_id or not (data.get('unlock_token') or data.get('vault_password')) or not entry_id:
+        return jsonify({"error": "Missing fields"}), 400
+
+    try:
+        if not await _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        async with transaction() as cur:
+            await cur.execute(f"SELECT {VAULT_SECRET.columns} FROM vault WHERE id=%s AND user_id=%s",
+                              (entry_id, user_id))
+            entry = await cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not entry:
+        return jsonify({"error": "No entry found"}), 404
+
+    return jsonify(await asyncio.to_thread(VAULT_SECRET, entry))
+
+
+@vault_bp.route('/delete/<int:entry_id>', methods=['DELETE'])
+@jwt_required()
+async def delete_vault_entry(entry_id):
+    user_id = get_jwt_identity()
+
+    try:
+        async with transaction() as cur:
+            outcome, _ = await delete_owned(cur, "vault", entry_id, user_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Vault entry not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to delete this entry"}), 403
+
+    return jsonify({"message": "Vault entry deleted!"})
+
+
+@vault_bp.route('/update/<int:entry_id>', methods=['POST'])
+@jwt_required()
+async def update_vault_entry(entry_id):
+    user_id = get_jwt_identity()
+    data = await request.get_json(silent=True) or {}
+    pin_or_password = data.get('pin_or_password')
+
+    values = {
+        "domain": data.get('domain'),
+        "account_name": data.get('account_name'),
+        "pin_or_password": await asyncio.to_thread(encrypt_secret, pin_or_password) if pin_or_password else None,
+        "url": data.get('url'),
+        "notes": data.get('notes'),
+    }
+
+    try:
+        async with transaction() as cur:
+            outcome, _ = await update_owned(cur, "vault", entry_id, user_id, values)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Vault entry not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to update this entry"}), 403
+
+    return jsonify({"message": "Vault entry updated!"})
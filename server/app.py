@@ -1,17 +1,30 @@
 from flask import Flask
 import os
 from dotenv import load_dotenv
-from flask import request
+from flask import request, jsonify, Response
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from extensions import limiter
+from flask_jwt_extended import JWTManager, get_jwt_identity
+from extensions import limiter, hashing_pool, health_monitor, media_store
+from hashing import HashingUnavailable
+from auth.revocation import revocation_cache
 from werkzeug.middleware.proxy_fix import ProxyFix
-from db_setup import initialize_connection_pool, initialize_database_and_create_tables
 from config import DevConfig, ProdConfig
+from utils.headers import set_security_headers
+from db_setup import (
+    READ_YOUR_WRITES_HEADER, SAFE_METHODS, begin_request_routing, pool_stats, replica_pool_stats, stick_to_primary,
+)
+import metrics
+from json_provider import fast_json_provider
+from startup import start_worker
 
 load_dotenv()
 
 def create_app():
+    """
+    Build the app without connecting to anything, so a pre-fork server can import it
+    in its master. Each worker process starts its pool and threads with
+    startup.start_worker (gunicorn.conf.py), or on its first request otherwise.
+    """
     app = Flask(__name__)
 
     if os.getenv("FLASK_ENV") == "production":
@@ -24,9 +37,73 @@ def create_app():
             app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1
         )
 
+    # Registered first: nothing else may touch the pool before this process has one
+    @app.before_request
+    def start_this_worker():
+        start_worker(app)
+
     # Global JWT manager instance
     jwt = JWTManager(app)
 
+    # Enforce token revocation on every @jwt_required() route
+    revocation_cache.init_app(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return revocation_cache.is_revoked(jwt_payload["jti"], jwt_payload["exp"])
+
+    # bcrypt runs in a bounded process pool; shed load with a 503 when it's saturated
+    hashing_pool.init_app(app)
+
+    @app.errorhandler(HashingUnavailable)
+    def hashing_unavailable(e):
+        response = jsonify({"error": "Server is busy, please try again shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    # Profile picture storage; thumbnails render on background threads
+    media_store.init_app(app)
+
+    # Probes read a verdict cached by the pool keepalive thread (health.py)
+    health_monitor.init_app(app)
+
+    # Per-request timing spans (db / pool_wait / crypto / serialization), exported on /metrics.
+    # Registered before the limiter so its storage round trip is part of the request time.
+    # Bodies are encoded with orjson when it is installed (json_provider.py).
+    app.json = metrics.timed_json_provider(fast_json_provider(type(app.json)))(app)
+    app.before_request(metrics.begin_request)
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics.end_request(request.method, request.endpoint, response.status_code)
+        return response
+
+    # Read-your-writes: after a user's successful write, their reads skip the replicas for a
+    # while, on any worker that sees the window echoed back (db_setup.READ_YOUR_WRITES_HEADER)
+    @app.before_request
+    def route_reads():
+        begin_request_routing(request.headers.get(READ_YOUR_WRITES_HEADER))
+
+    @app.after_request
+    def stick_writers_to_primary(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            try:
+                until = stick_to_primary(get_jwt_identity())
+            except RuntimeError:
+                until = None  # no verified JWT on this request (sign-up, sign-in)
+            if until:
+                response.headers[READ_YOUR_WRITES_HEADER] = until
+        return response
+
+    @app.route('/metrics')
+    @limiter.exempt
+    def prometheus_metrics():
+        if not metrics.scrape_allowed(request.headers.get("Authorization"), app.config["METRICS_TOKEN"]):
+            return jsonify({"error": "Unauthorized"}), 401
+        body = metrics.render({"db_pool": pool_stats(), **replica_pool_stats(), "hashing_pool": hashing_pool.stats(),
+                               "media_store": media_store.stats()})
+        return Response(body, content_type=metrics.CONTENT_TYPE)
+
     # Global config for rate limiter
     limiter.init_app(app=app)
 
@@ -49,65 +126,39 @@ def create_app():
     from social_links.routes import social_bp
     from vault.routes import vault_bp
     from utils.routes import api_bp
+    from search.routes import search_bp
+    from media.routes import media_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(personal_bp)
     app.register_blueprint(social_bp)
     app.register_blueprint(vault_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(media_bp)
 
     # Security headers configuration
-    @app.after_request
-    def set_security_headers(response):
-        env = os.getenv("FLASK_ENV", "production")
-        frontend = os.getenv("PROD_FRONTEND_ORIGIN", "")
-
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-
-        # ---- Development CSP ----
-        if env == "development":
-            csp = (
-                "default-src 'self'; "
-                "script-src 'self' 'unsafe-inline' 'unsafe-eval' http://localhost:5173; "
-                "style-src 'self' 'unsafe-inline' http://localhost:5173; "
-                "img-src 'self' data:; "
-                "font-src 'self'; "
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self'"
-            )
-        
-        # ---- Production CSP ----
-        else:
-            csp = (
-                "default-src 'self'; "
-                f"script-src 'self' {frontend}; "
-                f"style-src 'self' 'unsafe-inline' {frontend}; "
-                "img-src 'self' data:; "
-                "font-src 'self'; "
-                "object-src 'none'; "
-                "base-uri 'self'; "
-                "form-action 'self'"
-            )
-
-        response.headers["Content-Security-Policy"] = csp
+    app.after_request(set_security_headers)
 
-        return response
+    @app.route('/')
+    def home():
+        return "Welcome to primer backend!"
+
+    @app.route('/healthz', methods=['HEAD', 'GET'])
+    @limiter.exempt
+    def healthz():
+        return jsonify({"status": "ok"}), 200
+
+    @app.route('/readyz', methods=['HEAD', 'GET'])
+    @limiter.exempt
+    def readyz():
+        ready, body = health_monitor.verdict()
+        return jsonify(body), 200 if ready else 503
 
     return app
 
 app = create_app()
 
-with app.app_context():
-    initialize_connection_pool()
-    initialize_database_and_create_tables()
-    
-@app.route('/')
-def home():
-    return "Welcome to primer backend!"
-
 if __name__ == "__main__":
-    
+    start_worker(app)
     app.run(debug=app.config["DEBUG"], host="localhost", port=5000)
-
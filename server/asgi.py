@@ -0,0 +1,17 @@
+"""
+ASGI entry point for the async serving mode:
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+
+The WSGI app in app.py (gunicorn app:app) remains the default.
+"""
+from hypercorn.middleware import ProxyFixMiddleware
+from aio import create_async_app
+
+quart_app = create_async_app()
+
+# Trust one proxy hop for client address/scheme, as ProxyFix does for the WSGI app
+app = ProxyFixMiddleware(quart_app, mode="legacy", trusted_hops=1)
+
+if __name__ == "__main__":
+    quart_app.run(debug=quart_app.config["DEBUG"], host="localhost", port=5000)
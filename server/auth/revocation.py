@@ -0,0 +1,218 @@
+"""In-process JWT revocation cache backed by the token_blocklist table"""
+import datetime
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from repository import transaction
+
+_LN2 = math.log(2)
+
+# Shared with the ASGI app, which runs them on its async pool. token_blocklist is
+# partitioned by expires_at (the token's exp claim), so a lookup bounded by the exp
+# skips the partitions of earlier days. >= rather than =: rows copied from the
+# unpartitioned table (migration 0007) carry an estimated expires_at, revoked_at plus
+# the longest token lifetime, which is never before the token's real exp.
+LOOKUP_JTI = "SELECT 1 FROM token_blocklist WHERE jti=%s AND expires_at >= to_timestamp(%s) LIMIT 1;"
+LOAD_BLOCKLIST = "SELECT jti, revoked_at FROM token_blocklist WHERE expires_at > now();"
+# Called with the watermark minus RevocationCache.overlap_seconds (see _refresh_plan)
+LOAD_BLOCKLIST_SINCE = "SELECT jti, revoked_at FROM token_blocklist WHERE expires_at > now() AND revoked_at >= %s;"
+# The partition for the token's expiry day normally exists already (jobs/token_blocklist.py);
+# ensuring it first means a revocation never fails when it doesn't
+ENSURE_BLOCKLIST_PARTITION = "SELECT token_blocklist_ensure_partition(to_timestamp(%s));"
+INSERT_BLOCKLIST = """
+    INSERT INTO token_blocklist (jti, token_type, user_id, revoked_at, expires_at)
+    VALUES (%s, %s, %s, %s, to_timestamp(%s)) ON CONFLICT DO NOTHING;
+"""
+
+
+class BloomFilter:
+    """Fixed size bloom filter over jti strings (no false negatives)"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        # Standard sizing: m = -n*ln(p)/ln(2)^2 bits, k = m/n*ln(2) hashes
+        self.capacity = max(int(capacity), 1)
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (_LN2 * _LN2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * _LN2)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def saturated(self):
+        return self.count > self.capacity
+
+
+class RevocationCache:
+    """
+    Answers "is this jti revoked?" without a database round trip in the common case.
+
+    - A bloom filter holds every revoked jti loaded from token_blocklist. A miss
+      means the token is definitely not revoked.
+    - A bloom hit may be a false positive, so it is confirmed with a primary key
+      lookup and the verdict is remembered in a bounded LRU.
+    - The filter is topped up incrementally from revoked_at every refresh interval,
+      which is how revocations made by other workers become visible. revoked_at is
+      taken by the app before its INSERT commits, so a row can become visible after
+      later timestamps were loaded; each top-up re-reads overlap_seconds before the
+      watermark to catch those.
+    """
+
+    def __init__(self, lru_size=10000, bloom_capacity=100000, refresh_seconds=5, overlap_seconds=60):
+        self.lru_size = lru_size
+        self.bloom_capacity = bloom_capacity
+        self.refresh_seconds = refresh_seconds
+        self.overlap_seconds = overlap_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._bloom = None
+        self._watermark = None
+        self._refreshed_at = 0.0
+
+    def init_app(self, app):
+        """Read cache sizing from the app config"""
+        self.lru_size = app.config.get("REVOCATION_LRU_SIZE", self.lru_size)
+        self.bloom_capacity = app.config.get("REVOCATION_BLOOM_CAPACITY", self.bloom_capacity)
+        self.refresh_seconds = app.config.get("REVOCATION_REFRESH_SECONDS", self.refresh_seconds)
+        self.overlap_seconds = app.config.get("REVOCATION_REFRESH_OVERLAP_SECONDS", self.overlap_seconds)
+
+    def is_revoked(self, jti, expires):
+        """Check a jti (with its token's exp claim), consulting the database only for bloom filter hits"""
+        self._refresh_if_stale()
+
+        revoked = self._cached_verdict(jti)
+        if revoked is None:
+            revoked = _lookup_jti(jti, expires)
+            self._remember(jti, revoked)
+        return revoked
+
+    async def is_revoked_async(self, jti, expires, lookup):
+        """
+        is_revoked for the ASGI app, where `lookup(jti, expires)` is a coroutine
+        function confirming a bloom hit. The filter is kept fresh by refresh_async().
+        """
+        revoked = self._cached_verdict(jti)
+        if revoked is None:
+            revoked = await lookup(jti, expires)
+            self._remember(jti, revoked)
+        return revoked
+
+    def refresh(self):
+        """Load or top up the filter now rather than on the next stale check (worker warm-up)"""
+        with self._refresh_lock:
+            full_reload, watermark = self._refresh_plan()
+            self._apply_refresh(_load_blocklist(since=watermark), full_reload)
+
+    async def refresh_async(self, load_blocklist):
+        """Top up the filter from `load_blocklist(since=...)`, a coroutine function"""
+        full_reload, watermark = self._refresh_plan()
+        self._apply_refresh(await load_blocklist(since=watermark), full_reload)
+
+    def revoke(self, jti):
+        """Record a revocation made by this process so it takes effect immediately"""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+        self._remember(jti, True)
+
+    def _cached_verdict(self, jti):
+        """True/False when answerable in memory, None when a bloom hit needs confirming"""
+        with self._lock:
+            if jti in self._lru:
+                self._lru.move_to_end(jti)
+                return self._lru[jti]
+            maybe_revoked = jti in self._bloom
+
+        if maybe_revoked:
+            return None
+        self._remember(jti, False)
+        return False
+
+    def _remember(self, jti, revoked):
+        with self._lock:
+            self._lru[jti] = revoked
+            self._lru.move_to_end(jti)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _refresh_if_stale(self):
+        if time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+
+        # Only one thread refreshes; the rest keep answering from the current
+        # filter unless there is no filter yet and they have to wait for it.
+        if not self._refresh_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self):
+        if self._bloom is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+
+        full_reload, watermark = self._refresh_plan()
+        self._apply_refresh(_load_blocklist(since=watermark), full_reload)
+
+    def _refresh_plan(self):
+        """(full_reload, watermark) for the next load of token_blocklist"""
+        with self._lock:
+            full_reload = self._bloom is None or self._bloom.saturated
+            if full_reload or self._watermark is None:
+                return full_reload, None
+            return False, self._watermark - datetime.timedelta(seconds=self.overlap_seconds)
+
+    def _apply_refresh(self, rows, full_reload):
+        with self._lock:
+            if full_reload:
+                capacity = max(self.bloom_capacity, len(rows) * 2)
+                self._bloom = BloomFilter(capacity)
+                # Cached "not revoked" verdicts may predate rows we just loaded
+                self._lru.clear()
+
+            for jti, revoked_at in rows:
+                # The overlap re-reads rows; adding them again would fill up the filter
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+                if jti in self._lru:
+                    self._lru[jti] = True
+                if revoked_at and (self._watermark is None or revoked_at > self._watermark):
+                    self._watermark = revoked_at
+
+            self._refreshed_at = time.monotonic()
+
+
+def _lookup_jti(jti, expires):
+    with transaction() as cur:
+        cur.execute(LOOKUP_JTI, (jti, expires))
+        return cur.fetchone() is not None
+
+
+def _load_blocklist(since=None):
+    """Fetch unexpired (jti, revoked_at) rows, optionally only those revoked at or after `since`"""
+    with transaction() as cur:
+        if since is None:
+            cur.execute(LOAD_BLOCKLIST)
+        else:
+            cur.execute(LOAD_BLOCKLIST_SINCE, (since,))
+        return cur.fetchall()
+
+
+# Global revocation cache instance
+revocation_cache = RevocationCache()
@@ -1,9 +1,10 @@
 from flask import Blueprint, request, jsonify
 import psycopg2
-from db_setup import get_db_connection
+from repository import transaction
 import re
 import os
-from extensions import bcrypt, limiter
+from extensions import hashing_pool, health_monitor, limiter
+from auth.revocation import ENSURE_BLOCKLIST_PARTITION, INSERT_BLOCKLIST, revocation_cache
 import datetime
 from flask_jwt_extended import (
     jwt_required,
@@ -31,52 +32,22 @@ def is_valid_email(email):
         return False
     
     
-def is_token_revoked(jti):
-    """Check if the current jti is revoked"""
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT 1 FROM token_blocklist WHERE jti=%s;", (jti,))
-            exists = cur.fetchone() is not None
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
-
-    return exists
-
-
-def add_token_to_blocklist(jti, token_type, user_id=None):
-    """Add a jti to the blocklist table"""
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "INSERT INTO token_blocklist (jti, token_type, user_id, revoked_at) VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING;",
-                (jti, token_type, user_id, datetime.datetime.utcnow())
-            )
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+def add_token_to_blocklist(jti, token_type, expires, user_id=None):
+    """Add a jti to the blocklist table; expires is the token's exp claim"""
+    try:
+        with transaction() as cur:
+            cur.execute(ENSURE_BLOCKLIST_PARTITION, (expires,))
+            cur.execute(INSERT_BLOCKLIST, (jti, token_type, user_id, datetime.datetime.utcnow(), expires))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    revocation_cache.revoke(jti)
 
 @auth_bp.route('/keep-alive', methods=['HEAD','GET'])
 def keep_alive():
-    """Keeps database and production server alive from going idle."""
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT 1")
-        except Exception as e:
-            conn.rollback()
-            return '', 503
-        finally:
-            cur.close()
-            
-    return '', 200
+    """Keeps the production server from going idle; the pool keepalive thread keeps the database awake."""
+    ready, _ = health_monitor.verdict()
+    return '', 200 if ready else 503
 
 
 @auth_bp.route('/signup', methods=['POST'])
@@ -97,25 +68,19 @@ def signup():
     if not is_valid_email(email=email):
         return jsonify({"error": "Invalid Email"}), 400
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = hashing_pool.hash_password(password)
     
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with transaction() as cur:
             cur.execute(
                 "INSERT INTO users (username,email, password) VALUES (%s, %s, %s) RETURNING id;",
                 (username, email, hashed_password)
             )
             user_id = cur.fetchone()[0]
-            conn.commit()
-        except psycopg2.errors.UniqueViolation:
-            conn.rollback()
-            return jsonify({"error": "Username or email already exists"}), 400
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except psycopg2.errors.UniqueViolation:
+        return jsonify({"error": "Username or email already exists"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({"message": "User created!", "user_id": user_id}), 201
   
@@ -131,21 +96,17 @@ def signin():
     if not username or not password:
         return jsonify({"error": "Username and password required"}), 400
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with transaction() as cur:
             cur.execute("SELECT id, password FROM users WHERE username=%s;", (username,))
             user = cur.fetchone()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     if not user:
         return jsonify({"error": "Invalid username or password"}), 401
     user_id, pw_hash = user
-    if not bcrypt.check_password_hash(pw_hash, password):
+    if not hashing_pool.check_password(pw_hash, password):
         return jsonify({"error": "Invalid username or password"}), 401
 
     access_token = create_access_token(identity=str(user_id), fresh=True)
@@ -163,11 +124,8 @@ def signin():
 def refresh_access_token():
     """Use refresh token to get the access token"""
     identity = get_jwt_identity()
-    jti = get_jwt()['jti']
 
-    if is_token_revoked(jti=jti):
-        return jsonify({"message": "Token revoked"}), 401
-    
+    # Revoked refresh tokens are rejected by the JWTManager blocklist loader
     new_access_token = create_access_token(identity=identity)
     response = jsonify({"message" : "Access token refreshed", "access_token": new_access_token})
     
@@ -190,7 +148,7 @@ def logout():
     jti = jwt['jti']
     identity = get_jwt_identity()
 
-    add_token_to_blocklist(jti=jti, token_type="access", user_id=identity)
+    add_token_to_blocklist(jti=jti, token_type="access", expires=jwt['exp'], user_id=identity)
 
     response = jsonify({"message": "Logout successful"})
 
@@ -0,0 +1,200 @@
+"""
+HTTP load driver for every blueprint, against a running server.
+
+    python -m benchmarks.load [--base-url http://127.0.0.1:5000] [--concurrency 16]
+        [--duration 10] [--warmup 2] [--sessions 32] [--scenarios vault.get_vault ...]
+        [--out results.json] [--baseline previous.json]
+
+Seed first with benchmarks.seed. Start the server with RATELIMIT_ENABLED=false,
+or the auth limits will reject the load. The driver signs in --sessions bench
+users. Each scenario then runs on its own for --warmup seconds (not recorded)
+and --duration seconds, on --concurrency threads with keep-alive connections,
+each request made as a random session.
+
+Per scenario it reports throughput, p50/p95/p99 latency and the number of
+errors (anything but 2xx/304). --out writes JSON with the git commit.
+--baseline prints p95 and throughput changes against an earlier file.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+from benchmarks.report import load_results, summarize, write_results
+from benchmarks.seed import BENCH_PASSWORD, USERNAME_PREFIX
+
+
+class Client:
+    """One keep-alive connection; reconnects after a transport error"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._connect = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self._prefix = parts.path.rstrip("/")
+        self._conn = self._connect()
+
+    def request(self, method, path, body=None, token=None):
+        """(status, parsed JSON or None)"""
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self._conn.request(method, self._prefix + path, body=payload, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            self._conn = self._connect()
+            raise
+
+        if response.headers.get("Content-Type", "").startswith("application/json") and data:
+            return response.status, json.loads(data)
+        return response.status, None
+
+
+class Session:
+    """A signed-in bench user plus ids the write/reveal scenarios need"""
+
+    def __init__(self, client, index):
+        self.username = f"{USERNAME_PREFIX}{index}"
+        status, tokens = client.request("POST", "/auth/signin", {"username": self.username, "password": BENCH_PASSWORD})
+        if status != 200:
+            raise RuntimeError(f"signin as {self.username} failed with {status}; is the database seeded "
+                               "and the server running with RATELIMIT_ENABLED=false?")
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens["refresh_token"]
+
+        _, grant = client.request("POST", "/vault/unlock-vault", {"vault_password": BENCH_PASSWORD}, self.access_token)
+        self.unlock_token = (grant or {}).get("unlock_token")
+        _, entries = client.request("GET", "/vault/get-vault?limit=10", token=self.access_token)
+        self.vault_ids = [entry["id"] for entry in entries or []]
+        _, links = client.request("GET", "/social/get-social?limit=10", token=self.access_token)
+        self.link_ids = [link["id"] for link in links or []]
+
+
+# name -> (method, path, body builder or None, token attribute). Writes reuse a
+# small set of keys per user (upserts/updates) so runs leave the tables the same size.
+SCENARIOS = {
+    "auth.signin": ("POST", lambda s: "/auth/signin",
+                    lambda s: {"username": s.username, "password": BENCH_PASSWORD}, None),
+    "auth.me": ("GET", lambda s: "/auth/me", None, "access_token"),
+    "auth.refresh": ("POST", lambda s: "/auth/refresh", None, "refresh_token"),
+    "vault.get_vault": ("GET", lambda s: "/vault/get-vault?limit=50", None, "access_token"),
+    "vault.reveal": ("POST", lambda s: "/vault/reveal",
+                     lambda s: {"unlock_token": s.unlock_token, "entry_ids": s.vault_ids}, "access_token"),
+    "vault.add": ("POST", lambda s: "/vault/add",
+                  lambda s: {"domain": f"load{random.randrange(10)}.example", "account_name": "load",
+                             "pin_or_password": "load-secret"}, "access_token"),
+    "social.get_social": ("GET", lambda s: "/social/get-social?limit=50", None, "access_token"),
+    "social.update": ("POST", lambda s: f"/social/update/{random.choice(s.link_ids or [0])}",
+                      lambda s: {"platform_name": "github", "username": "load",
+                                 "profile_link": f"https://github.example/load{random.randrange(1000)}"},
+                      "access_token"),
+    "personal.me": ("GET", lambda s: "/personal/me", None, "access_token"),
+    "personal.handbook": ("GET", lambda s: "/personal/handbook", None, "access_token"),
+    "personal.handbook_update": ("POST", lambda s: "/personal/handbook/update",
+                                 lambda s: {"field_name": "load_field", "field_value": str(random.random())},
+                                 "access_token"),
+    "api.dashboard": ("GET", lambda s: "/api/dashboard", None, "access_token"),
+}
+
+
+def run_scenario(name, base_url, sessions, concurrency, warmup, duration):
+    method, path, body, token_attribute = SCENARIOS[name]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    started = time.perf_counter()
+    record_from = started + warmup
+    deadline = record_from + duration
+
+    def worker():
+        client = Client(base_url)
+        local_latencies, local_errors = [], 0
+        while True:
+            session = random.choice(sessions)
+            token = getattr(session, token_attribute) if token_attribute else None
+            before = time.perf_counter()
+            if before >= deadline:
+                break
+            try:
+                status, _ = client.request(method, path(session), body(session) if body else None, token)
+                failed = not (200 <= status < 300 or status == 304)
+            except (OSError, http.client.HTTPException):
+                failed = True
+            after = time.perf_counter()
+            if before >= record_from:
+                local_latencies.append(after - before)
+                local_errors += failed
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {"scenario": name, **summarize(latencies, duration), "errors": sum(errors)}
+
+
+def _print_result(result, baseline=None):
+    latency = result["latency_ms"]
+    line = (f"{result['scenario']:<26} {result['throughput_per_second']:>9} req/s  p50 {latency['p50']:>8}ms  "
+            f"p95 {latency['p95']:>8}ms  p99 {latency['p99']:>8}ms  errors {result['errors']}")
+    if baseline:
+        before_p95 = baseline["latency_ms"]["p95"]
+        before_rps = baseline["throughput_per_second"]
+        if before_p95 and before_rps:
+            line += (f"  | p95 {100 * (latency['p95'] - before_p95) / before_p95:+.1f}%"
+                     f"  req/s {100 * (result['throughput_per_second'] - before_rps) / before_rps:+.1f}%")
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--sessions", type=int, default=32, help="bench users to sign in as")
+    parser.add_argument("--users", type=int, default=100000, help="bench users seeded (sessions are drawn from these)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    args = parser.parse_args(argv)
+
+    setup_client = Client(args.base_url)
+    indexes = random.sample(range(args.users), min(args.sessions, args.users))
+    sessions = [Session(setup_client, index) for index in indexes]
+
+    baseline = {}
+    if args.baseline:
+        baseline = {result["scenario"]: result for result in load_results(args.baseline)["results"]}
+
+    results = []
+    for name in args.scenarios:
+        result = run_scenario(name, args.base_url, sessions, args.concurrency, args.warmup, args.duration)
+        results.append(result)
+        _print_result(result, baseline.get(name))
+
+    if args.out:
+        write_results(args.out, {
+            "benchmark": "load",
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "sessions": len(sessions),
+        }, results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
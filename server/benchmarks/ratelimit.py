@@ -0,0 +1,120 @@
+"""
+Rate limit storage throughput and accuracy under contention.
+
+    python -m benchmarks.ratelimit [--storage postgresql+pool:// memory://]
+        [--processes 4] [--threads 8] [--seconds 5] [--keys 1] [--limit "100 per minute"]
+        [--strategy sliding-window-counter] [--json results.json]
+
+Every thread of every process hits the same --keys keys for --seconds, like
+gunicorn workers sharing one client's budget. Reports hits/s, hit latency
+percentiles and how many hits were admitted. With shared storage that is
+`limit` per key; with memory:// each process keeps its own counters and
+admits up to processes x limit.
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+import uuid
+from benchmarks.report import summarize, write_results
+
+
+def _worker(storage_uri, strategy_name, limit, run_id, keys, threads, seconds, results):
+    """One process: `threads` threads hitting the shared keys until the deadline"""
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import STRATEGIES
+    import ratelimit_storage  # noqa: F401 - registers postgresql+pool://
+
+    if storage_uri.startswith("postgresql+pool"):
+        from db_setup import initialize_connection_pool
+        initialize_connection_pool({"DB_POOL_MIN": threads, "DB_POOL_MAX": threads})
+
+    strategy = STRATEGIES[strategy_name](storage_from_string(storage_uri))
+    item = parse(limit)
+    deadline = time.perf_counter() + seconds
+    latencies, admitted = [], []
+    lock = threading.Lock()
+
+    def run(thread_index):
+        local_latencies, local_admitted = [], 0
+        n = thread_index
+        while time.perf_counter() < deadline:
+            key = f"bench/{run_id}/{n % keys}"
+            start = time.perf_counter()
+            allowed = strategy.hit(item, key)
+            local_latencies.append(time.perf_counter() - start)
+            local_admitted += allowed
+            n += 1
+        with lock:
+            latencies.extend(local_latencies)
+            admitted.append(local_admitted)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    results.put({"latencies": latencies, "admitted": sum(admitted)})
+
+
+def run_benchmark(storage_uri, strategy_name, limit, processes, threads, seconds, keys):
+    run_id = uuid.uuid4().hex[:8]
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_worker, args=(
+            storage_uri, strategy_name, limit, run_id, keys, threads, seconds, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    # Drain before join: a child blocks on exit until its queued result is read
+    outcomes = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = [latency for outcome in outcomes for latency in outcome["latencies"]]
+    return {
+        "storage": storage_uri,
+        "strategy": strategy_name,
+        "limit": limit,
+        "processes": processes,
+        "threads": threads,
+        "keys": keys,
+        "seconds": seconds,
+        **summarize(latencies, seconds),
+        "admitted": sum(outcome["admitted"] for outcome in outcomes),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ratelimit", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--storage", nargs="+", default=["postgresql+pool://", "memory://"])
+    parser.add_argument("--strategy", default="sliding-window-counter")
+    parser.add_argument("--limit", default="100 per minute")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--keys", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for storage_uri in args.storage:
+        result = run_benchmark(storage_uri, args.strategy, args.limit, args.processes,
+                               args.threads, args.seconds, args.keys)
+        results.append(result)
+        latency = result["latency_ms"]
+        print(f"{storage_uri:<22} {result['throughput_per_second']:>10} hits/s  "
+              f"p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  "
+              f"admitted {result['admitted']} over {args.keys} key(s) at {args.limit}")
+
+    if args.json:
+        write_results(args.json, {"benchmark": "ratelimit"}, results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+"""Latency summaries and machine-readable result files shared by the benchmarks"""
+import json
+import os
+import statistics
+import subprocess
+import time
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def summarize(latencies, seconds):
+    """Throughput and latency percentiles (ms) for one run"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput_per_second": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def git_commit():
+    """HEAD of the checkout the benchmark ran from, so result files can be lined up with commits"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, meta, results):
+    with open(path, "w") as f:
+        json.dump({"meta": {"commit": git_commit(), "timestamp": time.time(), **meta}, "results": results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,178 @@
+"""
+Synthetic benchmark data, loaded with COPY.
+
+    python -m benchmarks.seed [--users 100000] [--vault 5000000] [--social 1000000]
+        [--handbook 1000000] [--seed 42] [--reset]
+
+Users are bench_<n>. Each has the password BENCH_PASSWORD, which is also
+their vault password, so benchmarks.load can sign in as any of them. Vault,
+social and handbook rows are spread round-robin over the users. --reset first
+deletes earlier bench users; their rows go with them through ON DELETE CASCADE.
+
+Rows are rendered as CSV in chunks and streamed into COPY, so memory use stays
+flat at any size. bcrypt runs once for the shared hash. Fernet runs for a small
+pool of ciphertexts that the vault rows reuse, since the endpoints decrypt any
+of them the same way.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from cryptography.fernet import Fernet
+from flask_bcrypt import generate_password_hash
+from db_setup import initialize_connection_pool
+from repository import transaction
+
+BENCH_PASSWORD = "bench-password-1"
+USERNAME_PREFIX = "bench_"
+
+# Distinct vault ciphertexts; rows cycle through them
+CIPHERTEXT_POOL = 1000
+
+CHUNK_ROWS = 10000
+
+PLATFORMS = ["github", "twitter", "linkedin", "instagram", "mastodon", "youtube", "twitch", "reddit"]
+GENDERS = ["Male", "Female", "Other", ""]
+
+COPY_USERS = "COPY users (username, email, password, full_name, age, gender, address) FROM STDIN WITH (FORMAT csv)"
+COPY_VAULT_PASSWORDS = "COPY vault_passwords (user_id, vault_password) FROM STDIN WITH (FORMAT csv)"
+COPY_VAULT = "COPY vault (user_id, domain, account_name, pin_or_password, url, notes) FROM STDIN WITH (FORMAT csv)"
+COPY_SOCIAL_LINKS = "COPY social_links (user_id, platform_name, username, profile_link) FROM STDIN WITH (FORMAT csv)"
+COPY_HANDBOOK = "COPY personal_handbook (user_id, field_name, field_value) FROM STDIN WITH (FORMAT csv)"
+
+BENCH_USER_IDS = "SELECT id FROM users WHERE username LIKE 'bench\\_%' ORDER BY id;"
+DELETE_BENCH_USERS = "DELETE FROM users WHERE username LIKE 'bench\\_%';"
+
+
+class CopyStream:
+    """Minimal file object for copy_expert: read() hands out CSV chunks as they are rendered"""
+
+    def __init__(self, rows):
+        self._chunks = self._render(rows)
+        self._buffer = b""
+        self._offset = 0
+        self.rows = 0
+
+    def _render(self, rows):
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        for row in rows:
+            writer.writerow(row)
+            self.rows += 1
+            if self.rows % CHUNK_ROWS == 0:
+                yield out.getvalue().encode()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue().encode()
+
+    def read(self, size=-1):
+        # Short reads are fine: COPY keeps reading until it gets b""
+        if self._offset >= len(self._buffer):
+            self._buffer, self._offset = next(self._chunks, b""), 0
+        end = len(self._buffer) if size is None or size < 0 else self._offset + size
+        data = self._buffer[self._offset:end]
+        self._offset += len(data)
+        return data
+
+
+def _users(count, password_hash, rng):
+    for n in range(count):
+        gender = rng.choice(GENDERS)
+        yield (f"{USERNAME_PREFIX}{n}", f"{USERNAME_PREFIX}{n}@bench.example", password_hash,
+               f"Bench User {n}", rng.randint(18, 90), gender or None, f"{n} Benchmark Street")
+
+
+def _spread(count, user_ids):
+    """(n, user_id, per-user index) for row n, round-robin over the users"""
+    for n in range(count):
+        yield n, user_ids[n % len(user_ids)], n // len(user_ids)
+
+
+def _vault(count, user_ids, ciphertexts, rng):
+    for n, user_id, index in _spread(count, user_ids):
+        domain = f"site{index}.example"
+        yield (user_id, domain, f"account{index}", ciphertexts[n % len(ciphertexts)],
+               f"https://{domain}/login", rng.choice(["", "work", "personal", "shared with family"]) or None)
+
+
+def _social_links(count, user_ids):
+    for _, user_id, index in _spread(count, user_ids):
+        platform = PLATFORMS[index % len(PLATFORMS)]
+        yield user_id, platform, f"bench{user_id}_{index}", f"https://{platform}.example/bench{user_id}_{index}"
+
+
+def _handbook(count, user_ids, rng):
+    for _, user_id, index in _spread(count, user_ids):
+        yield user_id, f"field_{index}", f"value {rng.getrandbits(32):08x}"
+
+
+def _copy(cur, statement, rows, label):
+    started = time.perf_counter()
+    stream = CopyStream(rows)
+    cur.copy_expert(statement, stream, size=1 << 20)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16} {stream.rows:>10} rows in {elapsed:6.1f}s ({stream.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def seed(users, vault, social, handbook, seed_value=42, reset=False):
+    rng = random.Random(seed_value)
+
+    with transaction() as cur:
+        if reset:
+            cur.execute(DELETE_BENCH_USERS)
+            print(f"Deleted {cur.rowcount} existing bench user(s)")
+        else:
+            cur.execute(BENCH_USER_IDS)
+            if cur.fetchone():
+                raise SystemExit("Bench users already exist; rerun with --reset to replace them")
+
+    password_hash = generate_password_hash(BENCH_PASSWORD).decode("utf-8")
+    fernet = Fernet(os.getenv("FERNET_KEY"))
+    ciphertexts = [fernet.encrypt(f"secret-{n}".encode()).decode() for n in range(CIPHERTEXT_POOL)]
+
+    with transaction() as cur:
+        _copy(cur, COPY_USERS, _users(users, password_hash, rng), "users")
+        cur.execute(BENCH_USER_IDS)
+        user_ids = [row[0] for row in cur.fetchall()]
+        _copy(cur, COPY_VAULT_PASSWORDS, ((user_id, password_hash) for user_id in user_ids), "vault_passwords")
+
+    # Commit per table, so a long run that fails late keeps what it already loaded
+    if vault:
+        with transaction() as cur:
+            _copy(cur, COPY_VAULT, _vault(vault, user_ids, ciphertexts, rng), "vault")
+    if social:
+        with transaction() as cur:
+            _copy(cur, COPY_SOCIAL_LINKS, _social_links(social, user_ids), "social_links")
+    if handbook:
+        with transaction() as cur:
+            _copy(cur, COPY_HANDBOOK, _handbook(handbook, user_ids, rng), "personal_handbook")
+
+    with transaction() as cur:
+        cur.execute("ANALYZE users, vault_passwords, vault, social_links, personal_handbook, user_stats;")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--vault", type=int, default=5000000)
+    parser.add_argument("--social", type=int, default=1000000)
+    parser.add_argument("--handbook", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="delete existing bench users first")
+    args = parser.parse_args(argv)
+
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+
+    if not initialize_connection_pool():
+        return 1
+
+    seed(args.users, args.vault, args.social, args.handbook, args.seed, args.reset)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Serialization throughput for large vault listings, without a server or database.
+
+    python -m benchmarks.serialization [--rows 10000] [--repeat 50] [--json results.json]
+
+Builds --rows synthetic vault rows shaped like GET /vault/get-vault returns
+them. For each combination of row mapping (the positional dict literal the
+blueprints used to write by hand, dict(zip(...)), and the compiled
+utils.rows.row_mapper) and JSON provider (Flask's stdlib-based default and
+json_provider's orjson one), it times mapping plus encoding a full listing
+--repeat times. Reports listings/s, rows/s, MB/s and latency percentiles.
+"""
+import argparse
+import random
+import time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from benchmarks.report import summarize, write_results
+from json_provider import fast_json_provider, orjson
+from utils.rows import row_mapper
+
+FIELDS = ("id", "domain", "account_name", "url", "notes")
+
+
+def _rows(count, rng):
+    notes = [None, "work", "personal", "shared with family", "recovery codes in the safe"]
+    return [
+        (n + 1, f"site{n}.example", f"account{rng.randrange(1000)}", f"https://site{n}.example/login", rng.choice(notes))
+        for n in range(count)
+    ]
+
+
+MAPPERS = {
+    "positional": lambda r: {"id": r[0], "domain": r[1], "account_name": r[2], "url": r[3], "notes": r[4]},
+    "dict_zip": lambda r: dict(zip(FIELDS, r)),
+    "row_mapper": row_mapper(FIELDS),
+}
+
+
+def _providers():
+    app = Flask(__name__)
+    providers = {"stdlib": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = fast_json_provider(DefaultJSONProvider)(app)
+    return providers
+
+
+def run_benchmark(rows, mapper_name, provider_name, provider, repeat):
+    mapper = MAPPERS[mapper_name]
+    latencies = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = provider.dumps(list(map(mapper, rows)))
+        latencies.append(time.perf_counter() - started)
+        size = len(body.encode())
+
+    elapsed = sum(latencies)
+    return {
+        "mapper": mapper_name,
+        "provider": provider_name,
+        "rows": len(rows),
+        "repeat": repeat,
+        **summarize(latencies, elapsed),
+        "rows_per_second": round(len(rows) * repeat / elapsed) if elapsed else 0,
+        "megabytes_per_second": round(size * repeat / elapsed / 1e6, 1) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    rows = _rows(args.rows, random.Random(args.seed))
+    results = []
+    for provider_name, provider in _providers().items():
+        for mapper_name in MAPPERS:
+            result = run_benchmark(rows, mapper_name, provider_name, provider, args.repeat)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(f"{provider_name:<7} {mapper_name:<11} {result['rows_per_second']:>10} rows/s  "
+                  f"{result['megabytes_per_second']:>6} MB/s  p50 {latency['p50']}ms  p95 {latency['p95']}ms")
+
+    if args.json:
+        write_results(args.json, {"benchmark": "serialization", "rows": args.rows, "repeat": args.repeat}, results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
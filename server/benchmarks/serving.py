@@ -0,0 +1,189 @@
+"""
+Threaded vs cooperative (gevent) serving of the Flask app under database latency.
+
+    python -m benchmarks.serving [--modes threaded threaded-pool green] [--threads 8]
+        [--worker-connections 500] [--pool-size 40] [--db-latency-ms 10]
+        [--concurrency 200] [--duration 10] [--warmup 2] [--sessions 8]
+        [--scenarios api.dashboard personal.me] [--port 5099] [--out results.json]
+
+Seed first with benchmarks.seed. For each mode it starts a single gunicorn
+worker from this checkout:
+- threaded: gthread with --threads threads, and a pool of as many connections
+- threaded-pool: gthread with --pool-size threads and --pool-size connections,
+  so it has the same pool as green and only the serving model differs
+- green: green.py on gevent with --worker-connections, and --pool-size connections
+
+The worker's database connections go through a local TCP proxy that delays
+every packet by half of --db-latency-ms each way. That stands in for the
+network round trip to a managed database, which is what keeps requests
+blocked on PostgreSQL. The benchmarks.load scenarios then run against the
+worker at --concurrency, and the modes are reported side by side. Needs
+DATABASE_URL.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+from psycopg2.extensions import parse_dsn
+from benchmarks.load import Client, Session, SCENARIOS, run_scenario
+from benchmarks.report import write_results
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCENARIOS = ["api.dashboard", "personal.me", "vault.get_vault"]
+
+
+async def _relay(reader, writer, delay):
+    """Copy one direction of a proxied connection, delivering each chunk `delay` seconds late"""
+    loop = asyncio.get_running_loop()
+    try:
+        while chunk := await reader.read(65536):
+            loop.call_later(delay, writer.write, chunk)
+        await asyncio.sleep(delay)
+    finally:
+        writer.close()
+
+
+def _run_latency_proxy(listen_port, upstream, delay, ready):
+    """Process target: TCP proxy on 127.0.0.1:listen_port to upstream (host, port) or a unix socket path"""
+
+    async def handle(client_reader, client_writer):
+        if isinstance(upstream, str):
+            server_reader, server_writer = await asyncio.open_unix_connection(upstream)
+        else:
+            server_reader, server_writer = await asyncio.open_connection(*upstream)
+        await asyncio.gather(
+            _relay(client_reader, server_writer, delay),
+            _relay(server_reader, client_writer, delay),
+            return_exceptions=True,
+        )
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", listen_port)
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _proxied_database_url(database_url, proxy_port):
+    """(DATABASE_URL pointing at the proxy, upstream address for the proxy)"""
+    dsn = parse_dsn(database_url)
+    host, port = dsn.get("host", "localhost"), int(dsn.get("port", 5432))
+    upstream = f"{host}/.s.PGSQL.{port}" if host.startswith("/") else (host, port)
+    credentials = quote(dsn.get("user", ""), safe="")
+    if dsn.get("password"):
+        credentials += ":" + quote(dsn["password"], safe="")
+    return f"postgresql://{credentials}@127.0.0.1:{proxy_port}/{dsn.get('dbname', '')}", upstream
+
+
+def _start_server(mode, args, database_url):
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "RATELIMIT_ENABLED": "false",
+        "HASHING_WORKERS": os.getenv("HASHING_WORKERS", "2"),
+        "DB_POOL_MIN": "1",
+    }
+    command = [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{args.port}"]
+    if mode in ("threaded", "threaded-pool"):
+        threads = args.threads if mode == "threaded" else args.pool_size
+        env["DB_POOL_MAX"] = str(threads)
+        command += ["-k", "gthread", "--threads", str(threads), "app:app"]
+    else:
+        env["DB_POOL_MAX"] = str(args.pool_size)
+        env["GREEN_MODE"] = "true"
+        env["GUNICORN_WORKER_CONNECTIONS"] = str(args.worker_connections)
+
+    server = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if Client(base_url, timeout=2).request("GET", "/")[0] == 200:
+                return server, base_url
+        except OSError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start; run it by hand to see why: {' '.join(command)}")
+
+
+def _print_result(mode, result):
+    latency = result["latency_ms"]
+    print(f"{mode:<13} {result['scenario']:<18} {result['throughput_per_second']:>9} req/s  "
+          f"p50 {latency['p50']:>8}ms  p95 {latency['p95']:>8}ms  p99 {latency['p99']:>8}ms  errors {result['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serving", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--modes", nargs="+", choices=["threaded", "threaded-pool", "green"],
+                        default=["threaded", "threaded-pool", "green"])
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads (and pool size) in threaded mode")
+    parser.add_argument("--worker-connections", type=int, default=500, help="greenlets per worker in green mode")
+    parser.add_argument("--pool-size", type=int, default=40, help="DB_POOL_MAX in green mode, and threads and DB_POOL_MAX in threaded-pool mode")
+    parser.add_argument("--db-latency-ms", type=float, default=10, help="added database round trip time")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--sessions", type=int, default=8, help="bench users to sign in as")
+    parser.add_argument("--users", type=int, default=1000, help="bench users seeded (sessions are drawn from these)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=DEFAULT_SCENARIOS)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--proxy-port", type=int, default=5098)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if not os.getenv("DATABASE_URL"):
+        parser.error("DATABASE_URL must be set")
+
+    database_url, upstream = _proxied_database_url(os.environ["DATABASE_URL"], args.proxy_port)
+    ready = multiprocessing.Event()
+    proxy = multiprocessing.Process(
+        target=_run_latency_proxy, args=(args.proxy_port, upstream, args.db_latency_ms / 2000, ready), daemon=True)
+    proxy.start()
+    if not ready.wait(10):
+        raise RuntimeError("latency proxy did not start")
+
+    results = []
+    try:
+        for mode in args.modes:
+            server, base_url = _start_server(mode, args, database_url)
+            try:
+                setup_client = Client(base_url)
+                sessions = [Session(setup_client, index) for index in range(min(args.sessions, args.users))]
+                for name in args.scenarios:
+                    result = run_scenario(name, base_url, sessions, args.concurrency, args.warmup, args.duration)
+                    result["mode"] = mode
+                    results.append(result)
+                    _print_result(mode, result)
+            finally:
+                server.terminate()
+                server.wait(10)
+    finally:
+        proxy.terminate()
+
+    if args.out:
+        write_results(args.out, {
+            "benchmark": "serving",
+            "threads": args.threads,
+            "worker_connections": args.worker_connections,
+            "pool_size": args.pool_size,
+            "db_latency_ms": args.db_latency_ms,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+        }, results)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,22 +13,107 @@ class BaseConfig:
 
     # CORS
     CORS_SUPPORTS_CREDENTIALS = False
-    CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "X-Requested-With"]
+    CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "X-Requested-With", "If-None-Match", "X-Primary-Reads-Until"]
     CORS_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
+    CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "ETag", "X-Primary-Reads-Until"]
 
     # Token expiry minutes
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES", 1600))
     JWT_REFRESH_TOKEN_EXPIRES = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRES", 604800))
 
-    # RATE LIMIT defaults
+    # Database connection pool: sizes, seconds to wait for a free connection,
+    # idle seconds before a connection is pinged / replaced, max connection age
+    DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+    DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 5))
+    DB_POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", 30))
+    DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", 300))
+    DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", 3600))
+
+    # Read replicas (DATABASE_REPLICA_URLS, comma separated) get the same pool sizing. After a
+    # write, a user's reads stay on the primary for READ_YOUR_WRITES_SECONDS (cover replica lag;
+    # the client echoes the window back in X-Primary-Reads-Until so every worker honours it);
+    # a replica that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+    READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+    # Seconds between pings of idle pooled connections (health.py), and seconds without a
+    # completed keepalive after which /readyz reports the worker not ready
+    HEALTH_CHECK_SECONDS = float(os.getenv("HEALTH_CHECK_SECONDS", 10))
+    HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", 3 * HEALTH_CHECK_SECONDS))
+
+    # Warm each worker up before it serves (startup.py): revocation cache, bcrypt processes, URL map
+    WORKER_WARM_UP = os.getenv("WORKER_WARM_UP", "true").lower() != "false"
+
+    # Revocation cache sizing (LRU of recent jtis + bloom filter of the blocklist)
+    REVOCATION_LRU_SIZE = int(os.getenv("REVOCATION_LRU_SIZE", 10000))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+    # Seconds before the newest loaded revoked_at that each top-up re-reads: revocations
+    # committing later than that (slow transactions, clock skew between hosts) are missed
+    REVOCATION_REFRESH_OVERLAP_SECONDS = float(os.getenv("REVOCATION_REFRESH_OVERLAP_SECONDS", 60))
+
+    # Seconds between token_blocklist partition upkeep runs in each app process (0 disables;
+    # then schedule `python -m jobs purge-blocklist` instead)
+    BLOCKLIST_MAINTENANCE_SECONDS = float(os.getenv("BLOCKLIST_MAINTENANCE_SECONDS", 3600))
+
+    # bcrypt worker pool: processes, max calls in flight, seconds to wait for a result
+    HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1))
+    HASHING_QUEUE_LIMIT = int(os.getenv("HASHING_QUEUE_LIMIT", 64))
+    HASHING_TIMEOUT = float(os.getenv("HASHING_TIMEOUT", 5))
+
+    # Request body cap (bulk vault imports are the largest payloads)
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 10 * 1024 * 1024))
+
+    # Profile pictures (media/store.py): storage directory, upload caps, square thumbnail
+    # edge lengths in pixels, and background thumbnail threads per process (0 renders inline)
+    MEDIA_ROOT = os.getenv("MEDIA_ROOT", "uploads")
+    PROFILE_PIC_MAX_BYTES = int(os.getenv("PROFILE_PIC_MAX_BYTES", 5 * 1024 * 1024))
+    PROFILE_PIC_MAX_PIXELS = int(os.getenv("PROFILE_PIC_MAX_PIXELS", 40_000_000))
+    THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv("THUMBNAIL_SIZES", "64,256,1024").split(","))
+    THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
+    # Rendition users.profile_pic points at (avatars), and the public origin of /media URLs;
+    # unset, uploads use the origin the API was reached on (behind ProxyFix)
+    PROFILE_PIC_SIZE = int(os.getenv("PROFILE_PIC_SIZE", 256))
+    MEDIA_BASE_URL = os.getenv("MEDIA_BASE_URL")
+    # Seconds an unreferenced upload is kept before `python -m jobs purge-media` removes it
+    MEDIA_PURGE_GRACE_SECONDS = int(os.getenv("MEDIA_PURGE_GRACE_SECONDS", 86400))
+
+    # Seconds a /vault/unlock-vault grant can stand in for the vault password
+    VAULT_UNLOCK_TTL = int(os.getenv("VAULT_UNLOCK_TTL", 300))
+
+    # pg_trgm word similarity (0-1) a /search match needs; lower tolerates more typos
+    SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", 0.3))
+
+    # Bearer token required on GET /metrics; unset leaves it open (e.g. behind a private network).
+    # /api/stats/hashing and /api/stats/pool need it too, and are closed while it is unset.
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # RATE LIMIT defaults. In development the counters live in process memory. Production
+    # keeps them in PostgreSQL (RATELIMIT_STORAGE_URI=postgresql+pool://, ratelimit_storage.py)
+    # so every worker and host shares one budget; per-process counters would multiply the
+    # strict auth and vault limits by the worker count. That costs a pool checkout and an
+    # upsert on the primary for every rate limited request (about 1ms locally), and falls
+    # back to memory when the database is unreachable.
     RATELIMIT_DEFAULT = "15 per minute"
+    # RATELIMIT_ENABLED=false turns limits off, e.g. for benchmarks.load against a local server
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() != "false"
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
 
 class DevConfig(BaseConfig):
     """Development config: Allow non-HTTPS and non-CSRF protect"""
     DEBUG = True
     CORS_ORIGINS = ["http://localhost:5173","http://127.0.0.1:5173"]
 
+    # Hash inline: `python app.py` is __main__, and spawned pool workers would re-import it
+    HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", 0))
+
 class ProdConfig(BaseConfig):
     """Production config: Enforce HTTPS and CSRF protect for custom domain"""
     DEBUG = False
-    CORS_ORIGINS = [os.getenv("PROD_FRONTEND_ORIGIN")]
\ No newline at end of file
+    CORS_ORIGINS = [os.getenv("PROD_FRONTEND_ORIGIN")]
+
+    # Shared between workers (see BaseConfig); set memory:// to keep per-process counters
+    RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "postgresql+pool://")
\ No newline at end of file
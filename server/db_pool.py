@@ -0,0 +1,318 @@
+"""
+Connection pool with blocking checkout, connection health checks and metrics.
+
+psycopg2's ThreadedConnectionPool raises PoolError the moment every connection
+is taken and hands out connections the server may already have dropped. This
+pool waits (up to a timeout) for a connection to be returned, pings connections
+that sat idle, recycles them by age, and records how long callers waited.
+keepalive() exercises idle connections from a background thread (health.py),
+so requests don't have to.
+"""
+import bisect
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions, pool
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolTimeout(pool.PoolError):
+    """No connection was returned to the pool within the checkout timeout"""
+
+
+class PoolMetrics:
+    """Counters and a checkout wait histogram; read with snapshot()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self.recycled = 0
+        self.failed_validations = 0
+        self.keepalive_pings = 0
+
+    def observe_wait(self, seconds):
+        with self._lock:
+            self.wait_bucket_counts[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.wait_sum += seconds
+            self.wait_count += 1
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(WAIT_BUCKETS + (float("inf"),), self.wait_bucket_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                "checkout_wait_buckets": buckets,
+                "checkout_wait_sum": self.wait_sum,
+                "checkout_wait_count": self.wait_count,
+                "exhausted": self.exhausted,
+                "timeouts": self.timeouts,
+                "opened": self.opened,
+                "closed": self.closed,
+                "recycled": self.recycled,
+                "failed_validations": self.failed_validations,
+                "keepalive_pings": self.keepalive_pings,
+            }
+
+
+class InstrumentedConnectionPool:
+    """
+    Thread-safe pool with the getconn/putconn/closeall interface of psycopg2's pools.
+
+    - checkout_timeout: seconds getconn() waits for a free connection before PoolTimeout
+    - validate_after: idle seconds after which a connection is pinged before reuse
+    - max_idle: idle seconds after which a connection is replaced rather than reused
+    - max_lifetime: age in seconds after which a connection is replaced
+    """
+
+    def __init__(self, minconn, maxconn, checkout_timeout=5.0, validate_after=30.0,
+                 max_idle=300.0, max_lifetime=3600.0, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.validate_after = validate_after
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.connect_kwargs = connect_kwargs
+        self.metrics = PoolMetrics()
+
+        self._cond = threading.Condition()
+        # LIFO stack of (conn, returned_at) so the warmest connection is reused first
+        self._idle = []
+        self._created_at = {}
+        # id(conn) -> monotonic time keepalive() last pinged it while idle
+        self._pinged_at = {}
+        self._in_use = 0
+        self._total = 0
+        self._closed = False
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+            self._total += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        self._created_at[id(conn)] = time.monotonic()
+        self.metrics.incr("opened")
+        return conn
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        self._pinged_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self.metrics.incr("closed")
+
+    def _is_usable(self, conn, idle_for):
+        """Replace expired connections and ping ones that sat idle for a while"""
+        if conn.closed:
+            return False
+
+        age = time.monotonic() - self._created_at.get(id(conn), 0.0)
+        if idle_for > self.max_idle or age > self.max_lifetime:
+            self.metrics.incr("recycled")
+            return False
+
+        unchecked_for = min(idle_for, time.monotonic() - self._pinged_at.get(id(conn), 0.0))
+        if unchecked_for > self.validate_after and not self._ping(conn):
+            return False
+
+        return True
+
+    def _ping(self, conn):
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+        except psycopg2.Error:
+            self.metrics.incr("failed_validations")
+            return False
+        return True
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to timeout (default checkout_timeout) seconds"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._cond:
+            if self._closed:
+                raise pool.PoolError("connection pool is closed")
+
+            if not self._idle and self._total >= self.maxconn:
+                self.metrics.incr("exhausted")
+
+            while not self._idle and self._total >= self.maxconn:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.incr("timeouts")
+                    raise PoolTimeout(f"no connection available within {timeout}s")
+                self._cond.wait(remaining)
+
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                # Reserve the slot now; the connection is opened outside the lock
+                self._total += 1
+            self._in_use += 1
+
+        try:
+            if entry is not None:
+                conn, returned_at = entry
+                if not self._is_usable(conn, time.monotonic() - returned_at):
+                    self._discard(conn)
+                    conn = self._connect()
+            else:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        self.metrics.observe_wait(time.monotonic() - started)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection, rolling back any open transaction"""
+        if not close and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        with self._cond:
+            self._in_use -= 1
+            if close or conn.closed or self._closed:
+                self._total -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def prune_idle(self):
+        """Close idle connections past max_idle while keeping minconn open"""
+        now = time.monotonic()
+        with self._cond:
+            keep, expired = [], []
+            for conn, returned_at in self._idle:
+                if now - returned_at > self.max_idle and self._total - len(expired) > self.minconn:
+                    expired.append(conn)
+                else:
+                    keep.append((conn, returned_at))
+            self._idle = keep
+            self._total -= len(expired)
+
+        for conn in expired:
+            self._discard(conn)
+            self.metrics.incr("recycled")
+        return len(expired)
+
+    def keepalive(self):
+        """
+        Ping idle connections that went validate_after seconds without use or a ping
+        (at least the longest idle one), replace broken ones and reopen up to minconn.
+        Connections are taken out one at a time, so requests never wait on this.
+        Returns True when the server answered, False when it didn't, None when
+        every connection was busy and nothing was tried.
+        """
+        self.prune_idle()
+        now = time.monotonic()
+        with self._cond:
+            due = [conn for conn, returned_at in self._idle
+                   if now - max(returned_at, self._pinged_at.get(id(conn), 0.0)) > self.validate_after]
+            if not due and self._idle:
+                due = [self._idle[0][0]]
+
+        answered = failed = 0
+        for conn in due:
+            with self._cond:
+                entry = next((entry for entry in self._idle if entry[0] is conn), None)
+                if entry is None:
+                    continue  # checked out in the meantime
+                self._idle.remove(entry)
+                self._in_use += 1
+
+            alive = not conn.closed and self._ping(conn)
+            self.metrics.incr("keepalive_pings")
+            with self._cond:
+                self._in_use -= 1
+                if alive and not self._closed:
+                    self._pinged_at[id(conn)] = time.monotonic()
+                    # Back at the cold end of the stack, keeping its idle time for max_idle
+                    self._idle.insert(0, entry)
+                    answered += 1
+                else:
+                    self._total -= 1
+                    self._discard(conn)
+                    failed += 1
+                self._cond.notify()
+
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.minconn:
+                    break
+                self._total += 1
+            try:
+                conn = self._connect()
+            except psycopg2.Error:
+                with self._cond:
+                    self._total -= 1
+                failed += 1
+                break
+            with self._cond:
+                if self._closed:
+                    self._total -= 1
+                    self._discard(conn)
+                    break
+                self._idle.insert(0, (conn, time.monotonic()))
+                self._cond.notify()
+            answered += 1
+
+        if answered:
+            return True
+        return False if failed else None
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Pool occupancy plus the metrics snapshot"""
+        with self._cond:
+            occupancy = {
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "total": self._total,
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+            }
+        occupancy.update(self.metrics.snapshot())
+        return occupancy
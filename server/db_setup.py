@@ -1,86 +1,271 @@
 import psycopg2
-from psycopg2 import pool
+import contextvars
+import itertools
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from schema import SCHEMA_LIST
 from contextlib import contextmanager
+from config import BaseConfig
+from db_pool import InstrumentedConnectionPool, PoolTimeout
+from metrics import POOL_WAIT_SECONDS, TimedCursor, add_time
 
 load_dotenv()
 
+# The primary takes every write and any read not routed to a replica
 postgreSQL_pool = None
 
-def initialize_connection_pool():
+# Read replica pools (DATABASE_REPLICA_URLS); empty when every read goes to the primary
+replica_pools = []
+_next_replica = itertools.count()
+# id(pool) -> monotonic time before which a replica that failed to connect is skipped
+_replica_down_until = {}
+
+# Read-your-writes. A successful write answers with READ_YOUR_WRITES_HEADER, the wall clock
+# time until which that client's reads stay on the primary; the client echoes it on its
+# next requests, so whichever worker or host serves them honours the window. Clients
+# that don't echo it are still covered by the per process map below when their read
+# lands on the worker that took the write.
+READ_YOUR_WRITES_HEADER = "X-Primary-Reads-Until"
+_request_primary_until = contextvars.ContextVar("request_primary_until", default=0.0)
+# user id -> monotonic time until which their reads stay on the primary
+_sticky_until = OrderedDict()
+_sticky_lock = threading.Lock()
+STICKY_USERS_MAX = 100000
+# Requests that never write; anything else that succeeds makes its user sticky
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_routing = {
+    "replicas": 0,
+    "READ_YOUR_WRITES_SECONDS": BaseConfig.READ_YOUR_WRITES_SECONDS,
+    "REPLICA_RETRY_SECONDS": BaseConfig.REPLICA_RETRY_SECONDS,
+}
+
+def _setting(config, key):
+    """Pool setting from the app config, falling back to BaseConfig (e.g. for CLI use)"""
+    if config is not None and key in config:
+        return config[key]
+    return getattr(BaseConfig, key)
+
+
+def _with_sslmode(database_url, ssl_config):
+    if '?' in database_url:
+        return f"{database_url}&sslmode={ssl_config}"
+    return f"{database_url}?sslmode={ssl_config}"
+
+
+def _ssl_config():
+    return "require" if os.getenv("FLASK_ENV") == "production" else "disable"
+
+
+def connection_settings():
     """
-    Create connection pool, appending SSL mode directly to DSN to avoid keyword conflicts.
+    Connection keywords, appending SSL mode directly to DSN to avoid keyword conflicts.
     Priority 1: DATABASE_URL (Production/Render/Supabase Pooler)
     Priority 2: Individual Params (Local Development)
+    Returns None when neither is configured. Shared by the sync and async pools.
     """
-    global postgreSQL_pool
-    
-    is_prod = os.getenv("FLASK_ENV") == "production"
-    ssl_config = "require" if is_prod else "disable"
-
-    pool_kwargs = {
-        "minconn": 1,
-        "maxconn": 20,
-    }
+    ssl_config = _ssl_config()
 
     if os.getenv('DATABASE_URL'):
-        database_url = os.getenv('DATABASE_URL')
-        
-        if '?' in database_url:
-            final_dsn = f"{database_url}&sslmode={ssl_config}"
-        else:
-            final_dsn = f"{database_url}?sslmode={ssl_config}"
-            
         print(f"Initializing pool using DSN (SSL: {ssl_config})...")
-        pool_kwargs["dsn"] = final_dsn
+        return {"dsn": _with_sslmode(os.getenv('DATABASE_URL'), ssl_config)}
 
-    elif os.getenv('PG_HOST'):
+    if os.getenv('PG_HOST'):
         print(f"Initializing pool using PG_HOST variables (SSL: {ssl_config})...")
-        pool_kwargs["host"] = os.getenv('PG_HOST')
-        pool_kwargs["database"] = os.getenv('PG_DB')
-        pool_kwargs["user"] = os.getenv('PG_USER')
-        pool_kwargs["password"] = os.getenv('PG_PASSWORD')
-        pool_kwargs["port"] = os.getenv('PG_PORT')
-        pool_kwargs["sslmode"] = ssl_config  
-    
-    else:
-        print("CRITICAL ERROR: No database configuration found in environment variables.")
-        return
+        return {
+            "host": os.getenv('PG_HOST'),
+            "dbname": os.getenv('PG_DB'),
+            "user": os.getenv('PG_USER'),
+            "password": os.getenv('PG_PASSWORD'),
+            "port": os.getenv('PG_PORT'),
+            "sslmode": ssl_config,
+        }
+
+    print("CRITICAL ERROR: No database configuration found in environment variables.")
+    return None
+
+
+def replica_connection_settings():
+    """Connection keywords per read replica, from the comma separated DATABASE_REPLICA_URLS"""
+    urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    return [{"dsn": _with_sslmode(url, _ssl_config())} for url in urls]
+
+
+def initialize_connection_pool(config=None):
+    """
+    Create the connection pool from connection_settings().
+    Pool sizing and health check settings come from config (app.config or BaseConfig).
+    """
+    global postgreSQL_pool
+
+    settings = connection_settings()
+    if settings is None:
+        return False
+
+    pool_kwargs = {
+        "minconn": _setting(config, "DB_POOL_MIN"),
+        "maxconn": _setting(config, "DB_POOL_MAX"),
+        "checkout_timeout": _setting(config, "DB_POOL_CHECKOUT_TIMEOUT"),
+        "validate_after": _setting(config, "DB_POOL_VALIDATE_AFTER"),
+        "max_idle": _setting(config, "DB_POOL_MAX_IDLE"),
+        "max_lifetime": _setting(config, "DB_POOL_MAX_LIFETIME"),
+        "cursor_factory": TimedCursor,
+        **settings,
+    }
 
     try:
-        postgreSQL_pool = pool.ThreadedConnectionPool(**pool_kwargs)
+        postgreSQL_pool = InstrumentedConnectionPool(**pool_kwargs)
         print("Connection pool created successfully")
     except psycopg2.Error as e:
         print(f"Error initializing connection pool: {e}")
+        return False
+
+    replica_pools.clear()
+    _replica_down_until.clear()
+    sizing = {key: value for key, value in pool_kwargs.items() if key not in settings}
+    for index, replica in enumerate(replica_connection_settings()):
+        replica_kwargs = {**sizing, **replica}
+        try:
+            replica_pools.append(InstrumentedConnectionPool(**replica_kwargs))
+        except psycopg2.Error as e:
+            # Kept without open connections; reads retry it after REPLICA_RETRY_SECONDS
+            print(f"Error connecting to read replica {index}: {e}")
+            replica_pools.append(InstrumentedConnectionPool(**{**replica_kwargs, "minconn": 0}))
+            _mark_replica_down(replica_pools[-1])
+    configure_read_routing(config, len(replica_pools))
+    return True
+
+
+def configure_read_routing(config, replicas):
+    """Routing settings for stick_to_primary and replica retries; called by the sync and async pool set-up"""
+    _routing["replicas"] = replicas
+    _routing["READ_YOUR_WRITES_SECONDS"] = _setting(config, "READ_YOUR_WRITES_SECONDS")
+    _routing["REPLICA_RETRY_SECONDS"] = _setting(config, "REPLICA_RETRY_SECONDS")
+    if replicas:
+        print(f"Routing reads to {replicas} replica pool(s)")
+
+
+def stick_to_primary(user_id):
+    """
+    Send user_id's reads to the primary for READ_YOUR_WRITES_SECONDS (call after their writes).
+    Returns the READ_YOUR_WRITES_HEADER value for the response, or None without replicas.
+    """
+    if user_id is None or not _routing["replicas"]:
+        return None
+    window = _routing["READ_YOUR_WRITES_SECONDS"]
+    with _sticky_lock:
+        _sticky_until[user_id] = time.monotonic() + window
+        _sticky_until.move_to_end(user_id)
+        while len(_sticky_until) > STICKY_USERS_MAX:
+            _sticky_until.popitem(last=False)
+    return f"{time.time() + window:.3f}"
+
+
+def begin_request_routing(header_value):
+    """
+    Per request: honour a READ_YOUR_WRITES_HEADER echoed by the client, capped at one
+    window from now so a forged value can only slow down that client's own reads.
+    """
+    until = 0.0
+    if header_value and _routing["replicas"]:
+        try:
+            until = min(float(header_value), time.time() + _routing["READ_YOUR_WRITES_SECONDS"])
+        except ValueError:
+            pass
+    _request_primary_until.set(until)
+
+
+def reads_from_primary(user_id):
+    """True while this request or user_id is inside a read-your-writes window"""
+    if _request_primary_until.get() > time.time():
+        return True
+    if user_id is None:
+        return False
+    with _sticky_lock:
+        until = _sticky_until.get(user_id)
+        if until is None:
+            return False
+        if until > time.monotonic():
+            return True
+        del _sticky_until[user_id]
+        return False
+
+
+def _mark_replica_down(pool):
+    _replica_down_until[id(pool)] = time.monotonic() + _routing["REPLICA_RETRY_SECONDS"]
+
+
+def _checkout_replica():
+    """(pool, connection) from the next replica with a free slot, or None to read from the primary"""
+    now = time.monotonic()
+    start = next(_next_replica)
+    for offset in range(len(replica_pools)):
+        pool = replica_pools[(start + offset) % len(replica_pools)]
+        if _replica_down_until.get(id(pool), 0) > now:
+            continue
+        try:
+            # Never queue behind a busy replica while the primary may have room
+            return pool, pool.getconn(timeout=0)
+        except PoolTimeout:
+            continue
+        except psycopg2.Error as e:
+            print(f"Read replica unavailable, skipping it for {_routing['REPLICA_RETRY_SECONDS']}s: {e}")
+            _mark_replica_down(pool)
+    return None
+
 
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections with safety check"""
+def get_db_connection(readonly=False, user_id=None):
+    """
+    Context manager for database connections with safety check (blocks while the pool is exhausted).
+    readonly=True may be served by a read replica, unless user_id wrote recently (stick_to_primary).
+    """
     if postgreSQL_pool is None:
         raise RuntimeError("Database connection pool is not initialized.")
 
-    conn = postgreSQL_pool.getconn()
+    started = time.perf_counter()
+    checkout = None
+    if readonly and replica_pools and not reads_from_primary(user_id):
+        checkout = _checkout_replica()
+    pool, conn = checkout or (postgreSQL_pool, None)
+    if conn is None:
+        conn = postgreSQL_pool.getconn()
+    waited = time.perf_counter() - started
+    POOL_WAIT_SECONDS.observe(waited)
+    add_time("pool_wait", waited)
     try:
         yield conn
     finally:
-        postgreSQL_pool.putconn(conn=conn)
+        pool.putconn(conn=conn)
 
-def initialize_database_and_create_tables():
-    """Create all tables on startup"""
-    try:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            try:
-                for create_table in SCHEMA_LIST:
-                    cur.execute(create_table)
-                conn.commit()
-                print("Tables check completed.")
-            except psycopg2.Error as e:
-                print(f"Database Schema Error: {e}")
-                conn.rollback()
-            finally:
-                cur.close()
-    except RuntimeError as e:
-        print(f"Skipping table creation: {e}")
\ No newline at end of file
+
+def keepalive_pools():
+    """
+    Keep the idle connections of the primary and replica pools alive (health.py).
+    Returns the primary's InstrumentedConnectionPool.keepalive() outcome; a replica
+    that stops answering is skipped like one that failed to connect, until it answers again.
+    """
+    if postgreSQL_pool is None:
+        return False
+
+    for pool in replica_pools:
+        reachable = pool.keepalive()
+        if reachable is False:
+            _mark_replica_down(pool)
+        elif reachable:
+            _replica_down_until.pop(id(pool), None)
+    return postgreSQL_pool.keepalive()
+
+
+def pool_stats():
+    """Occupancy and checkout metrics of the connection pool"""
+    if postgreSQL_pool is None:
+        return {}
+    return postgreSQL_pool.stats()
+
+
+def replica_pool_stats():
+    """pool_stats() of each read replica pool, keyed db_replica_<n> like the /metrics gauge prefixes"""
+    return {f"db_replica_{index}": pool.stats() for index, pool in enumerate(replica_pools)}
@@ -1,20 +1,43 @@
-from flask_bcrypt import Bcrypt
 from dotenv import load_dotenv
 from cryptography.fernet import Fernet
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from hashing import HashingPool
+from health import HealthMonitor
+from media.store import MediaStore
+from metrics import timed
+import ratelimit_storage  # noqa: F401 - registers the postgresql+pool:// limiter storage
 import os
 
 load_dotenv()
 
-# global bcrypt instance 
-bcrypt = Bcrypt()
+# Global bcrypt worker pool (sized from config in create_app)
+hashing_pool = HashingPool()
+
+
+class TimedFernet(Fernet):
+    """Fernet whose encrypt/decrypt time is charged to the request's crypto span"""
+
+    def encrypt(self, data):
+        with timed("crypto"):
+            return super().encrypt(data)
+
+    def decrypt(self, token, ttl=None):
+        with timed("crypto"):
+            return super().decrypt(token, ttl)
+
 
 # Global fernet instance
-fernet = Fernet(os.getenv('FERNET_KEY'))
+fernet = TimedFernet(os.getenv('FERNET_KEY'))
 
-# Global rate limiter config
+# Global rate limiter config (storage and strategy come from RATELIMIT_* in config.py)
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["15 per minute"],
-)
\ No newline at end of file
+)
+
+# Profile picture store and thumbnail threads (configured in create_app)
+media_store = MediaStore()
+
+# Readiness verdict for /readyz, kept current by each worker's pool keepalive (startup.py)
+health_monitor = HealthMonitor()
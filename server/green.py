@@ -0,0 +1,60 @@
+"""
+Cooperative serving mode: the Flask app on gevent greenlets instead of OS threads.
+
+    GREEN_MODE=true gunicorn            (gunicorn.conf.py picks the gevent worker)
+    gunicorn green:app -k gevent --worker-connections 500
+
+With gthread workers a request blocked on PostgreSQL holds one of --threads
+threads, so a worker serves at most that many requests at once. Here it holds
+a greenlet, and a worker multiplexes up to --worker-connections of them.
+Importing this module makes the psycopg2 stack cooperative, in this order:
+
+- monkey.patch_all() runs at the top, before the app is imported. The locks and
+  conditions in db_pool, the revocation cache and the rate limiter are then
+  gevent primitives. InstrumentedConnectionPool becomes green-safe as it is: a
+  request waiting for a connection yields instead of blocking the worker.
+- gevent_wait_callback is installed with psycopg2.extensions.set_wait_callback,
+  so connecting and executing yield to other greenlets until the socket is ready.
+- CPU-bound work must not run on the hub. bcrypt already runs in the hashing
+  process pool, which needs HASHING_WORKERS > 0 (a warning is printed
+  otherwise). media_store.executor_class is set to gevent's native
+  ThreadPoolExecutor, so thumbnails leave the patched (green) threads.
+
+DB_POOL_MAX still caps how many requests talk to PostgreSQL at once; the rest
+wait for a connection without holding a thread.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import gevent.threadpool  # noqa: E402
+import psycopg2  # noqa: E402
+import psycopg2.extensions  # noqa: E402
+from gevent.socket import wait_read, wait_write  # noqa: E402
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback: poll the connection, yielding to the hub until its socket is ready"""
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        if state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+psycopg2.extensions.set_wait_callback(gevent_wait_callback)
+
+from app import app  # noqa: E402
+from extensions import hashing_pool, media_store  # noqa: E402
+
+# Patched threads are greenlets and would render thumbnails on the hub
+media_store.executor_class = gevent.threadpool.ThreadPoolExecutor
+
+if not hashing_pool.workers:
+    print("WARNING: HASHING_WORKERS=0 hashes passwords on the event loop, stalling every "
+          "request in the worker; set HASHING_WORKERS for green mode.")
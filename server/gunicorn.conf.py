@@ -0,0 +1,29 @@
+"""
+gunicorn settings, read from the working directory by `gunicorn app:app`.
+
+The master imports app.py once and forks workers from it, so they share the
+imported code copy-on-write and each starts serving without its own import.
+create_app() opens nothing, so there are no sockets to inherit, and each worker
+opens its own pool (and warms up) in post_worker_init before accepting
+connections. GUNICORN_PRELOAD=false imports the app in every worker instead.
+
+GREEN_MODE=true serves green:app on gevent workers (see green.py), each
+multiplexing up to GUNICORN_WORKER_CONNECTIONS requests.
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() != "false"
+
+if os.getenv("GREEN_MODE", "false").lower() == "true":
+    # Patch before the (preloaded) app creates any lock or socket
+    from gevent import monkey
+    monkey.patch_all()
+
+    wsgi_app = "green:app"
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 500))
+
+
+def post_worker_init(worker):
+    from startup import start_worker
+    start_worker(worker.wsgi)
@@ -0,0 +1,229 @@
+"""
+Bounded worker pool for bcrypt hashing.
+
+bcrypt is deliberately CPU heavy, so running it inline lets a burst of logins
+pin every request thread. HashingPool runs it in a separate process pool with a
+cap on queued work and a per-call timeout, and keeps counters for sizing.
+A worker process that dies (OOM killer, segfault) breaks the whole executor;
+it is then replaced and the call retried once.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask_bcrypt import generate_password_hash, check_password_hash
+from metrics import timed
+
+
+class HashingUnavailable(Exception):
+    """Raised when hashing work can't be scheduled or finished in time"""
+
+
+class HashingPoolBusy(HashingUnavailable):
+    """Queue limit reached; the caller should retry later"""
+
+
+class HashingTimeout(HashingUnavailable):
+    """The hash did not complete within the configured timeout"""
+
+
+def _run_timed(fn, args):
+    # Runs in the worker process: report when work actually started so the
+    # parent can separate queue wait from hashing time.
+    return time.time(), fn(*args)
+
+
+def _hash(password, rounds):
+    return generate_password_hash(password, rounds).decode('utf-8')
+
+
+def _check(pw_hash, password):
+    return check_password_hash(pw_hash, password)
+
+
+def _ready():
+    return True
+
+
+class HashingPool:
+    """
+    Process pool for bcrypt with bounded queueing.
+
+    - workers: number of hashing processes (0 runs inline, useful for local dev)
+    - queue_limit: max calls in flight (running + queued) before HashingPoolBusy
+    - timeout: seconds a caller waits for a result before HashingTimeout
+    """
+
+    def __init__(self, workers=None, queue_limit=64, timeout=5.0, rounds=12):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.rounds = rounds
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "restarts": 0,
+            "in_flight": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    def init_app(self, app):
+        """Read pool sizing from the app config; the processes start on first use"""
+        self.workers = app.config.get("HASHING_WORKERS", self.workers)
+        self.queue_limit = app.config.get("HASHING_QUEUE_LIMIT", self.queue_limit)
+        self.timeout = app.config.get("HASHING_TIMEOUT", self.timeout)
+        self.rounds = app.config.get("BCRYPT_LOG_ROUNDS", self.rounds)
+        self._slots = threading.BoundedSemaphore(self.queue_limit)
+
+    def hash_password(self, password):
+        """bcrypt hash as a utf-8 string, ready to store"""
+        with timed("crypto"):
+            return self._run(_hash, password, self.rounds)
+
+    def check_password(self, pw_hash, password):
+        """True when password matches the stored bcrypt hash"""
+        with timed("crypto"):
+            return self._run(_check, pw_hash, password)
+
+    async def hash_password_async(self, password):
+        """hash_password for event loop callers; awaits the worker without blocking the loop"""
+        with timed("crypto"):
+            return await self._run_async(_hash, password, self.rounds)
+
+    async def check_password_async(self, pw_hash, password):
+        """check_password for event loop callers"""
+        with timed("crypto"):
+            return await self._run_async(_check, pw_hash, password)
+
+    def warm(self, timeout=30):
+        """Spawn the worker processes now, so the first hash doesn't wait for interpreter start-up"""
+        if not self.workers:
+            return
+        executor = self._get_executor()
+        # Processes are spawned on demand; one pending call per worker starts them all
+        wait([executor.submit(_ready) for _ in range(self.workers)], timeout=timeout)
+
+    def stats(self):
+        """Snapshot of queue depth, wait and run time counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["workers"] = self.workers
+        snapshot["queue_limit"] = self.queue_limit
+        snapshot["queue_depth"] = max(snapshot["in_flight"] - self.workers, 0)
+        return snapshot
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: children must not inherit pooled DB sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _replace_broken(self, executor):
+        """Drop an executor whose worker died, so the next call starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return  # already replaced by another caller
+            self._executor = None
+            self._stats["restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        for retry in (True, False):
+            executor = None
+            try:
+                executor, future = self._submit(fn, args)
+                _, result = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                future.cancel()
+                self._count("timeouts")
+                raise HashingTimeout(f"Hashing did not finish within {self.timeout}s")
+            except BrokenProcessPool as e:
+                if executor is not None:
+                    self._replace_broken(executor)
+                if not retry:
+                    raise HashingUnavailable("Hashing workers keep crashing") from e
+                continue
+            return result
+
+    async def _run_async(self, fn, *args):
+        if not self.workers:
+            # Inline mode still keeps bcrypt off the event loop thread
+            return await asyncio.to_thread(fn, *args)
+
+        for retry in (True, False):
+            executor = None
+            try:
+                executor, future = self._submit(fn, args)
+                # wait_for cancels the wrapped future on timeout, like future.cancel() in _run
+                _, result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                raise HashingTimeout(f"Hashing did not finish within {self.timeout}s")
+            except BrokenProcessPool as e:
+                if executor is not None:
+                    self._replace_broken(executor)
+                if not retry:
+                    raise HashingUnavailable("Hashing workers keep crashing") from e
+                continue
+            return result
+
+    def _submit(self, fn, args):
+        """(executor, future) for one call; a broken executor raises BrokenProcessPool here or from the future"""
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise HashingPoolBusy("Hashing queue is full")
+
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+
+        enqueued_at = time.time()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_timed, fn, args)
+        except Exception as e:
+            self._slots.release()
+            self._count("in_flight", -1)
+            if isinstance(e, BrokenProcessPool):
+                # Broke after its last call finished; submit() refuses new work
+                self._replace_broken(executor)
+            raise
+
+        # The slot is held until the work really finishes, even after a timeout,
+        # so the limit bounds the work queued in the pool and not just waiters.
+        future.add_done_callback(lambda f: self._finish(f, enqueued_at))
+        return executor, future
+
+    def _finish(self, future, enqueued_at):
+        self._slots.release()
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            started_at, _ = future.result()
+            wait = max(started_at - enqueued_at, 0.0)
+            self._stats["completed"] += 1
+            self._stats["wait_seconds_total"] += wait
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            self._stats["run_seconds_total"] += max(time.time() - started_at, 0.0)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
@@ -0,0 +1,87 @@
+"""
+Cached liveness and readiness for /healthz, /readyz and /auth/keep-alive.
+
+Probes used to check out a pooled connection and run SELECT 1 on every ping,
+competing with requests for DB_POOL_MAX slots and hanging for up to
+DB_POOL_CHECKOUT_TIMEOUT when the pool was exhausted. Instead, a keepalive in
+each process (a daemon thread in the WSGI app, a task in the ASGI app) pings
+the connections sitting idle in its pools every HEALTH_CHECK_SECONDS and
+records the outcome here. The endpoints only read the recorded verdict.
+
+- /healthz: the process is up and answering; never looks at the database
+- /readyz: 200 while the last keepalive reached the primary, 503 when it
+  didn't or when no keepalive has reported for HEALTH_STALE_SECONDS
+"""
+import threading
+import time
+
+
+class HealthMonitor:
+    """
+    Readiness verdict of this process, refreshed by a background keepalive.
+
+    A keepalive reports True (the primary answered), False (it didn't) or None
+    (every connection was busy serving requests, so nothing was tried and the
+    previous verdict stands).
+    """
+
+    def __init__(self, interval=10.0, stale_after=30.0):
+        self.interval = interval
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._ready = False
+        self._reason = "starting"
+        self._checked_at = None
+
+    def init_app(self, app):
+        self.interval = app.config.get("HEALTH_CHECK_SECONDS", self.interval)
+        self.stale_after = app.config.get("HEALTH_STALE_SECONDS", self.stale_after)
+
+    def record(self, reachable, reason=None):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if reachable is not None:
+                self._ready = reachable
+                self._reason = reason or ("ok" if reachable else "database unreachable")
+
+    def verdict(self):
+        """(ready, body for /readyz)"""
+        with self._lock:
+            ready, reason, checked_at = self._ready, self._reason, self._checked_at
+
+        if checked_at is None:
+            return False, {"status": "not ready", "reason": reason}
+        age = time.monotonic() - checked_at
+        if age > self.stale_after:
+            ready, reason = False, "keepalive stalled"
+        return ready, {"status": "ready" if ready else "not ready", "reason": reason,
+                       "checked_seconds_ago": round(age, 3)}
+
+    def check(self, keepalive):
+        """Run one keepalive and record its outcome"""
+        try:
+            self.record(keepalive())
+        except Exception as e:
+            print(f"Pool keepalive failed: {e}")
+            self.record(False, "keepalive failed")
+
+    async def check_async(self, keepalive):
+        """check() for a coroutine keepalive"""
+        try:
+            self.record(await keepalive())
+        except Exception as e:
+            print(f"Pool keepalive failed: {e}")
+            self.record(False, "keepalive failed")
+
+    def start(self, keepalive):
+        """Check once now, then every interval seconds on a daemon thread"""
+        self.check(keepalive)
+
+        def run():
+            while True:
+                time.sleep(self.interval)
+                self.check(keepalive)
+
+        thread = threading.Thread(target=run, name="pool-keepalive", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1 @@
+"""Maintenance jobs run outside the request path (cron / one-off / background upkeep): python -m jobs <job>"""
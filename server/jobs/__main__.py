@@ -0,0 +1,51 @@
+"""
+Job CLI: python -m jobs reconcile-stats [--batch-size N] | purge-rate-limits | purge-blocklist
+    | purge-media [--grace-seconds N]
+"""
+import argparse
+import sys
+from db_setup import initialize_connection_pool
+from config import BaseConfig
+from jobs.media import purge_unreferenced_media
+from jobs.token_blocklist import maintain_token_blocklist, partition_days_ahead
+from jobs.user_stats import DEFAULT_BATCH_SIZE, reconcile_user_stats
+from ratelimit_storage import purge_expired_windows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m jobs", description="Primer maintenance jobs")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = subcommands.add_parser("reconcile-stats", help="repair drift in the user_stats counters")
+    reconcile.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    subcommands.add_parser("purge-rate-limits", help="delete expired rate limit counters")
+
+    blocklist = subcommands.add_parser(
+        "purge-blocklist", help="drop expired token_blocklist partitions and create upcoming ones")
+    blocklist.add_argument("--days-ahead", type=int, default=partition_days_ahead(vars(BaseConfig)))
+
+    media = subcommands.add_parser("purge-media", help="delete profile pictures no user references")
+    media.add_argument("--grace-seconds", type=int, default=BaseConfig.MEDIA_PURGE_GRACE_SECONDS)
+
+    args = parser.parse_args(argv)
+
+    if not initialize_connection_pool():
+        return 1
+
+    if args.command == "reconcile-stats":
+        repaired = reconcile_user_stats(batch_size=args.batch_size)
+        print(f"Repaired user_stats for {len(repaired)} user(s)" + (f": {repaired}" if repaired else ""))
+    elif args.command == "purge-rate-limits":
+        print(f"Purged {purge_expired_windows()} expired rate limit counter(s)")
+    elif args.command == "purge-blocklist":
+        print(f"Dropped {maintain_token_blocklist(args.days_ahead)} expired token_blocklist partition(s)")
+    elif args.command == "purge-media":
+        purged = purge_unreferenced_media(BaseConfig.MEDIA_ROOT, args.grace_seconds)
+        print(f"Purged {purged} unreferenced profile picture(s)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
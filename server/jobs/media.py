@@ -0,0 +1,72 @@
+"""
+Removal of profile pictures no user references any more.
+
+Uploads are shared between users by digest, so a file can only go once no
+users.profile_pic points at it. Files younger than the grace period are kept:
+an upload is written before the UPDATE that references it commits, and a
+re-upload of an existing image refreshes its mtime.
+"""
+import glob
+import os
+import time
+from media.store import DIGEST_PATTERN
+from repository import transaction
+
+# profile_pic holds an absolute URL to one rendition, <origin>/media/<digest>/<size>;
+# the digest is the first group
+REFERENCED_DIGESTS = """
+    SELECT DISTINCT substring(profile_pic FROM '/media/([0-9a-f]{64})(/[0-9]+)?$')
+    FROM users
+    WHERE profile_pic LIKE '%/media/%';
+"""
+
+
+def _referenced_digests():
+    with transaction() as cur:
+        cur.execute(REFERENCED_DIGESTS)
+        return {row[0] for row in cur.fetchall() if row[0]}
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def purge_unreferenced_media(root, grace_seconds):
+    """Delete unreferenced originals (and their thumbnails) older than grace_seconds; returns how many"""
+    referenced = _referenced_digests()
+    cutoff = time.time() - grace_seconds
+    purged = 0
+
+    # glob skips dotfiles, which would hide abandoned .tmp- files
+    for shard in glob.glob(os.path.join(root, "originals", "*")):
+        purged += _purge_shard(root, shard, referenced, cutoff)
+
+    return purged
+
+
+def _purge_shard(root, shard, referenced, cutoff):
+    purged = 0
+    for name in os.listdir(shard):
+        path = os.path.join(shard, name)
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+
+        if name.startswith(".tmp-"):
+            # Left behind by a process that died mid-write
+            _remove(path)
+            continue
+        if not DIGEST_PATTERN.match(name) or name in referenced:
+            continue
+
+        if _remove(path):
+            purged += 1
+        for thumbnail in glob.glob(os.path.join(root, "thumbnails", name[:2], f"{name}_*.webp")):
+            _remove(thumbnail)
+    return purged
@@ -0,0 +1,63 @@
+"""
+Partition upkeep for token_blocklist.
+
+token_blocklist is range partitioned by token expiry, one partition per UTC day
+(schema.py). token_blocklist_maintain() creates partitions ahead of the tokens
+being issued now and drops those whose range has ended, so the table only ever
+holds live revocations and lookups and inserts cost the same on day one and
+day one thousand.
+
+Each app process runs it every BLOCKLIST_MAINTENANCE_SECONDS in the background
+(an advisory lock makes the others skip while one is working); it can also run
+from cron as `python -m jobs purge-blocklist`.
+"""
+import threading
+import time
+from datetime import timedelta
+from repository import transaction
+
+MAINTAIN_TOKEN_BLOCKLIST = "SELECT token_blocklist_maintain(%s);"
+
+SECONDS_PER_DAY = 86400
+
+
+def longest_token_lifetime(config):
+    """Seconds until the longest-lived token issued now expires"""
+    lifetimes = []
+    for setting in ("JWT_ACCESS_TOKEN_EXPIRES", "JWT_REFRESH_TOKEN_EXPIRES"):
+        value = config[setting]
+        lifetimes.append(value.total_seconds() if isinstance(value, timedelta) else value)
+    return max(lifetimes)
+
+
+def partition_days_ahead(config):
+    """Days of partitions to keep ready: every token issued before the next run must have one"""
+    return -(-int(longest_token_lifetime(config)) // SECONDS_PER_DAY) + 1
+
+
+def maintain_token_blocklist(days_ahead):
+    """Create upcoming partitions and drop fully expired ones; returns the number dropped"""
+    with transaction() as cur:
+        cur.execute(MAINTAIN_TOKEN_BLOCKLIST, (days_ahead,))
+        return cur.fetchone()[0]
+
+
+def start_background_maintenance(config):
+    """Run maintain_token_blocklist every BLOCKLIST_MAINTENANCE_SECONDS on a daemon thread"""
+    interval = config.get("BLOCKLIST_MAINTENANCE_SECONDS", 0)
+    if interval <= 0:
+        return None
+
+    days_ahead = partition_days_ahead(config)
+
+    def run():
+        while True:
+            try:
+                maintain_token_blocklist(days_ahead)
+            except Exception as e:
+                print(f"token_blocklist maintenance failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="token-blocklist-maintenance", daemon=True)
+    thread.start()
+    return thread
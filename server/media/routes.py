@@ -0,0 +1,41 @@
+from flask import Blueprint, jsonify, request, send_file
+from extensions import limiter, media_store
+from media.store import THUMBNAIL_MIMETYPE
+
+media_bp = Blueprint('media', __name__, url_prefix='/media')
+
+# A URL names immutable content (digest + size), so caches may keep it for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def media_tag(digest, size):
+    return f"{digest}-{size or 'full'}"
+
+
+def media_headers(digest, size):
+    """Headers for both the 200 and the 304 of a stored image (shared with aio/media.py)"""
+    return {
+        "ETag": f'"{media_tag(digest, size)}"',
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+    }
+
+
+@media_bp.route('/<digest>', methods=['GET'])
+@media_bp.route('/<digest>/<int:size>', methods=['GET'])
+@limiter.exempt
+def get_media(digest, size=None):
+    """
+    Serve a profile picture rendition; without a size, the largest one.
+    Public like any <img> source: the sha256 digest is the capability.
+    """
+    headers = media_headers(digest, size)
+    if request.if_none_match.contains(media_tag(digest, size)):
+        return "", 304, headers
+
+    path = media_store.thumbnail(digest, size)
+    if path is None:
+        return jsonify({"error": "Not found"}), 404
+
+    response = send_file(path, mimetype=THUMBNAIL_MIMETYPE, etag=False, conditional=False)
+    response.headers.update(headers)
+    return response
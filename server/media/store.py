@@ -0,0 +1,224 @@
+"""
+Content-addressed image store for profile pictures.
+
+An upload is keyed by the sha256 of its bytes, so identical images uploaded by
+different users are stored once. Uploads are only validated and written on the
+request path. The square WebP renditions clients load (THUMBNAIL_SIZES) are
+rendered by a small background thread pool; Pillow releases the GIL while
+decoding, resizing and encoding. Re-encoding also drops EXIF data (camera,
+GPS) from everything that is served, so originals are never served.
+
+    <MEDIA_ROOT>/originals/ab/<digest>
+    <MEDIA_ROOT>/thumbnails/ab/<digest>_<size>.webp
+
+A digest names immutable content, so /media URLs are cached forever.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, UnidentifiedImageError
+from metrics import timed
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_MIMETYPE = "image/webp"
+THUMBNAIL_QUALITY = 80
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image we accept"""
+
+
+def _write_atomically(path, write):
+    """Write through a temp file in the target directory, then rename over the target"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def render_thumbnail(source_path, target_path, size):
+    """Square, center-cropped WebP rendition of the source image"""
+    with Image.open(source_path) as image:
+        # JPEG can decode at a reduced scale directly, far cheaper than a full decode
+        image.draft("RGB", (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        _write_atomically(target_path, lambda f: image.save(f, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY))
+
+
+class MediaStore:
+    """
+    Profile picture storage and background thumbnailing.
+
+    - root: directory holding originals/ and thumbnails/
+    - sizes: square thumbnail edge lengths in pixels; the largest stands in for the full image
+    - avatar_size: the rendition users.profile_pic points at (one of sizes)
+    - base_url: origin of the /media URLs handed to clients, which run on another origin
+      (None: the origin of the upload request)
+    - workers: thumbnail threads (0 renders inline, on the request path)
+    - max_bytes / max_pixels: upload limits; max_pixels guards against decompression bombs
+
+    executor_class makes the thumbnail threads; green.py swaps in gevent's native threads.
+    """
+
+    executor_class = ThreadPoolExecutor
+
+    def __init__(self, root="uploads", sizes=(64, 256, 1024), avatar_size=256, base_url=None, workers=2,
+                 max_bytes=5 * 1024 * 1024, max_pixels=40_000_000):
+        self.root = root
+        self.sizes = tuple(sorted(sizes))
+        self.avatar_size = avatar_size
+        self.base_url = base_url
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._stats = {"uploads": 0, "deduplicated": 0, "rendered": 0, "render_failures": 0}
+
+    def init_app(self, app):
+        """Read storage settings from the app config; threads start on first upload"""
+        self.root = app.config.get("MEDIA_ROOT", self.root)
+        self.sizes = tuple(sorted(app.config.get("THUMBNAIL_SIZES", self.sizes)))
+        self.avatar_size = app.config.get("PROFILE_PIC_SIZE", self.avatar_size)
+        if self.avatar_size not in self.sizes:
+            raise ValueError(f"PROFILE_PIC_SIZE {self.avatar_size} must be one of THUMBNAIL_SIZES {self.sizes}")
+        self.base_url = app.config.get("MEDIA_BASE_URL", self.base_url)
+        self.workers = app.config.get("THUMBNAIL_WORKERS", self.workers)
+        self.max_bytes = app.config.get("PROFILE_PIC_MAX_BYTES", self.max_bytes)
+        self.max_pixels = app.config.get("PROFILE_PIC_MAX_PIXELS", self.max_pixels)
+
+    def original_path(self, digest):
+        return os.path.join(self.root, "originals", digest[:2], digest)
+
+    def thumbnail_path(self, digest, size):
+        return os.path.join(self.root, "thumbnails", digest[:2], f"{digest}_{size}.webp")
+
+    def urls(self, digest, request_origin=""):
+        """Absolute profile_pic value (the avatar_size rendition) and thumbnail URLs for a stored image"""
+        base = (self.base_url or request_origin).rstrip("/")
+        return {
+            "profile_pic": f"{base}/media/{digest}/{self.avatar_size}",
+            "thumbnails": {str(size): f"{base}/media/{digest}/{size}" for size in self.sizes},
+        }
+
+    def save(self, data):
+        """
+        Validate and store an upload, queue its thumbnails and return its digest.
+        Raises InvalidImage when the bytes are not an accepted image.
+        """
+        self._validate(data)
+        digest = hashlib.sha256(data).hexdigest()
+
+        path = self.original_path(digest)
+        if os.path.exists(path):
+            # Restart the purge grace period: the file is about to be referenced again
+            os.utime(path)
+            self._count("deduplicated")
+        else:
+            _write_atomically(path, lambda f: f.write(data))
+        self._count("uploads")
+
+        self._schedule(digest)
+        return digest
+
+    def thumbnail(self, digest, size=None):
+        """
+        Path of a rendition (the largest when size is None), or None for an unknown
+        digest or size. A rendition whose background job hasn't finished yet, e.g.
+        requested right after the upload, is rendered now.
+        """
+        size = self.sizes[-1] if size is None else size
+        if size not in self.sizes or not DIGEST_PATTERN.match(digest):
+            return None
+
+        path = self.thumbnail_path(digest, size)
+        if os.path.exists(path):
+            return path
+        if not os.path.exists(self.original_path(digest)):
+            return None
+
+        self._render(digest, size)
+        return path
+
+    def stats(self):
+        """Upload and rendering counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = len(self._pending)
+        snapshot["workers"] = self.workers
+        return snapshot
+
+    def _validate(self, data):
+        if not data:
+            raise InvalidImage("No image uploaded")
+        if len(data) > self.max_bytes:
+            raise InvalidImage(f"Images must be at most {self.max_bytes // (1024 * 1024)} MB")
+
+        # Header parse only; pixels are decoded off the request path
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format, (width, height) = image.format, image.size
+                image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+            raise InvalidImage("Not a valid image")
+
+        if image_format not in ALLOWED_FORMATS:
+            raise InvalidImage(f"Image format must be one of {', '.join(sorted(ALLOWED_FORMATS))}")
+        if width * height > self.max_pixels:
+            raise InvalidImage("Image dimensions are too large")
+
+    def _schedule(self, digest):
+        missing = [size for size in self.sizes if not os.path.exists(self.thumbnail_path(digest, size))]
+        if not missing:
+            return
+        if not self.workers:
+            self._render_all(digest, missing)
+            return
+
+        with self._lock:
+            if digest in self._pending:
+                return
+            self._pending.add(digest)
+            if self._executor is None:
+                self._executor = self.executor_class(max_workers=self.workers)
+            executor = self._executor
+
+        executor.submit(self._render_all, digest, missing)
+
+    def _render_all(self, digest, sizes):
+        try:
+            for size in sizes:
+                self._render(digest, size)
+        finally:
+            with self._lock:
+                self._pending.discard(digest)
+
+    def _render(self, digest, size):
+        try:
+            with timed("thumbnail"):
+                render_thumbnail(self.original_path(digest), self.thumbnail_path(digest, size), size)
+        except Exception:
+            self._count("render_failures")
+            raise
+        self._count("rendered")
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
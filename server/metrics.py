@@ -0,0 +1,200 @@
+"""
+Per-request timing spans and Prometheus metrics.
+
+Each request carries a span (a contextvar holding seconds per component). The
+code paths that do the work add their elapsed time to it with timed()/add_time():
+
+- db: statement execution and commits (TimedCursor, TimedAsyncCursor)
+- pool_wait: waiting for a pooled connection
+- crypto: bcrypt (HashingPool) and Fernet (extensions.fernet)
+- serialization: JSON encoding (timed_json_provider)
+- thumbnail: profile picture renditions made on the request path (media/store.py)
+
+When the response is ready, the request's total duration and each component it
+used go into histograms labelled by endpoint. GET /metrics renders them in the
+Prometheus text format, together with pool, hashing and media counters and gauges.
+
+Metrics are per process. With several gunicorn workers, each scrape sees the
+worker that answered it, so scrape every worker or accept sampled numbers.
+Streamed responses (NDJSON, CSV export) are timed up to the first byte.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2 import extensions
+
+# Upper bounds (seconds); spans range from sub-millisecond lookups to bcrypt
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_span = contextvars.ContextVar("request_span", default=None)
+
+# Stats keys that only ever grow, across pool_stats() / InstrumentedConnectionPool,
+# psycopg_pool's get_stats(), hashing_pool.stats() and media_store.stats().
+# render() exports them as counters; every other numeric stat is a gauge.
+COUNTER_STATS = frozenset({
+    # InstrumentedConnectionPool
+    "checkout_wait_sum", "checkout_wait_count", "exhausted", "timeouts", "opened", "closed",
+    "recycled", "failed_validations", "keepalive_pings",
+    # psycopg_pool.AsyncConnectionPool
+    "requests_num", "requests_queued", "requests_wait_ms", "requests_errors", "usage_ms",
+    "returns_bad", "connections_num", "connections_ms", "connections_errors", "connections_lost",
+    # HashingPool
+    "submitted", "completed", "rejected", "restarts", "wait_seconds_total", "run_seconds_total",
+    # MediaStore
+    "uploads", "deduplicated", "rendered", "render_failures",
+})
+
+
+class Histogram:
+    """Cumulative histogram per label set, rendered in the Prometheus text format"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count], sum
+        self._series = {}
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+
+        for labels, counts, total in series:
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{{{','.join(pairs + [le])}}} {cumulative}")
+            suffix = f"{{{','.join(pairs)}}}" if pairs else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by endpoint",
+    ("method", "endpoint", "status"))
+COMPONENT_SECONDS = Histogram(
+    "http_request_component_seconds", "Time spent per component within a request, by endpoint",
+    ("endpoint", "component"))
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled database connection")
+
+
+def add_time(component, seconds):
+    """Charge seconds to the current request's span (no-op outside a request)"""
+    span = _span.get()
+    if span is not None:
+        span[component] = span.get(component, 0.0) + seconds
+
+
+@contextmanager
+def timed(component):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(component, time.perf_counter() - started)
+
+
+def begin_request():
+    """Open a span for the current request"""
+    _span.set({"started": time.perf_counter()})
+
+
+def end_request(method, endpoint, status):
+    """Record the open span; endpoint is the route's endpoint name (None when unmatched)"""
+    span = _span.get()
+    if span is None:
+        return
+    _span.set(None)
+
+    endpoint = endpoint or "unmatched"
+    REQUEST_SECONDS.observe(time.perf_counter() - span.pop("started"), method, endpoint, str(status))
+    for component, seconds in span.items():
+        COMPONENT_SECONDS.observe(seconds, endpoint, component)
+
+
+def scrape_allowed(authorization, token):
+    """/metrics is open unless METRICS_TOKEN is set; then it needs `Bearer <token>`"""
+    return not token or hmac.compare_digest(authorization or "", f"Bearer {token}")
+
+
+def operator_allowed(authorization, token):
+    """/api/stats/* need `Bearer <METRICS_TOKEN>`; unlike /metrics they stay closed without one"""
+    return bool(token) and scrape_allowed(authorization, token)
+
+
+def render(stats=None):
+    """
+    Exposition text for all histograms. stats maps a prefix to a stats dict
+    (pool_stats(), hashing_pool.stats(), ...). Its numeric values in COUNTER_STATS
+    become <prefix>_<key>_total counters, the rest (occupancy, limits) gauges.
+    """
+    lines = []
+    for histogram in (REQUEST_SECONDS, COMPONENT_SECONDS, POOL_WAIT_SECONDS):
+        lines.extend(histogram.render())
+
+    for prefix, values in (stats or {}).items():
+        for key, value in sorted(values.items()):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if key in COUNTER_STATS:
+                name = f"{prefix}_{key}" if key.endswith("_total") else f"{prefix}_{key}_total"
+                lines.append(f"# TYPE {name} counter")
+            else:
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class TimedCursor(extensions.cursor):
+    """psycopg2 cursor that charges statement time to the request's db span"""
+
+    def execute(self, query, vars=None):
+        with timed("db"):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with timed("db"):
+            return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        with timed("db"):
+            return super().copy_expert(sql, file, size)
+
+
+def timed_json_provider(provider_class):
+    """Subclass of a Flask/Quart JSON provider whose dumps() is charged to serialization"""
+
+    class TimedJSONProvider(provider_class):
+        def dumps(self, obj, **kwargs):
+            with timed("serialization"):
+                return super().dumps(obj, **kwargs)
+
+    return TimedJSONProvider
@@ -0,0 +1,4 @@
+"""Baseline schema. Idempotent so it can be recorded against existing databases."""
+from schema import SCHEMA_LIST
+
+STATEMENTS = SCHEMA_LIST
@@ -0,0 +1,7 @@
+"""Indexes for the per-user listing and aggregate queries."""
+from schema import CREATE_INDEX_SOCIAL_LINKS_USER_ID, CREATE_INDEX_TOKEN_BLOCKLIST_USER_ID
+
+STATEMENTS = [
+    CREATE_INDEX_SOCIAL_LINKS_USER_ID,
+    CREATE_INDEX_TOKEN_BLOCKLIST_USER_ID,
+]
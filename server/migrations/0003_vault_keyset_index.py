@@ -0,0 +1,6 @@
+"""(user_id, id) index so paginated vault listings are an ordered index range scan."""
+from schema import CREATE_INDEX_VAULT_USER_ID
+
+STATEMENTS = [
+    CREATE_INDEX_VAULT_USER_ID,
+]
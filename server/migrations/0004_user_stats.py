@@ -0,0 +1,16 @@
+"""user_stats counters maintained by statement-level triggers on vault and social_links."""
+from schema import (
+    BACKFILL_USER_STATS,
+    CREATE_FUNCTION_USER_STATS_DELTA,
+    CREATE_TABLE_USER_STATS,
+    CREATE_TRIGGERS_SOCIAL_LINKS_STATS,
+    CREATE_TRIGGERS_VAULT_STATS,
+)
+
+STATEMENTS = [
+    CREATE_TABLE_USER_STATS,
+    CREATE_FUNCTION_USER_STATS_DELTA,
+    CREATE_TRIGGERS_VAULT_STATS,
+    CREATE_TRIGGERS_SOCIAL_LINKS_STATS,
+    BACKFILL_USER_STATS,
+]
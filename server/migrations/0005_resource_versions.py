@@ -0,0 +1,18 @@
+"""Per-resource version stamps in user_stats, bumped by triggers, for ETag responses."""
+from schema import (
+    ADD_USER_STATS_VERSION_COLUMNS,
+    CREATE_FUNCTION_USER_STATS_VERSION,
+    CREATE_TRIGGERS_HANDBOOK_VERSION,
+    CREATE_TRIGGERS_SOCIAL_LINKS_VERSION,
+    CREATE_TRIGGERS_USERS_VERSION,
+    CREATE_TRIGGERS_VAULT_VERSION,
+)
+
+STATEMENTS = [
+    ADD_USER_STATS_VERSION_COLUMNS,
+    CREATE_FUNCTION_USER_STATS_VERSION,
+    CREATE_TRIGGERS_USERS_VERSION,
+    CREATE_TRIGGERS_HANDBOOK_VERSION,
+    CREATE_TRIGGERS_SOCIAL_LINKS_VERSION,
+    CREATE_TRIGGERS_VAULT_VERSION,
+]
@@ -0,0 +1,7 @@
+"""Shared rate limit counters, so limits hold across worker processes."""
+from schema import CREATE_INDEX_RATE_LIMIT_WINDOWS_EXPIRY, CREATE_TABLE_RATE_LIMIT_WINDOWS
+
+STATEMENTS = [
+    CREATE_TABLE_RATE_LIMIT_WINDOWS,
+    CREATE_INDEX_RATE_LIMIT_WINDOWS_EXPIRY,
+]
@@ -0,0 +1,23 @@
+"""token_blocklist partitioned by token expiry, so expired revocations can be dropped a day at a time."""
+from config import BaseConfig
+from jobs.token_blocklist import longest_token_lifetime, partition_days_ahead
+from schema import (
+    CREATE_FUNCTION_TOKEN_BLOCKLIST_ENSURE_PARTITION,
+    CREATE_FUNCTION_TOKEN_BLOCKLIST_MAINTAIN,
+    CREATE_INDEX_TOKEN_BLOCKLIST_USER_ID,
+    CREATE_TABLE_TOKEN_BLOCKLIST_PARTITIONED,
+    DROP_TOKEN_BLOCKLIST_UNPARTITIONED,
+    RENAME_TOKEN_BLOCKLIST_UNPARTITIONED,
+    copy_token_blocklist_rows,
+)
+
+STATEMENTS = [
+    RENAME_TOKEN_BLOCKLIST_UNPARTITIONED,
+    CREATE_TABLE_TOKEN_BLOCKLIST_PARTITIONED,
+    CREATE_INDEX_TOKEN_BLOCKLIST_USER_ID,
+    CREATE_FUNCTION_TOKEN_BLOCKLIST_ENSURE_PARTITION,
+    CREATE_FUNCTION_TOKEN_BLOCKLIST_MAINTAIN,
+    f"SELECT token_blocklist_maintain({partition_days_ahead(vars(BaseConfig))});",
+    copy_token_blocklist_rows(longest_token_lifetime(vars(BaseConfig))),
+    DROP_TOKEN_BLOCKLIST_UNPARTITIONED,
+]
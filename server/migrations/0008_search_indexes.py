@@ -0,0 +1,16 @@
+"""Trigram GIN indexes behind /search."""
+from schema import (
+    CREATE_EXTENSION_BTREE_GIN,
+    CREATE_EXTENSION_PG_TRGM,
+    CREATE_INDEX_PERSONAL_HANDBOOK_SEARCH,
+    CREATE_INDEX_SOCIAL_LINKS_SEARCH,
+    CREATE_INDEX_VAULT_SEARCH,
+)
+
+STATEMENTS = [
+    CREATE_EXTENSION_PG_TRGM,
+    CREATE_EXTENSION_BTREE_GIN,
+    CREATE_INDEX_VAULT_SEARCH,
+    CREATE_INDEX_SOCIAL_LINKS_SEARCH,
+    CREATE_INDEX_PERSONAL_HANDBOOK_SEARCH,
+]
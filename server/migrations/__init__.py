@@ -0,0 +1,120 @@
+"""
+Versioned schema migrations.
+
+Each migration is a module in this package named NNNN_description.py that
+exposes a STATEMENTS list. Applied versions are recorded in schema_migrations,
+so the DDL runs once at deploy time (python -m migrations upgrade) and worker
+startup only has to compare the recorded version with the latest one.
+"""
+import importlib
+import os
+import re
+import psycopg2
+from db_setup import get_db_connection
+
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+# Arbitrary constant so concurrent deploys serialise on the same advisory lock
+MIGRATION_LOCK_ID = 7283401
+
+CREATE_TABLE_SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def discover_migrations():
+    """Return [(version, name, module)] for every migration file, oldest first"""
+    migrations = []
+    for filename in os.listdir(os.path.dirname(__file__)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{filename[:-3]}")
+        migrations.append((int(match.group(1)), match.group(2), module))
+
+    migrations.sort(key=lambda migration: migration[0])
+    return migrations
+
+
+def latest_version():
+    """Highest migration version shipped with this build"""
+    migrations = discover_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version():
+    """Highest applied version, 0 for a database that was never migrated"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+            version = cur.fetchone()[0]
+            conn.commit()
+        except psycopg2.errors.UndefinedTable:
+            conn.rollback()
+            version = 0
+        finally:
+            cur.close()
+
+    return version
+
+
+def apply_migrations():
+    """Apply every pending migration, each in its own transaction"""
+    applied = []
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            # Session lock: a second deploy waits here instead of racing the DDL
+            cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+            cur.execute(CREATE_TABLE_SCHEMA_MIGRATIONS)
+            cur.execute("SELECT version FROM schema_migrations;")
+            done = {row[0] for row in cur.fetchall()}
+            conn.commit()
+
+            for version, name, module in discover_migrations():
+                if version in done:
+                    continue
+                try:
+                    for statement in module.STATEMENTS:
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+                        (version, name)
+                    )
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    raise
+                print(f"Applied migration {version:04d}_{name}")
+                applied.append(version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+            conn.commit()
+            cur.close()
+
+    return applied
+
+
+def check_schema_version():
+    """Cheap startup check: warn when the database is behind this build"""
+    try:
+        current = current_version()
+    except (RuntimeError, psycopg2.Error) as e:
+        print(f"Skipping schema version check: {e}")
+        return False
+
+    latest = latest_version()
+    if current < latest:
+        print(
+            f"WARNING: database schema is at version {current}, this build expects {latest}. "
+            "Run `python -m migrations upgrade`."
+        )
+        return False
+
+    print(f"Schema version {current} is up to date.")
+    return True
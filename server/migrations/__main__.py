@@ -0,0 +1,44 @@
+"""Migration CLI: python -m migrations [upgrade|status|check-plans]"""
+import argparse
+import sys
+from db_setup import initialize_connection_pool
+from migrations import apply_migrations, current_version, discover_migrations
+from migrations.plans import check_query_plans, HOT_QUERIES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m migrations", description="Primer schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status", "check-plans"], nargs="?", default="upgrade")
+    parser.add_argument(
+        "--realistic", action="store_true",
+        help="check-plans: leave sequential scans enabled (use against a seeded database)"
+    )
+    args = parser.parse_args(argv)
+
+    if not initialize_connection_pool():
+        return 1
+
+    if args.command == "status":
+        current = current_version()
+        for version, name, _ in discover_migrations():
+            state = "applied" if version <= current else "pending"
+            print(f"{version:04d}_{name}: {state}")
+        return 0
+
+    if args.command == "check-plans":
+        failures = check_query_plans(realistic=args.realistic)
+        for name in HOT_QUERIES:
+            if name in failures:
+                print(f"FAIL {name}: sequential scan on {', '.join(failures[name])}")
+            else:
+                print(f"ok   {name}")
+        return 1 if failures else 0
+
+    applied = apply_migrations()
+    if not applied:
+        print("Database schema is already up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
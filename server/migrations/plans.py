@@ -0,0 +1,96 @@
+"""
+Query plan regression checks for the hot blueprint queries.
+
+Every query in HOT_QUERIES is run through EXPLAIN (FORMAT JSON) and the check
+fails if the plan contains a sequential scan on a per-user table. By default
+sequential scans are disabled for the session, which asks "is there an index
+that can serve this query?" and works on an empty database. With realistic=True
+the planner runs unconstrained, which is meaningful once the database has been
+seeded with production-like volumes.
+"""
+import json
+import re
+import time
+from db_setup import get_db_connection
+from search.query import SEARCH_TYPES, search_params, search_query
+
+# Tables whose access must always go through an index
+INDEXED_TABLES = {
+    "users", "vault", "social_links", "personal_handbook", "token_blocklist", "vault_passwords", "user_stats",
+}
+
+PARTITION_SUFFIX = re.compile(r"_p\d{8}$")
+
+# name -> query; %(user_id)s is bound to the user with the most vault rows
+HOT_QUERIES = {
+    "signin": "SELECT id, password FROM users WHERE username=%(username)s;",
+    "token_revoked": "SELECT 1 FROM token_blocklist WHERE jti=%(jti)s AND expires_at=to_timestamp(%(exp)s);",
+    "vault_list": "SELECT id, domain, account_name, url, notes FROM vault WHERE user_id=%(user_id)s",
+    "vault_page": "SELECT id, domain FROM vault WHERE user_id=%(user_id)s AND id > %(row_id)s ORDER BY id LIMIT 101",
+    "vault_view": "SELECT domain, account_name, pin_or_password, url, notes FROM vault WHERE id=%(row_id)s AND user_id=%(user_id)s",
+    "vault_reveal": "SELECT id, pin_or_password FROM vault WHERE user_id=%(user_id)s AND id = ANY(ARRAY[%(row_id)s])",
+    "vault_password": "SELECT vault_password FROM vault_passwords WHERE user_id=%(user_id)s",
+    "social_list": "SELECT id, platform_name, username, profile_link FROM social_links WHERE user_id=%(user_id)s",
+    "social_page": "SELECT id, platform_name FROM social_links WHERE user_id=%(user_id)s AND id > %(row_id)s ORDER BY id LIMIT 101",
+    "handbook_list": "SELECT field_name, field_value FROM personal_handbook WHERE user_id = %(user_id)s",
+    "dashboard": """
+        SELECT u.username, COALESCE(s.vault_count, 0), COALESCE(s.social_count, 0)
+        FROM users u LEFT JOIN user_stats s ON s.user_id = u.id
+        WHERE u.id = %(user_id)s;
+    """,
+    "search": search_query(list(SEARCH_TYPES)),
+}
+
+
+def _sample_params(cur):
+    """Bind the hot queries to the busiest user so the plans reflect real selectivity"""
+    cur.execute("SELECT user_id FROM vault GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1;")
+    row = cur.fetchone()
+    user_id = row[0] if row else 1
+    return {
+        "user_id": user_id,
+        "row_id": 1,
+        "username": "plan-check",
+        "jti": "plan-check",
+        # An hour out lands in a partition the blocklist upkeep has already created
+        "exp": int(time.time()) + 3600,
+        **search_params(user_id, "plan-check", 0, 20),
+    }
+
+
+def _table(relation):
+    """Parent table of a day partition (token_blocklist_p20250101 -> token_blocklist)"""
+    return PARTITION_SUFFIX.sub("", relation or "")
+
+
+def _seq_scans(node, found):
+    if node.get("Node Type") == "Seq Scan" and _table(node.get("Relation Name")) in INDEXED_TABLES:
+        found.append(node["Relation Name"])
+    for child in node.get("Plans", []):
+        _seq_scans(child, found)
+    return found
+
+
+def check_query_plans(realistic=False):
+    """Return {query_name: [tables scanned sequentially]} for every failing query"""
+    failures = {}
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        try:
+            params = _sample_params(cur)
+            if not realistic:
+                cur.execute("SET LOCAL enable_seqscan = off;")
+
+            for name, query in HOT_QUERIES.items():
+                cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = _seq_scans(plan[0]["Plan"], [])
+                if scans:
+                    failures[name] = scans
+        finally:
+            conn.rollback()
+            cur.close()
+
+    return failures
@@ -0,0 +1,79 @@
+"""Validation and per-item results for POST /personal/handbook/batch"""
+
+# Upper bound on upserts + deletes in one /handbook/batch call
+MAX_HANDBOOK_BATCH = 500
+
+DELETE_FIELDS = """
+    DELETE FROM personal_handbook
+    WHERE user_id = %s AND field_name = ANY(%s)
+    RETURNING field_name;
+"""
+
+
+def parse_batch(data):
+    """(upserts, deletes) from a batch body; raises ValueError on a malformed body"""
+    upserts = data.get("upserts") or []
+    deletes = data.get("deletes") or []
+
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        raise ValueError("upserts and deletes must be lists")
+
+    if not upserts and not deletes:
+        raise ValueError("Nothing to update")
+
+    if len(upserts) + len(deletes) > MAX_HANDBOOK_BATCH:
+        raise ValueError(f"At most {MAX_HANDBOOK_BATCH} changes per batch")
+
+    return upserts, deletes
+
+
+def prepare_upserts(upserts):
+    """
+    Validate upserts. Returns (per-item results, pending) where pending maps
+    field_name -> (index, value); a repeated field keeps its last value.
+    """
+    upsert_results = []
+    pending = {}
+    for index, item in enumerate(upserts):
+        field_name = item.get("field_name") if isinstance(item, dict) else None
+        field_value = item.get("field_value") if isinstance(item, dict) else None
+        if not field_name or field_value is None:
+            upsert_results.append({"index": index, "status": "error", "error": "field_name and field_value required"})
+        elif not isinstance(field_name, str):
+            upsert_results.append({"index": index, "status": "error", "error": "field_name must be a string"})
+        elif not isinstance(field_value, str):
+            upsert_results.append({"index": index, "field_name": field_name, "status": "error",
+                                   "error": "field_value must be a string"})
+        elif len(field_name) > 100:
+            upsert_results.append({"index": index, "field_name": field_name, "status": "error", "error": "field_name is too long"})
+        else:
+            pending[field_name] = (index, field_value)
+            upsert_results.append({"index": index, "field_name": field_name, "status": "pending"})
+
+    return upsert_results, pending
+
+
+def delete_names(deletes):
+    """The well-formed field names among the requested deletes"""
+    return [name for name in deletes if isinstance(name, str) and name]
+
+
+def batch_results(upsert_results, pending, written, deletes, deleted):
+    """Response body; written maps field_name -> True when the upsert inserted a new row"""
+    for result in upsert_results:
+        if result["status"] != "pending":
+            continue
+        field_name = result["field_name"]
+        if pending[field_name][0] != result["index"]:
+            result["status"] = "superseded"
+        else:
+            result["status"] = "created" if written.get(field_name) else "updated"
+
+    delete_results = [
+        {"index": index, "field_name": name, "status": "deleted" if name in deleted else "not_found"}
+        if isinstance(name, str) and name else
+        {"index": index, "status": "error", "error": "field_name required"}
+        for index, name in enumerate(deletes)
+    ]
+
+    return {"upserts": upsert_results, "deletes": delete_results}
@@ -0,0 +1,7 @@
+"""Response shapes (and the profile picture update) shared by personal_info/routes.py and aio/personal.py"""
+from utils.rows import row_mapper
+
+PROFILE = row_mapper(("username", "email", "full_name", "phone", "age", "gender", "profile_pic", "address"))
+HANDBOOK_FIELD = row_mapper(("field_name", "field_value"))
+
+UPDATE_PROFILE_PIC = "UPDATE users SET profile_pic=%s, updated_at=CURRENT_TIMESTAMP WHERE id=%s;"
@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from db_setup import get_db_connection
+from psycopg2.extras import execute_values
+from extensions import limiter, media_store
+from media.store import InvalidImage
+from personal_info.batch import DELETE_FIELDS, batch_results, delete_names, parse_batch, prepare_upserts
+from personal_info.mappers import HANDBOOK_FIELD, PROFILE, UPDATE_PROFILE_PIC
+from repository import transaction
+from utils.etag import current_etag, etag_headers, is_not_modified
 
 
 personal_bp = Blueprint('personal_info', __name__, url_prefix='/personal')
@@ -17,46 +23,66 @@ def save_personal_info():
     age = data.get('age')
     address = data.get('address')
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with transaction() as cur:
             cur.execute("""
                 UPDATE users SET profile_pic=%s, full_name=%s, age=%s, address=%s, updated_at=CURRENT_TIMESTAMP
                 WHERE id=%s;
             """, (profile_pic, full_name, age, address, user_id))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)})
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)})
             
     return jsonify({"message": "Profile updated!"})
 
 
+@personal_bp.route('/profile-pic', methods=['POST'])
+@jwt_required()
+@limiter.limit("10 per minute")
+def upload_profile_pic():
+    """
+    Store an uploaded profile picture (multipart field "image", or the raw body)
+    and point profile_pic at it. Thumbnails are rendered in the background.
+    """
+    user_id = get_jwt_identity()
+    image = request.files.get("image")
+    data = image.read() if image else request.get_data()
+
+    try:
+        digest = media_store.save(data)
+    except InvalidImage as e:
+        return jsonify({"error": str(e)}), 400
+
+    urls = media_store.urls(digest, request.host_url)
+    try:
+        with transaction() as cur:
+            cur.execute(UPDATE_PROFILE_PIC, (urls["profile_pic"], user_id))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(urls), 201
+
+
 @personal_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_personal_info():
     """Retrieve user's personal information"""
     user_id = get_jwt_identity()
-    print("HIT: user profile endpoint")
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT username, email, full_name, phone, age, gender, profile_pic, address FROM users WHERE id=%s;", (user_id,))
+
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            etag = current_etag(cur, request, user_id, "profile")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            cur.execute(f"SELECT {PROFILE.columns} FROM users WHERE id=%s;", (user_id,))
             user_data = cur.fetchone()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     if not user_data:
         return jsonify({"error": "User not found"}), 404
 
-    keys = ['username', 'email', 'full_name', 'phone', 'age', 'gender', 'profile_pic', 'address']
-
-    return jsonify(dict(zip(keys, user_data)))
+    return jsonify(PROFILE(user_data)), 200, etag_headers(etag)
 
 
 @personal_bp.route("/handbook", methods=["GET"])
@@ -65,19 +91,18 @@ def get_personal_handbook():
     """Get user's personal handbook information"""
     user_id = get_jwt_identity()
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT field_name, field_value FROM personal_handbook WHERE user_id = %s", (user_id,))
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            etag = current_etag(cur, request, user_id, "handbook")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            cur.execute(f"SELECT {HANDBOOK_FIELD.columns} FROM personal_handbook WHERE user_id = %s", (user_id,))
             rows = cur.fetchall()
-        except Exception as e:
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
         
-    result = [{"field_name": row[0], "field_value": row[1]} for row in rows]
-
-    return jsonify(result), 200
+    return jsonify(list(map(HANDBOOK_FIELD, rows))), 200, etag_headers(etag)
 
 
 @personal_bp.route("/handbook/update", methods=["POST"])
@@ -89,25 +114,62 @@ def add_or_update_field():
     field_name = data.get("field_name")
     field_value = data.get("field_value")
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with transaction() as cur:
             cur.execute("""
                 INSERT INTO personal_handbook (user_id, field_name, field_value)
                 VALUES (%s, %s, %s)
                 ON CONFLICT (user_id, field_name)
                 DO UPDATE SET field_value = EXCLUDED.field_value, updated_at = CURRENT_TIMESTAMP;
             """, (user_id, field_name, field_value))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({"message": f"{field_name} updated successfully"}), 200
 
 
+@personal_bp.route("/handbook/batch", methods=["POST"])
+@jwt_required()
+def batch_update_handbook():
+    """
+    Apply many handbook field upserts and deletes in one transaction.
+    Deletes run first, then upserts, each as a single multi-row statement.
+    Body: {"upserts": [{"field_name", "field_value"}], "deletes": ["field_name", ...]}
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        upserts, deletes = parse_batch(request.get_json() or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    upsert_results, pending = prepare_upserts(upserts)
+    names_to_delete = delete_names(deletes)
+
+    try:
+        with transaction() as cur:
+            deleted = set()
+            if names_to_delete:
+                cur.execute(DELETE_FIELDS, (user_id, names_to_delete))
+                deleted = {row[0] for row in cur.fetchall()}
+
+            written = {}
+            if pending:
+                rows = execute_values(cur, """
+                    INSERT INTO personal_handbook (user_id, field_name, field_value)
+                    VALUES %s
+                    ON CONFLICT (user_id, field_name)
+                    DO UPDATE SET field_value = EXCLUDED.field_value, updated_at = CURRENT_TIMESTAMP
+                    RETURNING field_name, (xmax = 0);
+                """, [(user_id, name, value) for name, (_, value) in pending.items()],
+                    page_size=len(pending), fetch=True)
+                written = dict(rows)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(batch_results(upsert_results, pending, written, deletes, deleted)), 200
+
+
 @personal_bp.route('/update', methods=['POST'])
 @jwt_required()
 def update_personal_info():
@@ -141,18 +203,14 @@ def update_personal_info():
     fields_to_update.append("updated_at=CURRENT_TIMESTAMP")
     values.append(user_id)
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
+    try:
+        with transaction() as cur:
             query = f"""
                 UPDATE users SET {', '.join(fields_to_update)}
                 WHERE id=%s
             """
             cur.execute(query, values)
-            conn.commit()
-        except Exception as e:
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify({"message": "Profile updated!"})
@@ -0,0 +1,166 @@
+"""
+Rate limit storage shared by every worker, kept in PostgreSQL.
+
+Flask-Limiter's default memory:// storage gives each gunicorn worker its own
+counters, so a "2 per minute" limit really allows 2 x workers. This storage
+keeps the counters in the rate_limit_windows table through the existing
+connection pool. Every worker, and every host, then draws from the same budget.
+
+Each hit is one upsert. For the sliding window counter, the previous window's
+weighted count is read inside that same statement, and the conditional
+ON CONFLICT update serialises concurrent hits on the row lock. Racing workers
+can therefore never overshoot the limit, and there is no decrement-on-overshoot
+step like the one in-memory storage needs.
+
+Selected with RATELIMIT_STORAGE_URI = "postgresql+pool://". The ASGI app
+uses the same SQL through "async+postgresql+pool://" (aio/ratelimit.py).
+"""
+import time
+import psycopg2
+from limits.storage import SlidingWindowCounterSupport, Storage
+from repository import transaction
+
+# Plain counters (fixed window strategy) share the table under window_id 0
+INCR = """
+    INSERT INTO rate_limit_windows AS w (key, window_id, hits, expires_at)
+    VALUES (%(key)s, 0, %(amount)s, now() + make_interval(secs => %(expiry)s))
+    ON CONFLICT (key, window_id) DO UPDATE SET
+        hits = CASE WHEN w.expires_at <= now() THEN EXCLUDED.hits ELSE w.hits + EXCLUDED.hits END,
+        expires_at = CASE WHEN w.expires_at <= now() THEN EXCLUDED.expires_at ELSE w.expires_at END
+    RETURNING hits;
+"""
+
+GET = """
+    SELECT hits FROM rate_limit_windows WHERE key = %(key)s AND window_id = 0 AND expires_at > now();
+"""
+
+GET_EXPIRY = """
+    SELECT EXTRACT(EPOCH FROM expires_at) FROM rate_limit_windows
+    WHERE key = %(key)s AND window_id = 0 AND expires_at > now();
+"""
+
+# Admits the hit only while floor(weight * previous) + current + amount <= limit.
+# Without a current row the INSERT's own WHERE decides; with one, the ON CONFLICT
+# WHERE re-checks against the locked row, so concurrent hits are counted exactly.
+ACQUIRE_SLIDING_WINDOW = """
+    WITH previous AS (
+        SELECT FLOOR(%(weight)s * COALESCE(MAX(hits), 0)) AS weighted
+        FROM rate_limit_windows WHERE key = %(key)s AND window_id = %(previous)s
+    )
+    INSERT INTO rate_limit_windows AS w (key, window_id, hits, expires_at)
+    SELECT %(key)s, %(current)s, %(amount)s, now() + make_interval(secs => %(ttl)s)
+    FROM previous
+    WHERE previous.weighted + %(amount)s <= %(limit)s
+    ON CONFLICT (key, window_id) DO UPDATE SET hits = w.hits + EXCLUDED.hits
+    WHERE w.hits + EXCLUDED.hits <= %(limit)s - (
+        SELECT FLOOR(%(weight)s * COALESCE(MAX(hits), 0))
+        FROM rate_limit_windows WHERE key = %(key)s AND window_id = %(previous)s
+    )
+    RETURNING hits;
+"""
+
+SLIDING_WINDOW_COUNTS = """
+    SELECT COALESCE(MAX(hits) FILTER (WHERE window_id = %(previous)s), 0),
+           COALESCE(MAX(hits) FILTER (WHERE window_id = %(current)s), 0)
+    FROM rate_limit_windows
+    WHERE key = %(key)s AND window_id IN (%(previous)s, %(current)s);
+"""
+
+CLEAR_SLIDING_WINDOW = """
+    DELETE FROM rate_limit_windows WHERE key = %(key)s AND window_id IN (%(previous)s, %(current)s);
+"""
+
+CLEAR = "DELETE FROM rate_limit_windows WHERE key = %(key)s;"
+
+RESET = "DELETE FROM rate_limit_windows;"
+
+PURGE_EXPIRED = "DELETE FROM rate_limit_windows WHERE expires_at <= now();"
+
+
+def sliding_window(expiry, now):
+    """
+    Window numbers and the previous window's weight at `now`, matching
+    limits' TimestampedSlidingWindow keys so the strategies' math lines up.
+    """
+    current = int(now // expiry)
+    progress = (now / expiry) % 1
+    return {
+        "previous": current - 1,
+        "current": current,
+        "weight": 1 - progress,
+        # A window's row is read until the end of the next one
+        "ttl": 2 * expiry,
+    }
+
+
+def sliding_window_info(expiry, now, previous_count, current_count):
+    """(previous count, previous TTL, current count, current TTL) as limits expects"""
+    progress = (now / expiry) % 1
+    previous_ttl = (1 - progress) * expiry if previous_count else 0.0
+    return previous_count, previous_ttl, current_count, (1 - progress) * expiry + expiry
+
+
+class PostgresStorage(Storage, SlidingWindowCounterSupport):
+    """limits storage on the psycopg2 pool (repository.transaction)"""
+
+    STORAGE_SCHEME = ["postgresql+pool"]
+
+    @property
+    def base_exceptions(self):
+        return psycopg2.Error
+
+    def _fetchone(self, query, params=None):
+        with transaction() as cur:
+            cur.execute(query, params)
+            return cur.fetchone()
+
+    def _execute(self, query, params=None):
+        with transaction() as cur:
+            cur.execute(query, params)
+            return cur.rowcount
+
+    def incr(self, key, expiry, amount=1):
+        return self._fetchone(INCR, {"key": key, "expiry": expiry, "amount": amount})[0]
+
+    def get(self, key):
+        row = self._fetchone(GET, {"key": key})
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._fetchone(GET_EXPIRY, {"key": key})
+        return float(row[0]) if row else time.time()
+
+    def check(self):
+        # Flask-Limiter polls this to leave its in-memory fallback, so report rather than raise
+        try:
+            return self._fetchone("SELECT 1;") == (1,)
+        except (psycopg2.Error, RuntimeError):
+            return False
+
+    def reset(self):
+        return self._execute(RESET)
+
+    def clear(self, key):
+        self._execute(CLEAR, {"key": key})
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        params = {"key": key, "limit": limit, "amount": amount, **sliding_window(expiry, time.time())}
+        return self._fetchone(ACQUIRE_SLIDING_WINDOW, params) is not None
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_count, current_count = self._fetchone(
+            SLIDING_WINDOW_COUNTS, {"key": key, **sliding_window(expiry, now)})
+        return sliding_window_info(expiry, now, previous_count, current_count)
+
+    def clear_sliding_window(self, key, expiry):
+        self._execute(CLEAR_SLIDING_WINDOW, {"key": key, **sliding_window(expiry, time.time())})
+
+
+def purge_expired_windows():
+    """Delete counters past their expiry; returns the number of rows removed"""
+    with transaction() as cur:
+        cur.execute(PURGE_EXPIRED)
+        return cur.rowcount
@@ -0,0 +1,120 @@
+"""
+Shared data access layer.
+
+Owns connection checkout and transaction handling for the blueprints, and
+expresses ownership-checked mutations as single statements so "not found"
+versus "not yours" is decided in one round trip.
+"""
+import uuid
+from contextlib import contextmanager
+from db_setup import get_db_connection
+from metrics import timed
+
+# Outcomes of an ownership-checked mutation
+OK = "ok"
+NOT_FOUND = "not_found"
+FORBIDDEN = "forbidden"
+
+# Tables with (id, user_id) rows that handlers may mutate through the helpers below
+OWNED_TABLES = {"vault", "social_links", "personal_handbook"}
+
+
+@contextmanager
+def transaction(readonly=False, user_id=None):
+    """
+    Yield a cursor inside a transaction: commit on success, roll back on any error.
+    readonly=True lets a read replica serve it (see db_setup.get_db_connection).
+    """
+    with get_db_connection(readonly, user_id) as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+            with timed("db"):
+                conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+@contextmanager
+def server_side_cursor(itersize=500, readonly=False, user_id=None):
+    """Yield a named cursor that fetches rows from the server in batches of itersize"""
+    with get_db_connection(readonly, user_id) as conn:
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cur.itersize = itersize
+        try:
+            yield cur
+        finally:
+            cur.close()
+            conn.rollback()
+
+
+def _identifier(name):
+    """Quote an identifier the way sql.Identifier does, without needing a connection"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _owned_statement(table, mutation):
+    if table not in OWNED_TABLES:
+        raise ValueError(f"{table} is not an owned table")
+
+    # `target` reads the row as it was before the mutation (CTEs share one snapshot),
+    # so a missing row and a row owned by someone else are told apart in one query.
+    return f"""
+        WITH target AS (
+            SELECT user_id FROM {_identifier(table)} WHERE id = %(id)s
+        ), changed AS (
+            {mutation}
+            WHERE id = %(id)s AND user_id = %(user_id)s
+            RETURNING *
+        )
+        SELECT (SELECT user_id FROM target), (SELECT row_to_json(changed) FROM changed);
+    """
+
+
+# The statements are plain strings with %(name)s placeholders, so the psycopg 3
+# layer (aio/db.py) builds them here too and only differs in how it executes them.
+
+def delete_owned_statement(table, row_id, user_id):
+    """(query, params) deleting a row owned by user_id; its result goes to owned_outcome"""
+    mutation = f"DELETE FROM {_identifier(table)}"
+    return _owned_statement(table, mutation), {"id": row_id, "user_id": user_id}
+
+
+def update_owned_statement(table, row_id, user_id, values):
+    """(query, params) updating a row owned by user_id; columns whose value is None are kept"""
+    assignments = ", ".join(
+        f"{_identifier(column)} = COALESCE(%(v_{column})s, {_identifier(column)})" for column in values
+    )
+    mutation = f"UPDATE {_identifier(table)} SET {assignments}"
+
+    params = {f"v_{column}": value for column, value in values.items()}
+    params.update({"id": row_id, "user_id": user_id})
+    return _owned_statement(table, mutation), params
+
+
+def owned_outcome(row):
+    """(OK | NOT_FOUND | FORBIDDEN, changed row dict) from the row an owned statement returns"""
+    owner, changed = row
+    if owner is None:
+        return NOT_FOUND, None
+    if changed is None:
+        return FORBIDDEN, None
+    return OK, changed
+
+
+def delete_owned(cur, table, row_id, user_id):
+    """Delete a row owned by user_id; returns (OK | NOT_FOUND | FORBIDDEN, deleted row dict)"""
+    cur.execute(*delete_owned_statement(table, row_id, user_id))
+    return owned_outcome(cur.fetchone())
+
+
+def update_owned(cur, table, row_id, user_id, values):
+    """
+    Update a row owned by user_id. Columns whose value is None keep their current
+    value. Returns (OK | NOT_FOUND | FORBIDDEN, updated row dict).
+    """
+    cur.execute(*update_owned_statement(table, row_id, user_id, values))
+    return owned_outcome(cur.fetchone())
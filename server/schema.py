@@ -116,6 +116,312 @@ CREATE_TABLE_TOKEN_BLOCKLIST = """
     );
 """
 
+# Per-user access paths. personal_handbook is already covered by uk_user_field
+# (user_id, field_name) and vault by UNIQUE(user_id, domain).
+CREATE_INDEX_SOCIAL_LINKS_USER_ID = """
+    CREATE INDEX IF NOT EXISTS idx_social_links_user_id ON social_links (user_id, id);
+"""
+
+# Keyset pagination walks vault rows in id order per user
+CREATE_INDEX_VAULT_USER_ID = """
+    CREATE INDEX IF NOT EXISTS idx_vault_user_id ON vault (user_id, id);
+"""
+
+CREATE_INDEX_TOKEN_BLOCKLIST_USER_ID = """
+    CREATE INDEX IF NOT EXISTS idx_token_blocklist_user_id ON token_blocklist (user_id);
+"""
+
+# Per-user row counts served by /api/dashboard, kept current by the triggers below
+CREATE_TABLE_USER_STATS = """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+        vault_count INTEGER NOT NULL DEFAULT 0,
+        social_count INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+# Statement-level trigger: one statement per counter change however many rows a
+# bulk import or batch delete touched. TG_ARGV[0] names the user_stats counter.
+CREATE_FUNCTION_USER_STATS_DELTA = """
+    CREATE OR REPLACE FUNCTION user_stats_apply_delta() RETURNS trigger AS $$
+    DECLARE
+        counter TEXT := TG_ARGV[0];
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            EXECUTE format(
+                'INSERT INTO user_stats AS s (user_id, %1$I) '
+                'SELECT user_id, COUNT(*) FROM new_rows n '
+                'WHERE user_id IS NOT NULL AND %2$s GROUP BY user_id '
+                'ON CONFLICT (user_id) DO UPDATE '
+                'SET %1$I = s.%1$I + EXCLUDED.%1$I, updated_at = CURRENT_TIMESTAMP',
+                counter,
+                -- An UPDATE only changes counts for rows that moved between users
+                CASE WHEN TG_OP = 'UPDATE'
+                    THEN 'NOT EXISTS (SELECT 1 FROM old_rows o WHERE o.id = n.id AND o.user_id = n.user_id)'
+                    ELSE 'TRUE' END
+            );
+        END IF;
+
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            EXECUTE format(
+                'UPDATE user_stats s SET %1$I = GREATEST(s.%1$I - d.removed, 0), updated_at = CURRENT_TIMESTAMP '
+                'FROM (SELECT user_id, COUNT(*) AS removed FROM old_rows o WHERE %2$s GROUP BY user_id) d '
+                'WHERE s.user_id = d.user_id',
+                counter,
+                CASE WHEN TG_OP = 'UPDATE'
+                    THEN 'NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = o.id AND n.user_id = o.user_id)'
+                    ELSE 'TRUE' END
+            );
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def _user_stats_triggers(table, counter):
+    return f"""
+    DROP TRIGGER IF EXISTS {table}_stats_insert ON {table};
+    CREATE TRIGGER {table}_stats_insert AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_stats_apply_delta('{counter}');
+
+    DROP TRIGGER IF EXISTS {table}_stats_delete ON {table};
+    CREATE TRIGGER {table}_stats_delete AFTER DELETE ON {table}
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_stats_apply_delta('{counter}');
+
+    DROP TRIGGER IF EXISTS {table}_stats_update ON {table};
+    CREATE TRIGGER {table}_stats_update AFTER UPDATE ON {table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_stats_apply_delta('{counter}');
+"""
+
+
+CREATE_TRIGGERS_VAULT_STATS = _user_stats_triggers("vault", "vault_count")
+CREATE_TRIGGERS_SOCIAL_LINKS_STATS = _user_stats_triggers("social_links", "social_count")
+
+# One-off fill for users that existed before the triggers; runs in the migration
+# transaction, whose trigger DDL holds writers off until the counts are in place
+BACKFILL_USER_STATS = """
+    INSERT INTO user_stats (user_id, vault_count, social_count)
+    SELECT u.id, COALESCE(v.n, 0), COALESCE(l.n, 0)
+    FROM users u
+    LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM vault GROUP BY user_id) v ON v.user_id = u.id
+    LEFT JOIN (SELECT user_id, COUNT(*) AS n FROM social_links GROUP BY user_id) l ON l.user_id = u.id
+    ON CONFLICT (user_id) DO NOTHING;
+"""
+
+# Per-user, per-resource version stamps behind the ETags of the read endpoints
+ADD_USER_STATS_VERSION_COLUMNS = """
+    ALTER TABLE user_stats
+        ADD COLUMN IF NOT EXISTS profile_version BIGINT NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS handbook_version BIGINT NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS social_version BIGINT NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS vault_version BIGINT NOT NULL DEFAULT 0;
+"""
+
+# Bumps TG_ARGV[0] once per statement for every user owning a changed row;
+# TG_ARGV[1] is the owner column (user_id, or id on users itself). The users
+# join skips owners deleted in the same statement (ON DELETE CASCADE).
+CREATE_FUNCTION_USER_STATS_VERSION = """
+    CREATE OR REPLACE FUNCTION user_stats_bump_version() RETURNS trigger AS $$
+    DECLARE
+        changed TEXT;
+    BEGIN
+        changed := CASE TG_OP
+            WHEN 'INSERT' THEN 'SELECT %2$I AS user_id FROM new_rows'
+            WHEN 'DELETE' THEN 'SELECT %2$I AS user_id FROM old_rows'
+            ELSE 'SELECT %2$I AS user_id FROM new_rows UNION SELECT %2$I FROM old_rows'
+        END;
+
+        EXECUTE format(
+            'INSERT INTO user_stats AS s (user_id, %1$I) '
+            'SELECT DISTINCT c.user_id, 1 FROM (' || changed || ') c JOIN users u ON u.id = c.user_id '
+            'ON CONFLICT (user_id) DO UPDATE SET %1$I = s.%1$I + 1',
+            TG_ARGV[0], TG_ARGV[1]
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def _version_triggers(table, version_column, owner_column="user_id", operations=("INSERT", "UPDATE", "DELETE")):
+    referencing = {
+        "INSERT": "NEW TABLE AS new_rows",
+        "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "OLD TABLE AS old_rows",
+    }
+    return "".join(f"""
+    DROP TRIGGER IF EXISTS {table}_version_{operation.lower()} ON {table};
+    CREATE TRIGGER {table}_version_{operation.lower()} AFTER {operation} ON {table}
+        REFERENCING {referencing[operation]}
+        FOR EACH STATEMENT EXECUTE FUNCTION user_stats_bump_version('{version_column}', '{owner_column}');
+""" for operation in operations)
+
+
+# Profile fields only change through UPDATE; signup starts at version 0
+CREATE_TRIGGERS_USERS_VERSION = _version_triggers("users", "profile_version", "id", ("UPDATE",))
+CREATE_TRIGGERS_HANDBOOK_VERSION = _version_triggers("personal_handbook", "handbook_version")
+CREATE_TRIGGERS_SOCIAL_LINKS_VERSION = _version_triggers("social_links", "social_version")
+CREATE_TRIGGERS_VAULT_VERSION = _version_triggers("vault", "vault_version")
+
+# Rate limit counters shared by every worker (ratelimit_storage.py). Sliding
+# windows are one row per (key, window number); plain counters use window_id 0.
+# UNLOGGED: counters are disposable, so skip WAL; they are emptied after a crash.
+# fillfactor leaves room for HOT updates, since only `hits` changes in place.
+CREATE_TABLE_RATE_LIMIT_WINDOWS = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_windows (
+        key TEXT NOT NULL,
+        window_id BIGINT NOT NULL,
+        hits INTEGER NOT NULL,
+        expires_at TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (key, window_id)
+    ) WITH (fillfactor = 70);
+"""
+
+CREATE_INDEX_RATE_LIMIT_WINDOWS_EXPIRY = """
+    CREATE INDEX IF NOT EXISTS idx_rate_limit_windows_expires_at ON rate_limit_windows (expires_at);
+"""
+
+# token_blocklist range partitioned by token expiry, one partition per UTC day.
+# Every row in a partition whose range has ended belongs to an expired token,
+# which JWT verification rejects before the blocklist is consulted, so whole
+# partitions are dropped (token_blocklist_maintain) instead of deleting rows.
+# The primary key has to include the partition key.
+CREATE_TABLE_TOKEN_BLOCKLIST_PARTITIONED = """
+    CREATE TABLE IF NOT EXISTS token_blocklist (
+        jti TEXT NOT NULL,
+        token_type TEXT,
+        user_id INTEGER,
+        revoked_at TIMESTAMP DEFAULT now(),
+        expires_at TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (jti, expires_at)
+    ) PARTITION BY RANGE (expires_at);
+"""
+
+# Frees the original names for the partitioned table; the old table is
+# dropped once its live rows are copied over
+RENAME_TOKEN_BLOCKLIST_UNPARTITIONED = """
+    ALTER TABLE token_blocklist RENAME TO token_blocklist_unpartitioned;
+    ALTER TABLE token_blocklist_unpartitioned RENAME CONSTRAINT token_blocklist_pkey TO token_blocklist_unpartitioned_pkey;
+    DROP INDEX IF EXISTS idx_token_blocklist_user_id;
+"""
+
+DROP_TOKEN_BLOCKLIST_UNPARTITIONED = """
+    DROP TABLE IF EXISTS token_blocklist_unpartitioned;
+"""
+
+# Creates the day partition holding `at` unless it exists. Writers call it
+# before inserting, so a revocation never fails for want of a partition; the
+# exception handler covers two sessions creating the same day at once.
+CREATE_FUNCTION_TOKEN_BLOCKLIST_ENSURE_PARTITION = """
+    CREATE OR REPLACE FUNCTION token_blocklist_ensure_partition(at TIMESTAMPTZ) RETURNS void AS $$
+    DECLARE
+        day_start TIMESTAMPTZ := date_trunc('day', at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+        partition_name TEXT := 'token_blocklist_p' || to_char(at AT TIME ZONE 'UTC', 'YYYYMMDD');
+    BEGIN
+        IF to_regclass(partition_name) IS NOT NULL THEN
+            RETURN;
+        END IF;
+
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF token_blocklist FOR VALUES FROM (%L) TO (%L)',
+                partition_name, day_start, day_start + interval '1 day'
+            );
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            NULL;
+        END;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+# Creates partitions for today and the next `days_ahead` days, then drops every
+# partition whose range ended before now; returns how many were dropped. Each
+# app process runs it periodically, so the advisory lock lets one do the work.
+# DROP needs an ACCESS EXCLUSIVE lock on token_blocklist; lock_timeout keeps
+# lookups from queueing behind it for long, and a timed out run retries later.
+CREATE_FUNCTION_TOKEN_BLOCKLIST_MAINTAIN = """
+    CREATE OR REPLACE FUNCTION token_blocklist_maintain(days_ahead INTEGER) RETURNS INTEGER AS $$
+    DECLARE
+        expired REGCLASS;
+        dropped INTEGER := 0;
+    BEGIN
+        IF NOT pg_try_advisory_xact_lock(7283402) THEN
+            RETURN 0;
+        END IF;
+
+        PERFORM token_blocklist_ensure_partition(now() + make_interval(days => d))
+        FROM generate_series(0, days_ahead) AS d;
+
+        PERFORM set_config('lock_timeout', '2s', true);
+        FOR expired IN
+            SELECT i.inhrelid::regclass
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'token_blocklist'::regclass
+              AND (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz <= now()
+        LOOP
+            EXECUTE format('DROP TABLE %s', expired);
+            dropped := dropped + 1;
+        END LOOP;
+
+        RETURN dropped;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def copy_token_blocklist_rows(lifetime_seconds):
+    """
+    Move still-live rows into the partitioned table, whose partitions must already
+    cover the next lifetime_seconds. Old rows never recorded the token's exp, so
+    assume the longest token lifetime from their revoked_at (stored as naive
+    UTC); rows past that are expired and left behind.
+    """
+    expires_at = f"(revoked_at AT TIME ZONE 'UTC') + make_interval(secs => {int(lifetime_seconds)})"
+    return f"""
+    INSERT INTO token_blocklist (jti, token_type, user_id, revoked_at, expires_at)
+    SELECT jti, token_type, user_id, revoked_at, {expires_at}
+    FROM token_blocklist_unpartitioned
+    WHERE {expires_at} > now();
+"""
+
+
+# /search (search/query.py): trigram matching over the non-secret text columns.
+# pg_trgm provides the gin_trgm_ops operator class; btree_gin lets user_id sit in
+# the same GIN index, so a search only reads the posting lists of one user's rows.
+CREATE_EXTENSION_PG_TRGM = """
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+"""
+
+CREATE_EXTENSION_BTREE_GIN = """
+    CREATE EXTENSION IF NOT EXISTS btree_gin;
+"""
+
+# Searched text per table. Index and query must use the identical expression.
+# The columns are nullable, and concat_ws isn't immutable, so it's COALESCE and ||.
+SEARCH_TEXT_VAULT = "(COALESCE(domain, '') || ' ' || COALESCE(account_name, ''))"
+SEARCH_TEXT_SOCIAL_LINKS = "(COALESCE(platform_name, '') || ' ' || COALESCE(username, ''))"
+SEARCH_TEXT_PERSONAL_HANDBOOK = "field_name"
+
+CREATE_INDEX_VAULT_SEARCH = f"""
+    CREATE INDEX IF NOT EXISTS idx_vault_search ON vault USING gin (user_id, {SEARCH_TEXT_VAULT} gin_trgm_ops);
+"""
+
+CREATE_INDEX_SOCIAL_LINKS_SEARCH = f"""
+    CREATE INDEX IF NOT EXISTS idx_social_links_search
+        ON social_links USING gin (user_id, {SEARCH_TEXT_SOCIAL_LINKS} gin_trgm_ops);
+"""
+
+CREATE_INDEX_PERSONAL_HANDBOOK_SEARCH = f"""
+    CREATE INDEX IF NOT EXISTS idx_personal_handbook_search
+        ON personal_handbook USING gin (user_id, {SEARCH_TEXT_PERSONAL_HANDBOOK} gin_trgm_ops);
+"""
+
 SCHEMA_LIST = [
     # 1. Types must be created first so 'users' can use them
     CREATE_TYPE_GENDER_ENUM,
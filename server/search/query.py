@@ -0,0 +1,118 @@
+"""
+Query building and argument parsing for GET /search (shared with the ASGI app).
+
+Each searched table contributes the rows whose search text (schema.py) either
+contains the query (ILIKE, which also covers prefixes) or is close to it by
+pg_trgm word similarity, so "gthub" still finds github. Both conditions are
+answered by the per-table (user_id, text) trigram GIN index. Rows whose text
+starts with the query rank first, then by similarity.
+
+Only names are searched and returned: secrets, URLs, notes and handbook values
+are never read.
+"""
+from schema import SEARCH_TEXT_PERSONAL_HANDBOOK, SEARCH_TEXT_SOCIAL_LINKS, SEARCH_TEXT_VAULT
+
+# type -> (search text expression, table, returned columns)
+SEARCH_TYPES = {
+    "vault": (SEARCH_TEXT_VAULT, "vault", ("domain", "account_name")),
+    "social": (SEARCH_TEXT_SOCIAL_LINKS, "social_links", ("platform_name", "username")),
+    "handbook": (SEARCH_TEXT_PERSONAL_HANDBOOK, "personal_handbook", ("field_name",)),
+}
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Deep offsets re-rank everything before them; past this, refine the query instead
+MAX_SEARCH_OFFSET = 1000
+MAX_QUERY_LENGTH = 100
+
+# Applies to `<%` for the rest of the transaction
+SET_SIMILARITY_THRESHOLD = "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true);"
+
+
+def _type_query(search_type):
+    text, table, columns = SEARCH_TYPES[search_type]
+    fields = list(columns) + ["NULL"] * (2 - len(columns))
+    return f"""
+        (SELECT '{search_type}' AS type, id, {fields[0]} AS field_1, {fields[1]} AS field_2,
+            word_similarity(%(q)s, {text}) + CASE WHEN {text} ILIKE %(prefix)s THEN 1 ELSE 0 END AS score
+        FROM {table}
+        WHERE user_id = %(user_id)s AND ({text} ILIKE %(contains)s OR %(q)s <%% {text})
+        ORDER BY score DESC, id
+        LIMIT %(window)s)"""
+
+
+def search_query(types):
+    """
+    Ranked UNION of the per-type matches. Each type is cut to the rows the
+    requested page could need before they are merged.
+    """
+    return f"""
+    SELECT type, id, field_1, field_2, score FROM (
+        {" UNION ALL ".join(_type_query(search_type) for search_type in types)}
+    ) matches
+    ORDER BY score DESC, type, id
+    LIMIT %(limit)s OFFSET %(offset)s;
+"""
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def parse_search_args(args):
+    """
+    Read ?q=&types=vault,social,handbook&offset=&limit= from the query args.
+    Returns (q, types, offset, limit) and raises ValueError on bad values.
+    """
+    q = (args.get("q") or "").strip()
+    if not q:
+        raise ValueError("q is required")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q must be at most {MAX_QUERY_LENGTH} characters")
+
+    types = [t.strip() for t in args.get("types", ",".join(SEARCH_TYPES)).split(",") if t.strip()]
+    unknown = [t for t in types if t not in SEARCH_TYPES]
+    if not types or unknown:
+        raise ValueError(f"types must be a comma separated subset of {', '.join(SEARCH_TYPES)}")
+
+    try:
+        offset = int(args.get("offset", 0))
+        limit = int(args.get("limit", DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or offset > MAX_SEARCH_OFFSET:
+        raise ValueError(f"offset must be between 0 and {MAX_SEARCH_OFFSET}")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    # Keep the order types were given in, without duplicates
+    return q, list(dict.fromkeys(types)), offset, min(limit, MAX_SEARCH_LIMIT)
+
+
+def search_params(user_id, q, offset, limit):
+    """Bind parameters for search_query; one lookahead row tells whether another page exists"""
+    pattern = _escape_like(q)
+    return {
+        "user_id": user_id,
+        "q": q,
+        "prefix": f"{pattern}%",
+        "contains": f"%{pattern}%",
+        "window": offset + limit + 1,
+        "limit": limit + 1,
+        "offset": offset,
+    }
+
+
+def result_to_dict(row):
+    search_type, row_id, field_1, field_2, score = row
+    columns = SEARCH_TYPES[search_type][2]
+    result = {"type": search_type, "id": row_id}
+    result.update(zip(columns, (field_1, field_2)))
+    result["score"] = round(score, 3)
+    return result
+
+
+def page_results(rows, offset, limit):
+    """(results, next offset or None)"""
+    results = [result_to_dict(row) for row in rows[:limit]]
+    return results, offset + limit if len(rows) > limit else None
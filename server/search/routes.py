@@ -0,0 +1,38 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from repository import transaction
+from extensions import limiter
+from search.query import SET_SIMILARITY_THRESHOLD, page_results, parse_search_args, search_params, search_query
+
+search_bp = Blueprint('search', __name__, url_prefix='/search')
+
+
+@search_bp.route('', methods=['GET'])
+@jwt_required()
+@limiter.limit("120 per minute")
+def search():
+    """
+    Ranked prefix and fuzzy matches over vault domains/account names, social
+    platforms/usernames and handbook field names (?q=&types=&offset=&limit=).
+    When more results exist, X-Next-Cursor holds the offset of the next page.
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        q, types, offset, limit = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            cur.execute(SET_SIMILARITY_THRESHOLD, (str(current_app.config["SEARCH_SIMILARITY_THRESHOLD"]),))
+            cur.execute(search_query(types), search_params(user_id, q, offset, limit))
+            rows = cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    results, next_offset = page_results(rows, offset, limit)
+    response = jsonify(results)
+    if next_offset is not None:
+        response.headers["X-Next-Cursor"] = str(next_offset)
+    return response
@@ -0,0 +1,97 @@
+"""Validation and per-item results for POST /social/batch"""
+
+# Upper bound on additions + deletions in one /social/batch call
+MAX_SOCIAL_BATCH = 200
+
+DELETE_LINKS = """
+    DELETE FROM social_links
+    WHERE user_id = %s AND id = ANY(%s)
+    RETURNING id
+"""
+
+
+def parse_batch(data):
+    """(additions, deletions) from a batch body; raises ValueError on a malformed body"""
+    additions = data.get('add') or []
+    deletions = data.get('delete') or []
+
+    if not isinstance(additions, list) or not isinstance(deletions, list):
+        raise ValueError("add and delete must be lists")
+
+    if not additions and not deletions:
+        raise ValueError("Nothing to update")
+
+    if len(additions) + len(deletions) > MAX_SOCIAL_BATCH:
+        raise ValueError(f"At most {MAX_SOCIAL_BATCH} changes per batch")
+
+    return additions, deletions
+
+
+def prepare_additions(additions):
+    """
+    Validate additions. Returns (per-item results, rows to insert), where rows are
+    (platform_name, username, profile_link) for the items marked "created".
+    """
+    add_results = []
+    new_rows = []
+    for index, item in enumerate(additions):
+        item = item if isinstance(item, dict) else {}
+        platform_name = item.get('platform_name')
+        username = item.get('username')
+        profile_link = item.get('profile_link')
+
+        if not platform_name or not profile_link:
+            add_results.append({"index": index, "status": "error", "error": "Missing fields"})
+            continue
+
+        if not (isinstance(platform_name, str) and isinstance(profile_link, str)
+                and (username is None or isinstance(username, str))):
+            add_results.append({"index": index, "status": "error", "error": "Fields must be strings"})
+            continue
+
+        if not profile_link.startswith(('http://', 'https://')):
+            profile_link = 'https://' + profile_link
+
+        if len(platform_name) > 100 or (username is not None and len(username) > 100) or len(profile_link) > 255:
+            add_results.append({"index": index, "status": "error", "error": "Field too long"})
+            continue
+
+        add_results.append({"index": index, "status": "created", "platform_name": platform_name,
+                            "username": username, "profile_link": profile_link})
+        new_rows.append((platform_name, username, profile_link))
+
+    return add_results, new_rows
+
+
+def _is_link_id(value):
+    # JSON true/false arrive as bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def delete_ids(deletions):
+    """The well-formed link ids among the requested deletions"""
+    return [link_id for link_id in deletions if _is_link_id(link_id)]
+
+
+def batch_results(add_results, inserted, deletions, deleted):
+    """
+    Response body: created ids and per-item deletion outcomes. inserted holds the
+    (id, platform_name, username, profile_link) rows RETURNING gave back, in any order;
+    ids are matched to items by those values (identical items are interchangeable).
+    """
+    ids_by_row = {}
+    for link_id, *row in inserted:
+        ids_by_row.setdefault(tuple(row), []).append(link_id)
+    for result in add_results:
+        if result["status"] == "created":
+            row = (result["platform_name"], result["username"], result["profile_link"])
+            result["id"] = ids_by_row[row].pop(0)
+
+    delete_results = [
+        {"index": index, "id": link_id, "status": "deleted" if link_id in deleted else "not_found"}
+        if _is_link_id(link_id) else
+        {"index": index, "status": "error", "error": "id must be an integer"}
+        for index, link_id in enumerate(deletions)
+    ]
+
+    return {"add": add_results, "delete": delete_results}
@@ -0,0 +1,4 @@
+"""Response shapes shared by social_links/routes.py and aio/social.py"""
+from utils.rows import row_mapper
+
+SOCIAL_LINK = row_mapper(("id", "platform_name", "username", "profile_link"))
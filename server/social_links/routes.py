@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from db_setup import get_db_connection
+from psycopg2.extras import execute_values
+from repository import FORBIDDEN, NOT_FOUND, delete_owned, transaction, update_owned
+from social_links.batch import DELETE_LINKS, batch_results, delete_ids, parse_batch, prepare_additions
+from social_links.mappers import SOCIAL_LINK
+from utils.etag import current_etag, etag_headers, is_not_modified
+from utils.pagination import keyset_query, page_response, parse_page_args, stream_ndjson, wants_ndjson
 
 
 social_bp = Blueprint('social_links', __name__, url_prefix='/social')
@@ -22,58 +27,98 @@ def add_social_link():
     if profile_link and not profile_link.startswith(('http://', 'https://')):
         profile_link = 'https://' + profile_link
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("""
+    try:
+        with transaction() as cur:
+            cur.execute(f"""
                 INSERT INTO social_links (user_id, platform_name, username, profile_link)
                 VALUES (%s, %s, %s, %s)
-                RETURNING id
+                RETURNING {SOCIAL_LINK.columns}
             """, (user_id, platform_name, username, profile_link))
-            
-            new_id = cur.fetchone()[0]
-            conn.commit()
+            new_link = cur.fetchone()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-            new_link = {
-                "id": new_id,
-                "platform_name": platform_name,
-                "username": username,
-                "profile_link": profile_link
-            }
+    return jsonify(SOCIAL_LINK(new_link)), 201
+
+
+@social_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_social_links():
+    """
+    Add and delete many social links in one transaction with one statement per kind.
+    Body: {"add": [{"platform_name", "username", "profile_link"}], "delete": [link_id, ...]}
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        additions, deletions = parse_batch(request.json or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    add_results, new_rows = prepare_additions(additions)
+    ids_to_delete = delete_ids(deletions)
+
+    try:
+        with transaction() as cur:
+            deleted = set()
+            if ids_to_delete:
+                cur.execute(DELETE_LINKS, (user_id, ids_to_delete))
+                deleted = {row[0] for row in cur.fetchall()}
 
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+            inserted = []
+            if new_rows:
+                # RETURNING order isn't guaranteed; batch_results matches rows back by value
+                inserted = execute_values(cur, """
+                    INSERT INTO social_links (user_id, platform_name, username, profile_link)
+                    VALUES %s
+                    RETURNING id, platform_name, username, profile_link
+                """, [(user_id, *row) for row in new_rows], page_size=len(new_rows), fetch=True)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(new_link), 201
+    return jsonify(batch_results(add_results, inserted, deletions, deleted)), 200
 
 
 @social_bp.route('/get-social', methods=['GET'])
 @jwt_required()
 def get_social_links():
-    """Get all social links for a user"""
+    """
+    Get social links for a user, optionally paginated (?after=&limit=) or streamed as NDJSON.
+    Answers 304 when If-None-Match matches the current ETag.
+    """
     user_id = get_jwt_identity()
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT id, platform_name, username, profile_link
+    try:
+        after, limit = parse_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    streaming = wants_ndjson()
+    query, params = keyset_query(f"""
+                SELECT {SOCIAL_LINK.columns}
                 FROM social_links
                 WHERE user_id=%s
-            """, (user_id,))
-            rows = cur.fetchall()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+            """, (user_id,), after, limit, lookahead=not streaming)
+
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            etag = current_etag(cur, request, user_id, "social")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            if not streaming:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-    links = [{"id": r[0], "platform_name": r[1], "username": r[2], "profile_link": r[3]} for r in rows]
+    if streaming:
+        response = stream_ndjson(query, params, SOCIAL_LINK)
+    else:
+        response = page_response(list(map(SOCIAL_LINK, rows)), limit)
 
-    return jsonify(links)
+    response.headers.update(etag_headers(etag))
+    return response
 
 
 @social_bp.route('/delete/<int:link_id>', methods=['DELETE'])
@@ -82,27 +127,17 @@ def delete_social_link(link_id):
     """Delete a specific social link by ID for a user"""
     user_id = get_jwt_identity()
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT user_id FROM social_links WHERE id=%s", (link_id,))
-            row = cur.fetchone()
-
-            if not row:
-                cur.close()
-                return jsonify({"error": "Social link not found"}), 404
-
-            if row[0] != int(user_id):
-                cur.close()
-                return jsonify({"error": "Unauthorized to delete this link"}), 403
-
-            cur.execute("DELETE FROM social_links WHERE id=%s", (link_id,))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    try:
+        with transaction() as cur:
+            outcome, _ = delete_owned(cur, "social_links", link_id, user_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Social link not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to delete this link"}), 403
     
     return jsonify({"message": "Social link deleted!"})
 
@@ -122,35 +157,20 @@ def update_social_link(link_id):
     if profile_link and not profile_link.startswith(('http://', 'https://')):
         profile_link = 'https://' + profile_link
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT user_id FROM social_links WHERE id=%s", (link_id,))
-            row = cur.fetchone()
-
-            if not row:
-                cur.close()
-                conn.rollback()
-                return jsonify({"error": "Social link not found"}), 404
-
-            if row[0] != int(user_id):
-                cur.close()
-                conn.rollback()
-                return jsonify({"error": "Unauthorized to update this link"}), 403
-
-            cur.execute("""
-                UPDATE social_links
-                SET
-                    platform_name = COALESCE(%s, platform_name),
-                    username = COALESCE(%s, username),
-                    profile_link = COALESCE(%s, profile_link)
-                WHERE id = %s
-            """, (platform_name, username, profile_link, link_id))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:           
-            cur.close()
+    try:
+        with transaction() as cur:
+            outcome, _ = update_owned(cur, "social_links", link_id, user_id, {
+                "platform_name": platform_name,
+                "username": username,
+                "profile_link": profile_link,
+            })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Social link not found"}), 404
+
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to update this link"}), 403
 
     return jsonify({"message": "Social link updated!"})
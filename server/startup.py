@@ -0,0 +1,91 @@
+"""
+Per-process start-up of the WSGI app.
+
+create_app() only builds the app: it opens no connections and starts no
+threads. That keeps it safe to import in a preloading pre-fork master
+(gunicorn.conf.py), where anything opened would be shared by every forked
+worker. Each worker process runs start_worker() once instead. gunicorn calls
+it from its post_worker_init hook, and any other server reaches it through
+the first request. It opens the pools and starts the blocklist maintenance
+and pool keepalive (health.py) threads.
+
+With WORKER_WARM_UP on, start_worker also does the work that would otherwise
+fall on the first requests a fresh worker serves:
+- the pool opens its DB_POOL_MIN connections (it always does at creation)
+- the revocation cache loads the token blocklist into its bloom filter
+- the bcrypt worker processes are spawned
+- the URL map is compiled
+"""
+import os
+import threading
+import time
+from auth.revocation import revocation_cache
+from db_setup import initialize_connection_pool, keepalive_pools
+from extensions import hashing_pool, health_monitor
+from jobs.token_blocklist import start_background_maintenance as start_blocklist_maintenance
+from migrations import check_schema_version
+
+_lock = threading.Lock()
+# pid of the process that ran start_worker; a forked child sees its parent's pid here
+_started_pid = None
+# Earliest time.monotonic() for another attempt after the pool could not be opened
+_retry_at = 0.0
+# Requests arriving in between fail fast instead of each waiting out a connect
+RETRY_SECONDS = 5.0
+
+
+def start_worker(app, warm_up=None):
+    """
+    Open this process's connection pool and start its background threads.
+    Runs once per process; later calls return False. While the database can't
+    be reached, the process stays unstarted and a later call (the next request,
+    readiness probes included) tries again after RETRY_SECONDS.
+    warm_up defaults to the WORKER_WARM_UP setting.
+    """
+    global _started_pid, _retry_at
+
+    # Unlocked fast path for every request once this process is up
+    if _started_pid == os.getpid() or time.monotonic() < _retry_at:
+        return False
+
+    with _lock:
+        if _started_pid == os.getpid() or time.monotonic() < _retry_at:
+            return False
+        with app.app_context():
+            if not initialize_connection_pool(app.config):
+                _retry_at = time.monotonic() + RETRY_SECONDS
+                health_monitor.record(False, "database unreachable")
+                return False
+            try:
+                _start(app, app.config["WORKER_WARM_UP"] if warm_up is None else warm_up)
+            finally:
+                # Marked only once done, so concurrent first requests wait on the lock for the pool
+                _started_pid = os.getpid()
+
+    return True
+
+
+def _start(app, warm_up):
+    # DDL is applied at deploy time with `python -m migrations upgrade`
+    check_schema_version()
+    # Ping idle pooled connections and keep /readyz's verdict current. First, while
+    # nothing else holds the DB_POOL_MIN connections, so the first check has one to ping
+    health_monitor.start(keepalive_pools)
+    # Create upcoming token_blocklist partitions and drop expired ones
+    start_blocklist_maintenance(app.config)
+
+    if warm_up:
+        warm_up_worker(app)
+
+
+def warm_up_worker(app):
+    """Pay first-request costs now (see the module docstring); failures only cost the warm-up"""
+    started = time.perf_counter()
+    try:
+        revocation_cache.refresh()
+    except Exception as e:
+        print(f"Revocation cache warm-up failed: {e}")
+
+    hashing_pool.warm()
+    app.url_map.update()
+    print(f"Worker {os.getpid()} warmed up in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,44 @@
+"""
+ETags for the per-user read endpoints, derived from the version stamps that
+triggers bump in user_stats on every write. Checking If-None-Match costs one
+primary key lookup and never touches the data rows.
+"""
+import hashlib
+
+# resource -> version query. MAX() yields 0 for users without a user_stats row yet.
+VERSION_QUERIES = {
+    "profile": "SELECT COALESCE(MAX(profile_version), 0) FROM user_stats WHERE user_id = %s;",
+    "handbook": "SELECT COALESCE(MAX(handbook_version), 0) FROM user_stats WHERE user_id = %s;",
+    "social": "SELECT COALESCE(MAX(social_version), 0) FROM user_stats WHERE user_id = %s;",
+    "vault": "SELECT COALESCE(MAX(vault_version), 0) FROM user_stats WHERE user_id = %s;",
+}
+
+
+def resource_etag(request, user_id, resource, version):
+    """
+    Opaque tag for one representation of a resource. The query string and Accept
+    header are folded in, since pages and NDJSON differ in body.
+    """
+    variant = f"{user_id}|{request.query_string.decode()}|{request.headers.get('Accept', '')}"
+    digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+    return f"{resource}-{version}-{digest}"
+
+
+def current_etag(cur, request, user_id, resource):
+    """Look up the resource version on a psycopg2 cursor and return its tag"""
+    cur.execute(VERSION_QUERIES[resource], (user_id,))
+    return resource_etag(request, user_id, resource, cur.fetchone()[0])
+
+
+def is_not_modified(request, etag):
+    """True when the client's If-None-Match already names this tag"""
+    return request.if_none_match.contains_weak(etag)
+
+
+def etag_headers(etag):
+    """Headers for both the 200 and the 304: weak ETag, cache privately, always revalidate"""
+    return {
+        "ETag": f'W/"{etag}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization, Accept",
+    }
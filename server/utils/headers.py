@@ -0,0 +1,41 @@
+"""Response headers shared by the WSGI and ASGI apps"""
+import os
+
+
+def set_security_headers(response):
+    """Security headers configuration (nosniff, no framing, CSP per environment)"""
+    env = os.getenv("FLASK_ENV", "production")
+    frontend = os.getenv("PROD_FRONTEND_ORIGIN", "")
+
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["X-Frame-Options"] = "DENY"
+
+    # ---- Development CSP ----
+    if env == "development":
+        csp = (
+            "default-src 'self'; "
+            "script-src 'self' 'unsafe-inline' 'unsafe-eval' http://localhost:5173; "
+            "style-src 'self' 'unsafe-inline' http://localhost:5173; "
+            "img-src 'self' data:; "
+            "font-src 'self'; "
+            "object-src 'none'; "
+            "base-uri 'self'; "
+            "form-action 'self'"
+        )
+
+    # ---- Production CSP ----
+    else:
+        csp = (
+            "default-src 'self'; "
+            f"script-src 'self' {frontend}; "
+            f"style-src 'self' 'unsafe-inline' {frontend}; "
+            "img-src 'self' data:; "
+            "font-src 'self'; "
+            "object-src 'none'; "
+            "base-uri 'self'; "
+            "form-action 'self'"
+        )
+
+    response.headers["Content-Security-Policy"] = csp
+
+    return response
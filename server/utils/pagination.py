@@ -0,0 +1,109 @@
+"""Keyset pagination and streamed NDJSON helpers for listing endpoints"""
+from flask import Response, current_app, jsonify, request, stream_with_context
+from repository import server_side_cursor
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Rows pulled per round trip by the server-side cursor while streaming
+STREAM_ITERSIZE = 500
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def parse_page_args(args=None):
+    """
+    Read ?after=<id>&limit=<n> from the request (or the given query args).
+    Returns (after, limit), where limit is None when the client asked for neither,
+    and raises ValueError on malformed values.
+    """
+    args = request.args if args is None else args
+    after = _int_arg(args, "after")
+    limit = _int_arg(args, "limit")
+
+    if after is None and limit is None:
+        return None, None
+
+    if limit is None:
+        limit = DEFAULT_PAGE_LIMIT
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    return after, min(limit, MAX_PAGE_LIMIT)
+
+
+def _int_arg(args, name):
+    """args[name] as an int, None when absent; a present but non-integer value is an error"""
+    if name not in args:
+        return None
+    try:
+        return int(args[name])
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+
+def keyset_query(base_query, params, after, limit, lookahead=True):
+    """
+    Append the keyset filter, a stable id ordering and a LIMIT to a per-user query.
+    With lookahead one extra row is fetched so page_response can tell whether
+    another page exists; streamed responses don't need it.
+    """
+    params = list(params)
+    query = base_query
+    if after is not None:
+        query += " AND id > %s"
+        params.append(after)
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1 if lookahead else limit)
+    return query, params
+
+
+def wants_ndjson(req=None):
+    """Streamed mode via ?format=ndjson or an Accept: application/x-ndjson header"""
+    req = request if req is None else req
+    if req.args.get("format") == "ndjson":
+        return True
+    return req.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def page_response(items, limit, jsonify=jsonify):
+    """
+    JSON list body, with the next cursor in X-Next-Cursor when more rows exist.
+    The ASGI app passes Quart's jsonify; everything else is framework-neutral.
+    """
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1]["id"]
+
+    response = jsonify(items)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return response
+
+
+def stream_ndjson(query, params, row_to_dict):
+    """
+    Stream rows as newline-delimited JSON through a named (server-side) cursor,
+    so memory stays flat regardless of how many rows the query returns.
+    """
+    return stream_rows(
+        query, params,
+        lambda row: current_app.json.dumps(row_to_dict(row)) + "\n",
+        NDJSON_MIMETYPE,
+    )
+
+
+def stream_rows(query, params, render_row, mimetype, preamble=None, headers=None):
+    """Stream each row rendered by render_row, reading through a named cursor"""
+    def generate():
+        if preamble:
+            yield preamble
+        with server_side_cursor(itersize=STREAM_ITERSIZE) as cur:
+            cur.execute(query, params)
+            for row in cur:
+                yield render_row(row)
+
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers=headers)
@@ -1,55 +1,56 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from db_setup import get_db_connection
+from repository import transaction
+from extensions import hashing_pool
+from db_setup import pool_stats
+from metrics import operator_allowed
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
+# Two primary key lookups; the counts are kept current by triggers on vault and social_links
+DASHBOARD_QUERY = """
+    SELECT u.username, COALESCE(s.vault_count, 0), COALESCE(s.social_count, 0)
+    FROM users u
+    LEFT JOIN user_stats s ON s.user_id = u.id
+    WHERE u.id = %s;
+"""
+
 
 @api_bp.route("/dashboard", methods=["GET"])
 @jwt_required()
 def get_dashboard():
     user_id = get_jwt_identity()
-    print("HIT : dashboard endpoint")
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-
-        try:
-            query = """
-                SELECT 
-                    u.username,
-                    COALESCE(v.vault_count, 0) AS vault_count,
-                    COALESCE(s.social_count, 0) AS social_count
-                FROM users u
-                LEFT JOIN (
-                    SELECT user_id, COUNT(*) AS vault_count
-                    FROM vault
-                    GROUP BY user_id
-                ) v ON u.id = v.user_id
-                LEFT JOIN (
-                    SELECT user_id, COUNT(*) AS social_count
-                    FROM social_links
-                    GROUP BY user_id
-                ) s ON u.id = s.user_id
-                WHERE u.id = %s;
-            """
-
-            cur.execute(query, (user_id,))
+
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            cur.execute(DASHBOARD_QUERY, (user_id,))
             row = cur.fetchone()
 
             if not row:
                 return jsonify({"error": "User not found"}), 404
 
-            print(row)
             username, vault_count, social_count = row
-            
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({
         "username": username,
         "vault_count": vault_count,
         "social_count": social_count
     }), 200
+
+
+@api_bp.route("/stats/hashing", methods=["GET"])
+def get_hashing_stats():
+    """Queue depth and wait/run time counters of the bcrypt worker pool (operators only)"""
+    if not operator_allowed(request.headers.get("Authorization"), current_app.config["METRICS_TOKEN"]):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(hashing_pool.stats()), 200
+
+
+@api_bp.route("/stats/pool", methods=["GET"])
+def get_pool_stats():
+    """Connection pool occupancy, checkout wait histogram and exhaustion events (operators only)"""
+    if not operator_allowed(request.headers.get("Authorization"), current_app.config["METRICS_TOKEN"]):
+        return jsonify({"error": "Unauthorized"}), 401
+    return jsonify(pool_stats()), 200
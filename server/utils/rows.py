@@ -0,0 +1,33 @@
+"""Precompiled row -> dict mappers for response bodies"""
+
+
+def row_mapper(fields, **converters):
+    """
+    Compile a function turning a row selected as `fields` (in that order) into a
+    dict keyed by them. Like namedtuple, it compiles source for the exact shape:
+    a dict display with constant indexes runs about twice as fast as
+    dict(zip(fields, row)).
+
+    converters maps a field to a callable applied to its value (e.g. decryption).
+    The mapper's `columns` attribute is the matching SELECT list.
+    """
+    fields = tuple(fields)
+    unknown = set(converters) - set(fields)
+    if unknown:
+        raise ValueError(f"converters for fields not in the row: {', '.join(sorted(unknown))}")
+
+    namespace = {}
+    items = []
+    for index, field in enumerate(fields):
+        if not field.isidentifier():
+            raise ValueError(f"{field!r} is not a column name")
+        value = f"row[{index}]"
+        if field in converters:
+            namespace[f"convert_{field}"] = converters[field]
+            value = f"convert_{field}({value})"
+        items.append(f"{field!r}: {value}")
+
+    mapper = eval(f"lambda row: {{{', '.join(items)}}}", namespace)
+    mapper.fields = fields
+    mapper.columns = ", ".join(fields)
+    return mapper
@@ -0,0 +1,24 @@
+"""
+Response shapes and secret encryption shared by vault/routes.py and aio/vault.py.
+Queries select mapper.columns, so the SQL and the response bodies can't drift.
+"""
+from extensions import fernet
+from utils.rows import row_mapper
+from vault.transfer import EXPORT_COLUMNS
+
+# Upper bound on entries decrypted by a single /vault/reveal call
+MAX_REVEAL_BATCH = 100
+
+
+def encrypt_secret(secret):
+    return fernet.encrypt(secret.encode()).decode()
+
+
+def decrypt_secret(token):
+    return fernet.decrypt(token.encode()).decode()
+
+
+VAULT_ENTRY = row_mapper(("id", "domain", "account_name", "url", "notes"))
+REVEALED_SECRET = row_mapper(("id", "pin_or_password"), pin_or_password=decrypt_secret)
+# /vault/view and the NDJSON export
+VAULT_SECRET = row_mapper(EXPORT_COLUMNS, pin_or_password=decrypt_secret)
@@ -1,12 +1,42 @@
-from flask import Blueprint, request, jsonify
-from extensions import bcrypt, fernet, limiter
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from db_setup import get_db_connection
+from flask import Blueprint, current_app, request, jsonify
+import psycopg2
+from extensions import hashing_pool, limiter
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from repository import FORBIDDEN, NOT_FOUND, delete_owned, transaction, update_owned
+from vault.mappers import (
+    MAX_REVEAL_BATCH, REVEALED_SECRET, VAULT_ENTRY, VAULT_SECRET, decrypt_secret, encrypt_secret,
+)
+from vault.unlock import issue_unlock_grant, verify_unlock_grant
+from vault.transfer import (
+    COPY_IMPORT, CREATE_IMPORT_TABLE, EXPORT_COLUMNS, MAX_IMPORT_ROWS, MERGE_IMPORT,
+    csv_line, parse_import_payload, stage_import,
+)
+from utils.etag import current_etag, etag_headers, is_not_modified
+from utils.pagination import keyset_query, page_response, parse_page_args, stream_ndjson, stream_rows, wants_ndjson
 
 
 vault_bp = Blueprint('vault', __name__, url_prefix='/vault')
 
 
+def _check_vault_password(user_id, vault_password):
+    """Verify the vault password; the bcrypt check runs after the connection is returned"""
+    with transaction() as cur:
+        cur.execute("SELECT vault_password FROM vault_passwords WHERE user_id=%s", (user_id,))
+        result = cur.fetchone()
+
+    return result is not None and hashing_pool.check_password(result[0], vault_password)
+
+
+def _authorize_vault_access(user_id, data):
+    """Accept either a valid unlock grant or the vault password itself"""
+    unlock_token = data.get('unlock_token')
+    if unlock_token and verify_unlock_grant(unlock_token, user_id, get_jwt()['jti']):
+        return True
+
+    vault_password = data.get('vault_password')
+    return bool(vault_password) and _check_vault_password(user_id, vault_password)
+
+
 @vault_bp.route('/set_password', methods=['POST'])
 @jwt_required()
 @limiter.limit("2 per minute")
@@ -19,23 +49,18 @@ def set_vault_password():
     if not user_id or not vault_password:
         return jsonify({"error": "user_id and vault_password required"}), 400
     
-    hashed_password = bcrypt.generate_password_hash(vault_password).decode('utf-8')
+    hashed_password = hashing_pool.hash_password(vault_password)
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:              
+    try:
+        with transaction() as cur:
             cur.execute("""
                 INSERT INTO vault_passwords (user_id, vault_password)
                 VALUES (%s, %s)
                 ON CONFLICT (user_id)
                 DO UPDATE SET vault_password = EXCLUDED.vault_password;
             """, (user_id, hashed_password))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({"message": "Vault password set/updated!"})
 
@@ -49,18 +74,17 @@ def add_vault_entry():
     domain = data.get('domain')
     account_name = data.get('account_name')
     pin_or_password : str = data.get('pin_or_password')
+    url = data.get('url')
     notes = data.get('notes')
 
-    encrypted_pwd = fernet.encrypt(pin_or_password.encode()).decode()
-
     if not user_id or not domain or not account_name or not pin_or_password:
         return jsonify({"error": "All fields required"}), 400
-    
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            url = data.get('url')
-            cur.execute("""
+
+    encrypted_pwd = encrypt_secret(pin_or_password)
+
+    try:
+        with transaction() as cur:
+            cur.execute(f"""
                 INSERT INTO vault (user_id, domain, account_name, pin_or_password, url, notes)
                 VALUES (%s, %s, %s, %s, %s, %s)
                 ON CONFLICT (user_id, domain)
@@ -69,55 +93,182 @@ def add_vault_entry():
                     pin_or_password = EXCLUDED.pin_or_password,
                     url = EXCLUDED.url,
                     notes = EXCLUDED.notes
-                RETURNING id, domain, account_name, url, notes;
+                RETURNING {VAULT_ENTRY.columns};
             """, (user_id, domain, account_name, encrypted_pwd, url, notes))
             new_entry = cur.fetchone()
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
-    
-    return jsonify({
-        "message": "Vault entry added/updated!",
-        "entry": {
-            "id": new_entry[0],
-            "domain": new_entry[1],
-            "account_name": new_entry[2],
-            "url": new_entry[3],
-            "notes": new_entry[4],
-        },
-    }), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"message": "Vault entry added/updated!", "entry": VAULT_ENTRY(new_entry)}), 201
 
 
 @vault_bp.route('/get-vault', methods=['GET'])
 @jwt_required()
 def get_vault_entries():
-    """List all vault domains"""
+    """
+    List vault entry metadata, optionally paginated (?after=&limit=) or streamed as NDJSON.
+    Secrets are never included; /vault/reveal decrypts them after an unlock check.
+    Answers 304 when If-None-Match matches the current ETag.
+    """
     user_id = get_jwt_identity()
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("""
-                SELECT id, domain, account_name, pin_or_password, url, notes FROM vault WHERE user_id=%s
-            """, (user_id,))
-            entries = [{"id": r[0], "domain": r[1], "account_name": r[2], "pin_or_password" : fernet.decrypt(r[3].encode()).decode(), "url": r[4], "notes": r[5]} for r in cur.fetchall()]
+    try:
+        after, limit = parse_page_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    streaming = wants_ndjson()
+    query, params = keyset_query(f"""
+        SELECT {VAULT_ENTRY.columns} FROM vault WHERE user_id=%s
+    """, (user_id,), after, limit, lookahead=not streaming)
+
+    try:
+        with transaction(readonly=True, user_id=user_id) as cur:
+            etag = current_etag(cur, request, user_id, "vault")
+            if is_not_modified(request, etag):
+                return "", 304, etag_headers(etag)
+
+            if not streaming:
+                cur.execute(query, params)
+                entries = list(map(VAULT_ENTRY, cur.fetchall()))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if streaming:
+        response = stream_ndjson(query, params, VAULT_ENTRY)
+    else:
+        response = page_response(entries, limit)
+
+    response.headers.update(etag_headers(etag))
+    return response
+
+
+@vault_bp.route('/reveal', methods=['POST'])
+@jwt_required()
+def reveal_vault_entries():
+    """Decrypt the pin/password of selected entries (unlock grant or vault password required)"""
+    user_id = get_jwt_identity()
+    data = request.json or {}
+    entry_ids = data.get('entry_ids')
+
+    if not (data.get('unlock_token') or data.get('vault_password')) or not isinstance(entry_ids, list) or not entry_ids:
+        return jsonify({"error": "unlock_token or vault_password, and entry_ids required"}), 400
 
+    if len(entry_ids) > MAX_REVEAL_BATCH:
+        return jsonify({"error": f"At most {MAX_REVEAL_BATCH} entries can be revealed at once"}), 400
+
+    try:
+        entry_ids = [int(entry_id) for entry_id in entry_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "entry_ids must be integers"}), 400
+
+    try:
+        if not _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg2.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with transaction() as cur:
+            cur.execute(f"SELECT {REVEALED_SECRET.columns} FROM vault WHERE user_id=%s AND id = ANY(%s)",
+                        (user_id, entry_ids))
+            rows = cur.fetchall()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    entries = list(map(REVEALED_SECRET, rows))
+    found = {entry["id"] for entry in entries}
+
+    return jsonify({
+        "entries": entries,
+        "missing": [entry_id for entry_id in entry_ids if entry_id not in found],
+    })
+
+
+@vault_bp.route('/import', methods=['POST'])
+@jwt_required()
+@limiter.limit("5 per minute")
+def import_vault_entries():
+    """
+    Bulk import from a CSV/JSON/NDJSON export. Rows are encrypted in one pass,
+    COPYed into a staging table and merged into the vault with one upsert.
+    """
+    user_id = get_jwt_identity()
+
+    try:
+        raw_entries = parse_import_payload(request)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not raw_entries:
+        return jsonify({"error": "No entries to import"}), 400
+
+    if len(raw_entries) > MAX_IMPORT_ROWS:
+        return jsonify({"error": f"At most {MAX_IMPORT_ROWS} entries can be imported at once"}), 400
+
+    staged, accepted, errors = stage_import(raw_entries, encrypt_secret)
+
+    inserted = updated = 0
+    if accepted:
+        try:
+            with transaction() as cur:
+                cur.execute(CREATE_IMPORT_TABLE)
+                cur.copy_expert(COPY_IMPORT, staged)
+                cur.execute(MERGE_IMPORT, (user_id,))
+                results = [r[0] for r in cur.fetchall()]
         except Exception as e:
-            conn.rollback()
             return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
 
-    return jsonify(entries)
+        inserted = sum(results)
+        updated = len(results) - inserted
+
+    return jsonify({
+        "message": "Vault import finished",
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": errors,
+    }), 200
+
+
+@vault_bp.route('/export', methods=['POST'])
+@jwt_required()
+@limiter.limit("5 per minute")
+def export_vault_entries():
+    """Stream the decrypted vault as CSV (default) or NDJSON (unlock grant or vault password required)"""
+    user_id = get_jwt_identity()
+    data = request.json or {}
+    export_format = data.get('format', 'csv')
+
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    try:
+        if not _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg2.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = f"SELECT {VAULT_SECRET.columns} FROM vault WHERE user_id=%s ORDER BY id"
+
+    def decrypt_row(r):
+        return [r[0], r[1], decrypt_secret(r[2]), r[3], r[4]]
+
+    if export_format == 'ndjson':
+        return stream_ndjson(query, (user_id,), VAULT_SECRET)
+
+    return stream_rows(
+        query, (user_id,),
+        lambda r: csv_line(decrypt_row(r)),
+        "text/csv",
+        preamble=csv_line(EXPORT_COLUMNS),
+        headers={"Content-Disposition": "attachment; filename=vault-export.csv"},
+    )
 
 
 @vault_bp.route('/unlock-vault', methods=['POST'])
 @jwt_required()
 def unlock_vault():
-    """Unlock vault with secure pin"""
+    """Unlock vault with secure pin and issue a short-lived unlock grant"""
     user_id = get_jwt_identity()
     data = request.json
     vault_password = data.get('vault_password')
@@ -125,66 +276,48 @@ def unlock_vault():
     if not vault_password:
         return jsonify({"error": "Vault password is required"}), 400
     
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT vault_password FROM vault_passwords WHERE user_id=%s", (user_id,))
-            result = cur.fetchone()    
-
-            if not result or not bcrypt.check_password_hash(result[0], vault_password):
-                cur.close()
-                return jsonify({"error": "Invalid vault password"}), 401
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    try:
+        if not _check_vault_password(user_id, vault_password):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg2.Error as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({"message": "vault unlocked"}), 200
+    return jsonify({
+        "message": "vault unlocked",
+        "unlock_token": issue_unlock_grant(user_id, get_jwt()['jti']),
+        "expires_in": current_app.config["VAULT_UNLOCK_TTL"],
+    }), 200
 
 
 @vault_bp.route('/view', methods=['POST'])
 @jwt_required()
 def view_vault_password():
-    """Get pin/password for a specific account (vault password check required)"""
+    """Get pin/password for a specific account (unlock grant or vault password required)"""
     user_id = get_jwt_identity()
     data = request.json
-    vault_password = data.get('vault_password')
     entry_id = data.get('entry_id')
 
-    if not user_id or not vault_password or not entry_id:
+    if not user_id or not (data.get('unlock_token') or data.get('vault_password')) or not entry_id:
         return jsonify({"error": "Missing fields"}), 400
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT vault_password FROM vault_passwords WHERE user_id=%s", (user_id,))
-            result = cur.fetchone()
-
-            if not result or not bcrypt.check_password_hash(result[0], vault_password):
-                cur.close()
-                return jsonify({"error": "Invalid vault password"}), 401
-            
-            cur.execute("SELECT domain, account_name, pin_or_password, url, notes FROM vault WHERE id=%s AND user_id=%s",
+    try:
+        if not _authorize_vault_access(user_id, data):
+            return jsonify({"error": "Invalid vault password"}), 401
+    except psycopg2.Error as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        with transaction() as cur:
+            cur.execute(f"SELECT {VAULT_SECRET.columns} FROM vault WHERE id=%s AND user_id=%s",
                         (entry_id, user_id))
             entry = cur.fetchone()
-            pwd_payload = fernet.decrypt(entry[2].encode()).decode()
-
-            if entry:
-                return jsonify({
-                    "domain": entry[0],
-                    "account_name": entry[1],
-                    "pin_or_password": pwd_payload,
-                    "url": entry[3],
-                    "notes": entry[4]
-                })
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not entry:
+        return jsonify({"error": "No entry found"}), 404
 
-    return jsonify({"error": "No entry found"}), 404
+    return jsonify(VAULT_SECRET(entry))
 
 
 @vault_bp.route('/delete/<int:entry_id>', methods=['DELETE'])
@@ -193,27 +326,17 @@ def delete_vault_entry(entry_id):
     """Delete a vault entry"""
     user_id = get_jwt_identity()
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT user_id FROM vault WHERE id=%s", (entry_id,))
-            row = cur.fetchone()
+    try:
+        with transaction() as cur:
+            outcome, _ = delete_owned(cur, "vault", entry_id, user_id)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-            if not row:
-                cur.close()
-                return jsonify({"error": "Vault entry not found"}), 404
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Vault entry not found"}), 404
 
-            if row[0] != int(user_id):
-                cur.close()
-                return jsonify({"error": "Unauthorized to delete this entry"}), 403
-
-            cur.execute("DELETE FROM vault WHERE id=%s", (entry_id,))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to delete this entry"}), 403
 
     return jsonify({"message": "Vault entry deleted!"})
 
@@ -224,43 +347,26 @@ def update_vault_entry(entry_id):
     """Update the vault entry either partially or fully"""
     user_id = get_jwt_identity()
     data = request.json
-    domain = data.get('domain')
-    account_name = data.get('account_name')
     pin_or_password = data.get('pin_or_password')
-    url = data.get('url')
-    notes = data.get('notes')
 
-    encrypted_pwd = fernet.encrypt(pin_or_password.encode()).decode()
+    values = {
+        "domain": data.get('domain'),
+        "account_name": data.get('account_name'),
+        "pin_or_password": encrypt_secret(pin_or_password) if pin_or_password else None,
+        "url": data.get('url'),
+        "notes": data.get('notes'),
+    }
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT user_id FROM vault WHERE id=%s", (entry_id,))
-            row = cur.fetchone()
+    try:
+        with transaction() as cur:
+            outcome, _ = update_owned(cur, "vault", entry_id, user_id, values)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-            if not row:
-                cur.close()
-                return jsonify({"error": "Vault entry not found"}), 404
+    if outcome == NOT_FOUND:
+        return jsonify({"error": "Vault entry not found"}), 404
 
-            if row[0] != int(user_id):
-                cur.close()
-                return jsonify({"error": "Unauthorized to update this entry"}), 403
+    if outcome == FORBIDDEN:
+        return jsonify({"error": "Unauthorized to update this entry"}), 403
 
-            cur.execute("""
-                UPDATE vault
-                SET
-                    domain = COALESCE(%s, domain),
-                    account_name = COALESCE(%s, account_name),
-                    pin_or_password = COALESCE(%s, pin_or_password),
-                    url = COALESCE(%s, url),
-                    notes = COALESCE(%s, notes)
-                WHERE id = %s AND user_id = %s;
-            """, (domain, account_name, encrypted_pwd, url, notes, entry_id, user_id))
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            return jsonify({"error": str(e)}), 400
-        finally:
-            cur.close()
-    
     return jsonify({"message": "Vault entry updated!"})
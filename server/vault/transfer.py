@@ -0,0 +1,171 @@
+"""Parsing and CSV rendering for bulk vault import/export"""
+import csv
+import io
+import json
+from urllib.parse import urlparse
+
+# Max rows accepted by a single /vault/import call
+MAX_IMPORT_ROWS = 10000
+
+# Column order of /vault/export CSV (also accepted as-is by /vault/import)
+EXPORT_COLUMNS = ["domain", "account_name", "pin_or_password", "url", "notes"]
+
+# Header aliases used by common password manager exports (Bitwarden, Chrome, LastPass, 1Password)
+FIELD_ALIASES = {
+    "domain": ("domain",),
+    "account_name": ("account_name", "username", "login_username", "login"),
+    "pin_or_password": ("pin_or_password", "password", "login_password"),
+    "url": ("url", "login_uri", "uri", "website"),
+    "notes": ("notes", "note", "extra"),
+}
+
+# Column limits from the vault table (pin_or_password is checked after encryption)
+MAX_LENGTHS = {"domain": 100, "account_name": 100, "url": 255}
+
+# Staging table that stage_import() output is COPYed into
+CREATE_IMPORT_TABLE = """
+    CREATE TEMP TABLE vault_import (
+        seq INTEGER,
+        domain VARCHAR(100),
+        account_name VARCHAR(100),
+        pin_or_password VARCHAR(255),
+        url VARCHAR(255),
+        notes TEXT
+    ) ON COMMIT DROP;
+"""
+
+COPY_IMPORT = "COPY vault_import FROM STDIN WITH (FORMAT csv)"
+
+# Later rows for the same domain win, matching one-by-one /vault/add calls
+MERGE_IMPORT = """
+    INSERT INTO vault (user_id, domain, account_name, pin_or_password, url, notes)
+    SELECT DISTINCT ON (domain) %s, domain, account_name, pin_or_password, url, notes
+    FROM vault_import
+    ORDER BY domain, seq DESC
+    ON CONFLICT (user_id, domain)
+    DO UPDATE SET
+        account_name = EXCLUDED.account_name,
+        pin_or_password = EXCLUDED.pin_or_password,
+        url = EXCLUDED.url,
+        notes = EXCLUDED.notes
+    RETURNING (xmax = 0);
+"""
+
+
+def parse_import_payload(request):
+    """
+    Read import rows from a CSV upload (multipart "file" or text/csv body),
+    NDJSON, or JSON (a list or {"entries": [...]}).
+    Returns a list of dicts and raises ValueError on an unreadable payload.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        return parse_import_upload(upload.read(), upload.filename)
+    return parse_import_body(request.get_data(as_text=True), request.mimetype)
+
+
+def parse_import_upload(data, filename):
+    """Rows from an uploaded file: JSON when the name ends in .json, CSV otherwise"""
+    text = data.decode("utf-8-sig")
+    if (filename or "").lower().endswith(".json"):
+        return _parse_json(text)
+    return _parse_csv(text)
+
+
+def parse_import_body(text, mimetype):
+    """Rows from a raw request body, by content type"""
+    if mimetype == "text/csv":
+        return _parse_csv(text)
+
+    if mimetype == "application/x-ndjson":
+        try:
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid NDJSON: {e}")
+
+    return _parse_json(text)
+
+
+def _parse_json(text):
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+
+    if isinstance(payload, dict):
+        payload = payload.get("entries")
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of entries")
+    return payload
+
+
+def _parse_csv(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def normalize_entry(raw):
+    """
+    Map an exported row onto vault columns.
+    Returns (entry, None) or (None, reason) for rows that can't be imported.
+    """
+    if not isinstance(raw, dict):
+        return None, "Entry must be an object"
+
+    lowered = {str(key).strip().lower(): value for key, value in raw.items() if key is not None}
+    entry = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((lowered[alias] for alias in aliases if lowered.get(alias) not in (None, "")), None)
+        if value is not None and not isinstance(value, str):
+            return None, f"{field} must be a string"
+        entry[field] = value.strip() if value is not None else None
+
+    # Exports without a domain column: prefer the login URL's host, then the entry title
+    if not entry["domain"] and entry["url"]:
+        try:
+            entry["domain"] = urlparse(entry["url"] if "://" in entry["url"] else f"https://{entry['url']}").hostname
+        except ValueError:
+            return None, "url is not a valid URL"
+    if not entry["domain"]:
+        entry["domain"] = next((lowered[key].strip() for key in ("name", "title")
+                                if isinstance(lowered.get(key), str) and lowered[key].strip()), None)
+
+    if not entry["domain"] or not entry["account_name"] or not entry["pin_or_password"]:
+        return None, "domain, account_name and pin_or_password are required"
+
+    for field, max_length in MAX_LENGTHS.items():
+        if entry[field] and len(entry[field]) > max_length:
+            return None, f"{field} is longer than {max_length} characters"
+
+    return entry, None
+
+
+def stage_import(raw_entries, encrypt):
+    """
+    Normalize and encrypt import rows into CSV for COPY_IMPORT.
+    Returns (staged buffer, accepted count, [{"index", "error"}] for skipped rows).
+    """
+    staged = io.StringIO()
+    errors = []
+    accepted = 0
+    for index, raw in enumerate(raw_entries):
+        entry, reason = normalize_entry(raw)
+        if entry is not None:
+            encrypted_pwd = encrypt(entry['pin_or_password'])
+            if len(encrypted_pwd) > 255:
+                entry, reason = None, "pin_or_password is too long"
+        if entry is None:
+            errors.append({"index": index, "error": reason})
+            continue
+
+        staged.write(csv_line([index, entry['domain'], entry['account_name'], encrypted_pwd, entry['url'], entry['notes']]))
+        accepted += 1
+
+    staged.seek(0)
+    return staged, accepted, errors
+
+
+def csv_line(values):
+    """Render one CSV record"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
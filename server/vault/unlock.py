@@ -0,0 +1,29 @@
+"""Short-lived vault unlock grants, so reveals skip the bcrypt check after unlocking"""
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+UNLOCK_GRANT_SALT = "vault-unlock-grant"
+
+
+def _serializer(config):
+    return URLSafeTimedSerializer(config["SECRET_KEY"], salt=UNLOCK_GRANT_SALT)
+
+
+def issue_unlock_grant(user_id, jti, config=None):
+    """
+    Signed grant bound to the user and to the access token it was issued for.
+    config defaults to the Flask app's; the ASGI app passes its own.
+    """
+    config = current_app.config if config is None else config
+    return _serializer(config).dumps({"uid": str(user_id), "jti": jti})
+
+
+def verify_unlock_grant(grant, user_id, jti, config=None):
+    """True for an unexpired grant issued to this user under this access token"""
+    config = current_app.config if config is None else config
+    try:
+        payload = _serializer(config).loads(grant, max_age=config["VAULT_UNLOCK_TTL"])
+    except BadSignature:  # also covers SignatureExpired
+        return False
+
+    return payload.get("uid") == str(user_id) and payload.get("jti") == jti